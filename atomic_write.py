@@ -0,0 +1,16 @@
+import os
+
+
+def write_atomic(path, write):
+    """Schreibt über eine temporäre Datei und benennt sie danach um (keine halb geschriebenen Dateien)."""
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    temporary = os.path.join(directory, f".{os.path.basename(path)}.tmp")
+    try:
+        with open(temporary, "wb") as f:
+            write(f)
+        os.replace(temporary, path)
+    except Exception:
+        if os.path.exists(temporary):
+            os.remove(temporary)
+        raise
@@ -0,0 +1,271 @@
+import numpy as np
+from peak_fit import fit_gaussian, fit_gaussians
+
+# Emissionslinien gängiger Kalibrierlampen in nm (Luft).
+LAMP_LINES = {
+    "Hg": [404.656, 407.783, 435.833, 491.604, 546.074, 576.960, 579.066, 623.440, 690.750],
+    "Ne": [540.056, 585.249, 588.190, 594.483, 597.553, 602.000, 607.434, 609.616, 614.306,
+           616.359, 621.728, 626.650, 630.479, 633.443, 638.299, 640.225, 650.653, 653.288,
+           659.895, 667.828, 671.704, 692.947, 703.241, 717.394, 724.517, 743.890],
+    "Ar": [415.859, 420.068, 425.936, 427.217, 430.010, 451.073, 696.543, 706.722, 714.704,
+           727.294, 738.398, 750.387, 751.465, 763.511, 772.376, 794.818, 800.616, 801.479,
+           810.369, 811.531, 826.452, 840.821, 842.465, 852.144, 866.794, 912.297, 922.450],
+    # Energiesparlampe: Hg-Linien plus Tb3+/Eu3+-Leuchtstoffbanden
+    "Leuchtstofflampe": [404.656, 435.833, 487.7, 542.4, 546.074, 576.960, 579.066, 587.6,
+                         593.4, 599.7, 611.6, 625.7, 631.1, 650.8, 662.6, 687.7, 693.7,
+                         707.0, 712.3],
+}
+
+
+def refine_peak_positions(spectrum, positions, half_width=4):
+    """Subpixel-Positionen per Gauß-Fit; wo der Fit scheitert, bleibt die Ganzzahlposition."""
+    spectrum = np.asarray(spectrum, dtype=np.float64)
+    positions = np.asarray(positions, dtype=int)
+    width = 2 * half_width + 1
+    if positions.size == 0 or len(spectrum) < width:
+        return positions.astype(np.float64)
+    starts = np.clip(positions - half_width, 0, len(spectrum) - width)
+    idx = starts[:, None] + np.arange(width)
+    centers = fit_gaussians(idx.astype(np.float64), spectrum[idx])[:, 1]
+    return np.where(np.isfinite(centers), centers, positions)
+
+
+def refine_peak_position(spectrum, position, half_width=4):
+    """Subpixel-Position eines einzelnen Peaks (z. B. nach einem Klick); scheitert der Fit, bleibt position."""
+    spectrum = np.asarray(spectrum, dtype=np.float64)
+    width = 2 * half_width + 1
+    if len(spectrum) < width:
+        return float(position)
+    start = int(np.clip(round(position) - half_width, 0, len(spectrum) - width))
+    try:
+        return float(fit_gaussian(np.arange(start, start + width, dtype=np.float64),
+                                  spectrum[start:start + width])[1])
+    except (ValueError, RuntimeError):
+        return float(position)
+
+
+def _triplets(values, neighbours):
+    """Alle Tripel i < j < k mit k - i <= neighbours und ihr Abstandsverhältnis."""
+    n = len(values)
+    i, j, k = [], [], []
+    for a in range(n):
+        for c in range(a + 2, min(a + neighbours + 1, n)):
+            for b in range(a + 1, c):
+                i.append(a)
+                j.append(b)
+                k.append(c)
+    i, j, k = np.array(i, dtype=int), np.array(j, dtype=int), np.array(k, dtype=int)
+    if i.size == 0:
+        return i, j, k, np.empty(0)
+    ratio = (values[j] - values[i]) / (values[k] - values[i])
+    return i, j, k, ratio
+
+
+def _match(pixels, predicted, lines, tolerance):
+    """Ordnet jedem Peak die nächste Linie zu (eindeutig, innerhalb tolerance)."""
+    idx = np.clip(np.searchsorted(lines, predicted), 1, len(lines) - 1)
+    left, right = lines[idx - 1], lines[idx]
+    nearest = np.where(predicted - left < right - predicted, idx - 1, idx)
+    distance = np.abs(lines[nearest] - predicted)
+    ok = distance <= tolerance
+    # Jede Linie höchstens einmal verwenden: der nächstgelegene Peak gewinnt
+    order = np.argsort(distance)
+    used = set()
+    keep = np.zeros_like(ok)
+    for m in order:
+        if ok[m] and nearest[m] not in used:
+            used.add(nearest[m])
+            keep[m] = True
+    return pixels[keep], lines[nearest[keep]]
+
+
+def _grow(pixels, lines, coeffs, tolerance, max_degree, iterations=8):
+    """
+    Lokale Optimierung einer Hypothese (wie LO-RANSAC): zuordnen, Polynom
+    fitten, erneut zuordnen, bis sich die Zuordnung nicht mehr ändert. So
+    wächst eine lokal lineare Hypothese auch bei gekrümmter Dispersion über
+    das ganze Spektrum.
+
+    :return: (Koeffizienten, zugeordnete Pixel, zugeordnete Wellenlängen)
+    """
+    matched_px, matched_wl = _match(pixels, np.polyval(coeffs, pixels), lines, tolerance)
+    for _ in range(iterations):
+        if len(matched_px) < 3:
+            break
+        degree = min(max_degree, len(matched_px) - 2)
+        center = matched_px.mean()
+        coeffs = np.polyfit(matched_px - center, matched_wl, degree)
+        coeffs = np.poly1d(coeffs)(np.poly1d([1.0, -center])).coeffs
+        new_px, new_wl = _match(pixels, np.polyval(coeffs, pixels), lines, tolerance)
+        if len(new_px) == len(matched_px) and np.array_equal(new_px, matched_px):
+            break
+        matched_px, matched_wl = new_px, new_wl
+    return coeffs, matched_px, matched_wl
+
+
+def select_polynomial_degree(pixels, wavelengths, max_degree=3):
+    """
+    Wählt den Polynomgrad per Leave-one-out-Kreuzvalidierung.
+
+    Die LOO-Residuen werden geschlossen über die Hat-Matrix berechnet
+    (r_i / (1 - h_ii)), es sind also keine n Einzelfits nötig. Mit weniger
+    als 4 Stützstellen ist keine Kreuzvalidierung möglich; dann wird wie
+    bisher exakt interpoliert (3 Punkte: Grad 2), LOO-RMS ist NaN.
+
+    :return: (Grad, Koeffizienten für np.polyval, LOO-RMS)
+    """
+    pixels = np.asarray(pixels, dtype=np.float64)
+    wavelengths = np.asarray(wavelengths, dtype=np.float64)
+    if len(pixels) < 2:
+        raise ValueError("Zu wenige Stützstellen für eine Kalibration")
+    if len(pixels) < 4:
+        degree = min(2, len(pixels) - 1, max_degree)
+        return degree, np.polyfit(pixels, wavelengths, degree), float("nan")
+    # Skalierte Pixelachse für eine gut konditionierte Vandermonde-Matrix
+    center = pixels.mean()
+    scale = max(np.ptp(pixels) / 2, 1.0)
+    u = (pixels - center) / scale
+    best = None
+    for degree in range(1, max_degree + 1):
+        if len(pixels) < degree + 2:
+            break
+        V = np.vander(u, degree + 1)
+        Q, _ = np.linalg.qr(V)
+        coeffs_u, *_ = np.linalg.lstsq(V, wavelengths, rcond=None)
+        residuals = wavelengths - V @ coeffs_u
+        leverage = np.sum(Q * Q, axis=1)
+        loo = residuals / np.maximum(1 - leverage, 1e-9)
+        cv_rms = float(np.sqrt(np.mean(loo * loo)))
+        # Höherer Grad nur bei spürbarer Verbesserung (5 %)
+        if best is None or cv_rms < 0.95 * best[2]:
+            best = (degree, coeffs_u, cv_rms)
+    if best is None:
+        raise ValueError("Zu wenige Stützstellen für eine Kalibration")
+    degree, coeffs_u, cv_rms = best
+    # Koeffizienten zurück auf die Pixelachse umrechnen
+    poly_u = np.poly1d(coeffs_u)
+    poly_p = poly_u(np.poly1d([1 / scale, -center / scale]))
+    coeffs = np.zeros(degree + 1)
+    coeffs[degree + 1 - len(poly_p.coeffs):] = poly_p.coeffs
+    return degree, coeffs, cv_rms
+
+
+def auto_calibrate(peak_pixels, lines, pixel_count, wavelength_range=(300.0, 1100.0),
+                   dispersion_range=(0.02, 2.0), initial=None, tolerance=None,
+                   max_degree=3, neighbours=5, ratio_tolerance=0.02, max_candidates=40, min_coverage=0.5):
+    """
+    Findet die Pixel-Wellenlängen-Zuordnung aus erkannten Peaks und einer Linienliste.
+
+    1. Abstandsverhältnisse von Peak-Tripeln sind invariant gegenüber der
+       (lokal linearen) Dispersion. Die Tripel der Linienliste werden nach
+       gerundetem Verhältnis in eine Hash-Tabelle gelegt; jedes passende
+       Peak-Tripel liefert eine lineare Hypothese lambda = a * pixel + b.
+    2. Die Hypothesen werden in (a, b) gerastert gezählt; die häufigsten
+       werden wie bei RANSAC über die Zahl der zuordenbaren Peaks bewertet.
+       Jede Kandidatin wird dabei lokal optimiert (_grow).
+    3. Für die beste Zuordnung wird der Polynomgrad per Kreuzvalidierung gewählt.
+
+    Liegen die zugeordneten Linien nur in einem Teil des Detektors (z. B. Ar
+    mit Linien nur im Blauen und im nahen IR), ist das Polynom außerhalb
+    davon eine Extrapolation mit leicht einigen nm Fehler. Solche Lösungen
+    werden abgelehnt (min_coverage).
+
+    :param peak_pixels: (Subpixel-)Positionen der erkannten Peaks
+    :param lines: Wellenlängen der Linienliste in nm
+    :param pixel_count: Länge des Spektrums (für den Plausibilitätscheck)
+    :param initial: vorhandene Kalibration (Koeffizienten), wird als zusätzliche Hypothese geprüft
+    :param min_coverage: Mindestanteil des Detektors zwischen erster und letzter zugeordneter Linie
+    :return: dict mit coefficients, degree, pixels, wavelengths, residuals, rms, cv_rms, coverage
+    :raises ValueError: wenn keine plausible Zuordnung gefunden wurde oder die Linien zu wenig abdecken
+    """
+    pixels = np.sort(np.asarray(peak_pixels, dtype=np.float64))
+    lines = np.sort(np.asarray(lines, dtype=np.float64))
+    if len(pixels) < 3 or len(lines) < 3:
+        raise ValueError("Mindestens 3 Peaks und 3 Linien erforderlich")
+
+    # --- 1. Tripel-Hashing der Linienliste ---
+    li, lj, lk, l_ratio = _triplets(lines, neighbours + 3)
+    table = {}
+    keys = np.floor(l_ratio / ratio_tolerance).astype(int)
+    for n, key in enumerate(keys):
+        table.setdefault(key, []).append(n)
+
+    hypotheses = []
+    pi, pj, pk, p_ratio = _triplets(pixels, neighbours)
+    for reverse in (False, True):
+        # Gespiegelte Dispersion: Verhältnis bezogen auf die umgekehrte Reihenfolge
+        ratios = 1 - p_ratio if reverse else p_ratio
+        first, last = (pk, pi) if reverse else (pi, pk)
+        for m, ratio in enumerate(ratios):
+            key = int(np.floor(ratio / ratio_tolerance))
+            for cand in (key - 1, key, key + 1):
+                for n in table.get(cand, ()):
+                    if abs(l_ratio[n] - ratio) > ratio_tolerance:
+                        continue
+                    a = (lines[lk[n]] - lines[li[n]]) / (pixels[last[m]] - pixels[first[m]])
+                    b = lines[li[n]] - a * pixels[first[m]]
+                    hypotheses.append((a, b))
+    hypotheses = np.array(hypotheses).reshape(-1, 2)
+
+    # Plausibilität: Dispersion und abgedeckter Wellenlängenbereich
+    if len(hypotheses):
+        a, b = hypotheses.T
+        ends = np.stack([b, a * (pixel_count - 1) + b], 1)
+        ok = ((np.abs(a) >= dispersion_range[0]) & (np.abs(a) <= dispersion_range[1])
+              & (ends.min(1) >= wavelength_range[0] - 50) & (ends.max(1) <= wavelength_range[1] + 50))
+        hypotheses = hypotheses[ok]
+
+    # --- 2. Hough-Abstimmung + Bewertung der besten Kandidaten ---
+    candidates = []
+    if len(hypotheses):
+        a, b = hypotheses.T
+        da = max(np.median(np.abs(a)) * 0.01, 1e-4)
+        centre_wl = a * (pixel_count / 2) + b  # Wellenlänge der Bildmitte statt b (weniger korreliert)
+        bins = np.stack([np.round(a / da), np.round(centre_wl / 2.0)], 1).astype(np.int64)
+        _, inverse, counts = np.unique(bins, axis=0, return_inverse=True, return_counts=True)
+        inverse = inverse.ravel()
+        for c in np.argsort(counts)[::-1][:max_candidates]:
+            candidates.append(np.median(hypotheses[inverse == c], axis=0))
+    if initial is not None:
+        initial = np.atleast_1d(initial)
+        # Lineare Näherung der vorhandenen Kalibration in der Bildmitte
+        slope = np.polyval(np.polyder(initial), pixel_count / 2) if len(initial) > 1 else 0.0
+        candidates.append((slope, np.polyval(initial, pixel_count / 2) - slope * pixel_count / 2))
+    if not candidates:
+        raise ValueError("Keine passende Linienanordnung gefunden")
+
+    best, best_key = None, None
+    for a, b in candidates:
+        tol = tolerance if tolerance is not None else max(0.5, 3 * abs(a))
+        coeffs, matched_px, matched_wl = _grow(pixels, lines, np.array([a, b]), tol, min(max_degree, 2))
+        if len(matched_px) < 3:
+            continue
+        rms = np.sqrt(np.mean((matched_wl - np.polyval(coeffs, matched_px)) ** 2))
+        key = (len(matched_px), -rms)
+        if best_key is None or key > best_key:
+            best, best_key = (coeffs, matched_px, matched_wl, tol), key
+    if best is None:
+        raise ValueError("Zu wenige Peaks passen zur Linienliste")
+
+    # --- 3. Polynomgrad per Kreuzvalidierung, letzte Zuordnung mit engerer Toleranz ---
+    coeffs, matched_px, matched_wl, tol = best
+    degree, coeffs, cv_rms = select_polynomial_degree(matched_px, matched_wl, max_degree)
+    matched_px, matched_wl = _match(pixels, np.polyval(coeffs, pixels), lines, tol * 0.5)
+    if len(matched_px) < 3:
+        raise ValueError("Verfeinerung fehlgeschlagen")
+    coverage = float(np.ptp(matched_px)) / max(pixel_count - 1, 1)
+    if coverage < min_coverage:
+        raise ValueError(f"Zugeordnete Linien decken nur {100 * coverage:.0f} % des Detektors ab "
+                         f"(mindestens {100 * min_coverage:.0f} % nötig)")
+    degree, coeffs, cv_rms = select_polynomial_degree(matched_px, matched_wl, max_degree)
+    residuals = matched_wl - np.polyval(coeffs, matched_px)
+    return {
+        "coefficients": coeffs,
+        "degree": degree,
+        "pixels": matched_px,
+        "wavelengths": matched_wl,
+        "residuals": residuals,
+        "rms": float(np.sqrt(np.mean(residuals ** 2))),
+        "cv_rms": cv_rms,
+        "coverage": coverage,
+    }
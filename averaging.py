@@ -0,0 +1,253 @@
+import time
+
+import numpy as np
+
+
+class SpectrumAverager:
+    """
+    Zeitliche Mittelung der Live-Spektren mit konstanten Kosten pro Frame.
+
+    Modi:
+      "boxcar"  – gleitendes Mittel über die letzten `window` Spektren
+                  (Ringpuffer + laufende Summe und Quadratsumme)
+      "ema"     – exponentielles Mittel mit Gewicht `alpha` (inkl. Varianz)
+      "welford" – kumulatives Mittel und Varianz seit dem letzten Reset
+      "off"     – keine Mittelung
+
+    Jeder Modus liefert neben dem Mittel den Standardfehler je Pixel. Die
+    Kosten hängen nur von der Spektrenlänge ab, nicht von der Fensterlänge.
+    Funktioniert für ein Spektrum (Spalten) ebenso wie für mehrere Spuren
+    (Spuren, Spalten); ändert sich die Form, beginnt die Mittelung neu.
+    """
+
+    MODES = ("off", "boxcar", "ema", "welford")
+
+    def __init__(self, mode="off", window=10, alpha=0.1, resum=1000):
+        self.mode = mode
+        self.window = window
+        self.alpha = alpha
+        self.resum = resum  # Boxcar: Summen regelmäßig neu bilden (Rundungsfehler der laufenden Summe)
+        self.reset()
+
+    def reset(self):
+        self.count = 0
+        self.mean = None
+        self.m2 = None          # Welford/EMA: Summe bzw. Mittel der quadratischen Abweichungen
+        self.buffer = None      # Boxcar-Ringpuffer (Fenster, ...)
+        self.sum = None
+        self.sum_sq = None
+        self._head = 0
+        self._updates = 0
+
+    def configure(self, mode=None, window=None, alpha=None):
+        """Übernimmt neue Einstellungen; die Mittelung beginnt dann neu."""
+        if mode is not None:
+            self.mode = mode if mode in self.MODES else "off"
+        if window is not None:
+            self.window = max(int(window), 1)
+        if alpha is not None:
+            self.alpha = min(max(float(alpha), 1e-4), 1.0)
+        self.reset()
+
+    @property
+    def active(self):
+        return self.mode != "off"
+
+    def update(self, spectrum):
+        """
+        Nimmt ein Spektrum auf.
+
+        :return: (Mittel, Standardfehler); Standardfehler None, solange er nicht definiert ist
+        """
+        if not self.active:
+            return spectrum, None
+        x = np.asarray(spectrum, dtype=np.float64)
+        if self.mean is None or self.mean.shape != x.shape:
+            self.reset()
+        if self.mode == "boxcar":
+            mean, error = self._boxcar(x)
+        elif self.mode == "ema":
+            mean, error = self._ema(x)
+        else:
+            mean, error = self._welford(x)
+        return mean.copy(), error  # der interne Zustand wird beim nächsten Frame überschrieben
+
+    def _boxcar(self, x):
+        if self.buffer is None:
+            self.buffer = np.zeros((self.window,) + x.shape)
+            self.sum = np.zeros_like(x)
+            self.sum_sq = np.zeros_like(x)
+            self.mean = np.zeros_like(x)
+        old = self.buffer[self._head]
+        if self.count == self.window:
+            self.sum -= old
+            self.sum_sq -= old * old
+        else:
+            self.count += 1
+        old[...] = x
+        self.sum += x
+        self.sum_sq += x * x
+        self._head = (self._head + 1) % self.window
+        self._updates += 1
+        if self._updates % self.resum == 0:
+            self.buffer[:self.count].sum(axis=0, out=self.sum)
+            np.einsum("i...,i...->...", self.buffer[:self.count], self.buffer[:self.count], out=self.sum_sq)
+
+        n = self.count
+        np.divide(self.sum, n, out=self.mean)
+        if n < 2:
+            return self.mean, None
+        variance = np.maximum(self.sum_sq - n * self.mean * self.mean, 0) / (n - 1)
+        return self.mean, np.sqrt(variance / n)
+
+    def _ema(self, x):
+        if self.mean is None:
+            self.mean = x.copy()
+            self.m2 = np.zeros_like(x)
+            self.count = 1
+            return self.mean, None
+        delta = x - self.mean
+        increment = self.alpha * delta
+        self.mean += increment
+        # Exponentiell gewichtete Varianz (West 1979)
+        self.m2 = (1 - self.alpha) * (self.m2 + delta * increment)
+        self.count += 1
+        # Effektive Anzahl unabhängiger Werte eines EMA: (2 - alpha) / alpha
+        return self.mean, np.sqrt(self.m2 * self.alpha / (2 - self.alpha))
+
+    def _welford(self, x):
+        if self.mean is None:
+            self.mean = x.copy()
+            self.m2 = np.zeros_like(x)
+            self.count = 1
+            return self.mean, None
+        self.count += 1
+        delta = x - self.mean
+        self.mean += delta / self.count
+        self.m2 += delta * (x - self.mean)
+        return self.mean, np.sqrt(self.m2 / (self.count - 1) / self.count)
+
+
+class AdaptiveAverager:
+    """
+    Mittelt Aufnahmen nur so lange, bis die gewünschte Genauigkeit erreicht ist.
+
+    Nach jedem Bild wird per Welford die Varianz aktualisiert und geprüft, ob
+      - das Signal-Rausch-Verhältnis (Median über die Signalspalten, bzw. an
+        einer vorgegebenen Peakspalte) target_snr erreicht, oder
+      - der Standardfehler (Median) unter target_error liegt (z. B. Dunkelbilder).
+    Spätestens nach max_frames Bildern oder time_limit Sekunden wird abgebrochen.
+
+    level = "spectrum" bewertet die Spaltensummen eines Bildausschnitts (das
+    spätere Spektrum), level = "pixel" jedes Pixel einzeln.
+    """
+
+    def __init__(self, target_snr=100.0, target_error=None, min_frames=3, max_frames=500, time_limit=10.0,
+                 level="spectrum", signal_fraction=0.1):
+        self.target_snr = target_snr
+        self.target_error = target_error
+        self.min_frames = min_frames
+        self.max_frames = max_frames
+        self.time_limit = time_limit
+        self.level = level
+        self.signal_fraction = signal_fraction  # Spalten unter diesem Anteil des Maximums zählen nicht als Signal
+        self.start()
+
+    def start(self):
+        self.stats = SpectrumAverager("welford")
+        self.sum = None
+        self.frames = 0
+        self.snr = 0.0
+        self.error = np.inf
+        self.reason = None
+        self.duration = 0.0
+        self._started = time.monotonic()
+
+    @property
+    def elapsed(self):
+        return time.monotonic() - self._started
+
+    def add(self, block, saturation=None, peak=None, floor=None):
+        """
+        Nimmt ein Bild (bzw. einen Ausschnitt) auf.
+
+        :param saturation: Spalten mit gesättigten Pixeln zählen nicht für das SNR
+        :param peak: Spaltenindex, an dem das SNR bewertet wird (statt Median der Signalspalten)
+        :param floor: Spalten ohne Pixel über dieser Schwelle zählen nicht als Signal; gibt es
+                      gar kein Signal (z. B. zu kurze HDR-Belichtung), endet die Mittelung nach min_frames
+        :return: True, sobald die Mittelung beendet werden kann
+        """
+        block = np.asarray(block, dtype=np.float64)
+        if self.sum is None:
+            self.sum = np.zeros_like(block)
+        self.sum += block
+        self.frames += 1
+        data = block.sum(axis=0) if self.level == "spectrum" and block.ndim == 2 else block
+        mean, error = self.stats.update(data)
+
+        if error is not None and self.target_error is not None:
+            self.error = float(np.median(error))
+            if self.frames >= self.min_frames and self.error <= self.target_error:
+                self.reason = "Zielunsicherheit erreicht"
+        elif error is not None:
+            select = mean > self.signal_fraction * mean.max()
+            columns = self.level == "spectrum" and self.sum.ndim == 2
+            if saturation is not None:
+                saturated = self.sum >= saturation * self.frames
+                select &= ~(saturated.any(axis=0) if columns else saturated)
+            if floor is not None:
+                above = self.sum > floor * self.frames
+                select &= above.any(axis=0) if columns else above
+            if peak is not None and 0 <= peak < mean.shape[-1]:
+                select = np.zeros_like(select)
+                select[..., int(peak)] = True
+            if select.any():
+                self.error = float(np.median(error[select]))
+                with np.errstate(divide="ignore", invalid="ignore"):
+                    self.snr = float(np.median(mean[select] / error[select]))
+            if self.frames >= self.min_frames and self.snr >= self.target_snr:
+                self.reason = "Ziel-SNR erreicht"
+            elif self.frames >= self.min_frames and not select.any():
+                self.reason = "kein auswertbares Signal"
+        if self.reason is None and self.frames >= self.max_frames:
+            self.reason = "Bildlimit erreicht"
+        if self.reason is None and self.elapsed >= self.time_limit:
+            self.reason = "Zeitlimit erreicht"
+        if self.reason is not None:
+            self.duration = self.elapsed
+        return self.reason is not None
+
+    def acquire(self, grab, prepare=None, saturation=None, peak=None, floor=None):
+        """
+        Nimmt Bilder mit grab() auf, bis add() die Mittelung beendet.
+
+        :param prepare: optionale Vorverarbeitung je Bild (z. B. Ausschnitt)
+        :return: gemitteltes Bild (float32) oder None
+        """
+        self.start()
+        while True:
+            frame = grab()
+            if frame is None:
+                if self.elapsed >= self.time_limit:
+                    self.reason = "Zeitlimit erreicht"
+                    self.duration = self.elapsed
+                    break
+                continue
+            if prepare is not None:
+                frame = prepare(frame)
+            if self.add(frame, saturation, peak, floor):
+                break
+        return self.result()
+
+    def result(self):
+        if not self.frames:
+            return None
+        return (self.sum / self.frames).astype(np.float32)
+
+    def summary(self):
+        """Kurzbericht für die Konsole."""
+        if self.target_error is not None:
+            precision = f"Unsicherheit {self.error:.3g}"
+        else:
+            precision = f"SNR {self.snr:.1f}"
+        return f"{self.frames} Bilder in {self.duration:.1f} s, {precision} ({self.reason})"
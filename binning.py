@@ -0,0 +1,46 @@
+import numpy as np
+
+
+def bin_rows(frame, y0, y1, factor):
+    """
+    Vertikales Binning (Summe über factor Zeilen) des Zeilenbereichs y0..y1 bei voller Spaltenzahl.
+
+    Die Bins liegen auf dem festen Raster k * factor des Vollbilds, damit ROI
+    und Spuren mit scale = 1 / factor einfach umgerechnet werden können.
+    Summiert wird statt gemittelt, die Spaltensummen (das Spektrum) bleiben so
+    erhalten; die Auflösung entlang der Dispersion wird nicht angetastet.
+
+    :return: (gebinnter Block, Index des ersten Bins im Raster des Vollbilds)
+    """
+    factor = max(int(factor), 1)
+    first = max(int(y0), 0) // factor
+    start = first * factor
+    stop = min(-(-int(y1) // factor) * factor, frame.shape[0])
+    block = frame[start:stop]
+    full = (len(block) // factor) * factor
+    binned = block[:full].reshape((full // factor, factor) + block.shape[1:]).sum(axis=1, dtype=np.float32)
+    if full < len(block):  # unvollständiger letzter Bin am Bildrand
+        binned = np.concatenate([binned, block[full:].sum(axis=0, dtype=np.float32)[None]])
+    return binned, first
+
+
+def display_envelope(x, y, points=1280):
+    """
+    Reduziert eine Kurve für die Anzeige auf etwa points Punkte (Minimum/Maximum je Intervall).
+
+    Schmale Linien bleiben in der Darstellung sichtbar, obwohl weniger Punkte
+    gezeichnet werden; die Daten selbst behalten die volle Auflösung.
+
+    :param y: 1D-Kurve oder mehrere Kurven (Kurven, Punkte) mit gemeinsamer x-Achse
+    """
+    y = np.asarray(y)
+    n = y.shape[-1]
+    bins = max(points // 2, 1)
+    if n <= points:
+        return x, y
+    starts = np.linspace(0, n, bins + 1).astype(np.int64)[:-1]
+    centers = (starts + np.append(starts[1:], n) - 1) // 2
+    low = np.minimum.reduceat(y, starts, axis=-1)
+    high = np.maximum.reduceat(y, starts, axis=-1)
+    envelope = np.stack([low, high], axis=-1).reshape(y.shape[:-1] + (2 * bins,))
+    return np.repeat(np.asarray(x)[centers], 2), envelope
@@ -1,10 +1,12 @@
 import numpy as np
 import matplotlib as mpl
 import matplotlib.pyplot as plt
-from PyQt5.QtWidgets import QHeaderView, QDialog, QHBoxLayout, QVBoxLayout, QPushButton, QLabel, QFileDialog, QTableWidget, QTableWidgetItem, QLineEdit
+from PyQt5.QtWidgets import QHeaderView, QDialog, QHBoxLayout, QVBoxLayout, QPushButton, QLabel, QFileDialog, QTableWidget, QTableWidgetItem, QLineEdit, QComboBox
 from PyQt5.QtCore import Qt
 from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg as FigureCanvas
-from scipy.signal import find_peaks
+from peak_detection import PeakIndex
+from auto_calibration import (LAMP_LINES, auto_calibrate, refine_peak_position, refine_peak_positions,
+                              select_polynomial_degree)
 
 mpl.use("Qt5Agg")
 mpl.rcParams['figure.facecolor'] = '#1e1e1e'
@@ -26,7 +28,12 @@ class CalibrationDialog(QDialog):
         self.parent = parent  # Zugriff auf das Hauptfenster
 
         # Falls spectrum nicht übergeben wurde, nutze das Spektrum aus dem Hauptfenster (z. B. spectrum_line)
-        self.spectrum = spectrum if spectrum is not None else self.parent.spectrum_line
+        # Kopie: das Live-Spektrum kann ein je Frame überschriebener Puffer sein (Relativspektrum),
+        # Anzeige und Peak-Index müssen aber zum selben Spektrum gehören
+        self.spectrum = np.array(spectrum if spectrum is not None else self.parent.spectrum_line, dtype=np.float64)
+        # Peaks einmal pro Spektrum bestimmen, Klicks fragen nur noch den Index ab
+        self.peak_index = PeakIndex(self.spectrum)
+        self.display_calibration = None  # Polynom der aktuellen Anzeige (None = Pixelachse)
         self.initUI()
 
     def initUI(self):
@@ -46,6 +53,13 @@ class CalibrationDialog(QDialog):
         table_layout.addStretch()
         # Erstelle einen vertikalen Layoutbereich für die drei Buttons:
         button_layout = QVBoxLayout()
+        # Automatische Kalibration anhand einer Linienliste
+        self.lamp_input = QComboBox()
+        self.lamp_input.addItems(list(LAMP_LINES))
+        button_layout.addWidget(self.lamp_input)
+        self.btn_auto = QPushButton("Automatisch kalibrieren")
+        self.btn_auto.clicked.connect(self.run_auto_calibration)
+        button_layout.addWidget(self.btn_auto)
         self.btn_remove_last = QPushButton("Letzten Punkt entfernen")
         self.btn_remove_last.clicked.connect(self.remove_last_point)
         button_layout.addWidget(self.btn_remove_last)
@@ -132,33 +146,34 @@ class CalibrationDialog(QDialog):
         if event.inaxes is None:
             return
         clicked_pixel = int(event.xdata)
-        peaks, _ = find_peaks(self.spectrum, height=0.05 * np.max(self.spectrum))
-        if peaks.size > 0:
-            distances = np.abs(peaks - clicked_pixel)
-            nearest_peak = peaks[np.argmin(distances)]
-        else:
-            nearest_peak = clicked_pixel
-
-        # Markiere den gefundenen Peak im Plot
-        self.ax.plot(nearest_peak, self.spectrum[nearest_peak], 'x', color='red')
-        self.ax.text(nearest_peak, self.spectrum[nearest_peak], str(nearest_peak), color='red', fontsize=8)
-        self.spectrum_canvas.draw()
+        if self.display_calibration is not None:
+            # Klick liegt auf der Wellenlängenachse -> nächstgelegenes Pixel
+            x_values = np.polyval(self.display_calibration, np.arange(len(self.spectrum)))
+            clicked_pixel = int(np.abs(x_values - event.xdata).argmin())
+        nearest_peak = self.peak_index.nearest_position(clicked_pixel)
+        if len(self.peak_index):
+            nearest_peak = refine_peak_position(self.spectrum, nearest_peak)  # Subpixel-Zentrum
 
-        # Füge den Peak der Tabelle hinzu
+        # Füge den Peak der Tabelle hinzu (markiert ihn auch im Plot)
         self.add_peak_to_table(nearest_peak)
 
-    def add_peak_to_table(self, peak_index):
+    @staticmethod
+    def format_pixel(value):
+        """ Ganzzahlige Positionen ohne, Subpixel-Positionen mit zwei Nachkommastellen. """
+        return str(int(value)) if float(value).is_integer() else f"{value:.2f}"
+
+    def add_peak_to_table(self, peak_index, wavelength=None):
         row = self.table.rowCount()
         self.table.insertRow(row)
         # Spalte 0: Peak Nummer
         self.table.setItem(row, 0, QTableWidgetItem(str(row + 1)))
         # Spalte 1: QLineEdit für die Pixel-Position (bearbeitbar)
-        peak_line_edit = QLineEdit(str(peak_index))
+        peak_line_edit = QLineEdit(self.format_pixel(peak_index))
         # Bei Abschluss der Bearbeitung wird der Plot neu gezeichnet.
         peak_line_edit.editingFinished.connect(lambda r=row: self.on_peak_value_changed(r))
         self.table.setCellWidget(row, 1, peak_line_edit)
         # Spalte 2: QLineEdit für den wahren Wert
-        self.table.setCellWidget(row, 2, QLineEdit())
+        self.table.setCellWidget(row, 2, QLineEdit("" if wavelength is None else f"{wavelength:.3f}"))
         self.plot_peaks()
 
     def on_peak_value_changed(self, row):
@@ -179,14 +194,14 @@ class CalibrationDialog(QDialog):
                 widget = self.table.cellWidget(current_row, 1)
                 if widget:
                     try:
-                        value = int(widget.text())
+                        value = float(widget.text().replace(',', '.'))
                     except ValueError:
                         value = 0
                     if key in (Qt.Key_Up, Qt.Key_Right):
                         value += 1
                     elif key in (Qt.Key_Down, Qt.Key_Left):
                         value -= 1
-                    widget.setText(str(value))
+                    widget.setText(self.format_pixel(value))
                     self.on_peak_value_changed(current_row)
                     event.accept()
                     return
@@ -194,35 +209,56 @@ class CalibrationDialog(QDialog):
 
     def plot_spectrum(self):
         self.ax.clear()
+        self.display_calibration = None
         self.ax.plot(self.spectrum, color='white')
         self.ax.set_title("Kalibration - Hauptspektrum", color='white')
         self.ax.set_xlabel("Pixelposition", color='white')
         self.ax.set_ylabel("Intensität", color='white')
         self.ax.tick_params(axis='both', colors='white')
+        self.create_peak_markers()
         self.spectrum_canvas.draw()
 
-    def plot_peaks(self):
-        """ Zeichnet das Spektrum und markiert alle Peaks aus der Tabelle neu. """
+    def create_peak_markers(self):
+        """ Legt die Marker-Artists an, die plot_peaks danach nur noch verschiebt. """
+        self.peak_marker_line, = self.ax.plot([], [], "x", color='red')
+        self.peak_marker_texts = []
+
+    def table_peaks(self):
+        """ Liest die (subpixelgenauen) Pixelpositionen aus der Tabelle (ungültige Einträge werden übersprungen). """
         peaks = []
         for row in range(self.table.rowCount()):
-            item = self.table.item(row, 1)
-            if item is not None:
-                try:
-                    peak_val = float(item.text())
-                    peaks.append(int(peak_val))
-                except ValueError:
-                    continue
-        self.ax.clear()
-        self.ax.plot(self.spectrum, color='white')
-        if peaks:
-            self.ax.plot(peaks, self.spectrum[peaks], "x", color='red')
-            for i, peak in enumerate(peaks):
-                self.ax.text(peak, self.spectrum[peak], f'{i + 1}', color='red', fontsize=8)
-        self.ax.set_title("Kalibriertes Spektrum", color='white')
-        self.ax.set_xlabel("Pixelposition", color='white')
-        self.ax.set_ylabel("Intensität", color='white')
-        self.ax.tick_params(axis='both', colors='white')
-        self.spectrum_canvas.draw()
+            widget = self.table.cellWidget(row, 1)
+            if widget is None:
+                continue
+            try:
+                peak = float(widget.text().replace(',', '.'))
+            except ValueError:
+                continue
+            if 0 <= round(peak) < len(self.spectrum):
+                peaks.append(peak)
+        return peaks
+
+    def plot_peaks(self):
+        """ Aktualisiert die Marker aller Peaks aus der Tabelle, ohne das Spektrum neu zu zeichnen. """
+        peaks = self.table_peaks()
+        # Marker an der Fit-Position, Höhe vom nächstgelegenen Pixel
+        heights = self.spectrum[np.rint(peaks).astype(int)] if peaks else []
+        if self.display_calibration is not None:
+            x_values = np.polyval(self.display_calibration, peaks) if peaks else []
+            labels = [f'{i + 1}\n{x:.2f} nm' for i, x in enumerate(x_values)]
+        else:
+            x_values = peaks
+            labels = [f'{i + 1}' for i in range(len(peaks))]
+        self.peak_marker_line.set_data(x_values, heights)
+        # Textobjekte wiederverwenden, nur die Differenz anlegen bzw. entfernen
+        while len(self.peak_marker_texts) < len(peaks):
+            self.peak_marker_texts.append(self.ax.text(0, 0, "", color='red', fontsize=8))
+        while len(self.peak_marker_texts) > len(peaks):
+            self.peak_marker_texts.pop().remove()
+        for text, x, y, label in zip(self.peak_marker_texts, x_values, heights, labels):
+            text.set_position((x, y))
+            text.set_text(label)
+        self.spectrum_canvas.draw_idle()
 
     def remove_last_point(self):
         row_count = self.table.rowCount()
@@ -256,37 +292,72 @@ class CalibrationDialog(QDialog):
         if len(peak_positions) < 3:
             print("[WARNUNG] Mindestens 3 Peaks erforderlich für Kalibration!")
             return
-        self.pixel_to_wavelength = np.polyfit(peak_positions, known_wavelengths, deg=2)
-        print(f"[INFO] Kalibration berechnet: {self.pixel_to_wavelength}")
+        # Polynomgrad per Kreuzvalidierung statt fest Grad 2
+        degree, self.pixel_to_wavelength, cv_rms = select_polynomial_degree(peak_positions, known_wavelengths)
+        print(f"[INFO] Kalibration berechnet (Grad {degree}, LOO-RMS {cv_rms:.3f} nm): {self.pixel_to_wavelength}")
         self.calibration_support = {
             'pixels': np.array(peak_positions),
             'wavelengths': np.array(known_wavelengths)
         }
         self.plot_calibrated_spectrum(self.pixel_to_wavelength, peak_positions)
 
+    def run_auto_calibration(self):
+        """ Ordnet die erkannten Peaks automatisch der gewählten Linienliste zu. """
+        lamp = self.lamp_input.currentText()
+        pixels = refine_peak_positions(self.spectrum, self.peak_index.positions)
+        camera = getattr(self.parent, "camera", None)
+        initial = getattr(camera, "calibration_data", None)
+        try:
+            result = auto_calibrate(pixels, LAMP_LINES[lamp], len(self.spectrum), initial=initial)
+        except ValueError as e:
+            print(f"[WARNUNG] Automatische Kalibration fehlgeschlagen: {e}")
+            return
+        self.table.setRowCount(0)
+        for pixel, wavelength in zip(result["pixels"], result["wavelengths"]):
+            self.add_peak_to_table(pixel, wavelength)
+        self.pixel_to_wavelength = result["coefficients"]
+        self.calibration_support = {
+            'pixels': result["pixels"],
+            'wavelengths': result["wavelengths"]
+        }
+        print(f"[INFO] Automatische Kalibration ({lamp}): {len(result['pixels'])} Linien "
+              f"über {100 * result['coverage']:.0f} % des Detektors, Grad {result['degree']}, "
+              f"RMS {result['rms']:.3f} nm, LOO-RMS {result['cv_rms']:.3f} nm")
+        for pixel, wavelength, residual in zip(result["pixels"], result["wavelengths"], result["residuals"]):
+            print(f"    Pixel {pixel:8.2f} -> {wavelength:8.3f} nm (Residuum {residual:+.3f} nm)")
+        self.plot_calibrated_spectrum(self.pixel_to_wavelength, result["pixels"])
+
     def save_calibration(self):
         if hasattr(self, 'pixel_to_wavelength'):
             np.savetxt("wavelength_calibration.csv", self.pixel_to_wavelength, delimiter=",")
-            print("[INFO] Kalibrationsdaten gespeichert!")
+            camera = getattr(self.parent, "camera", None)
+            if camera is not None:
+                version = camera.set_calibration(self.pixel_to_wavelength, "dialog")
+                print(f"[INFO] Kalibrationsdaten gespeichert (Version {version})!")
+                # Drift-Korrektur bezog sich auf die alte Kalibration
+                monitor = getattr(self.parent, "drift_monitor", None)
+                if monitor is not None and monitor.active:
+                    monitor.stop()
+                    print("[INFO] Drift-Monitor zurückgesetzt.")
+            else:
+                print("[INFO] Kalibrationsdaten gespeichert!")
         else:
             print("[WARNUNG] Es liegt keine Kalibration vor.")
 
     def plot_calibrated_spectrum(self, pixel_to_wavelength, peak_positions):
         self.ax.clear()
+        self.display_calibration = pixel_to_wavelength
         self.ax.set_facecolor(self.bg_color)
         # Berechne die kalibrierten x-Werte (Wellenlängen) für das gesamte Spektrum:
         x_values = np.polyval(pixel_to_wavelength, np.arange(len(self.spectrum)))
         self.ax.plot(x_values, self.spectrum, color='white')
-        for i, pos in enumerate(peak_positions):
-            pos_int = int(round(pos))
-            peak_wavelength = np.polyval(pixel_to_wavelength, pos_int)
-            self.ax.plot(peak_wavelength, self.spectrum[pos_int], 'x', color='red')
-            self.ax.text(peak_wavelength, self.spectrum[pos_int], f'{i + 1}\n{peak_wavelength:.2f} nm',
-                         color='red', fontsize=8)
+        # Peak-Marker kommen aus der Tabelle (plot_peaks), damit spätere Änderungen inkrementell bleiben
+        self.create_peak_markers()
+        self.plot_peaks()
         if hasattr(self, 'calibration_support'):
             support_pixels = self.calibration_support['pixels']
             support_values = [self.spectrum[int(round(p))] for p in support_pixels]
-            support_wavelengths = np.polyval(pixel_to_wavelength, support_pixels.astype(int))
+            support_wavelengths = np.polyval(pixel_to_wavelength, support_pixels)
             self.ax.plot(support_wavelengths, support_values, 'o', color='green', markersize=10, label='Stützstellen')
             self.ax.legend()
         self.ax.set_xlabel("Wellenlänge (nm)", color='white')
@@ -0,0 +1,65 @@
+import datetime
+import json
+import os
+
+import numpy as np
+
+
+class CalibrationHistory:
+    """
+    Versionsverwaltung der Wellenlängenkalibration.
+
+    Jede verwendete Kalibration (aus Datei, Kalibrationsdialog oder Drift-Korrektur)
+    bekommt eine fortlaufende Versionsnummer. Die Liste liegt in einer kleinen
+    JSON-Datei, damit gespeicherte Spektren auch später noch ihrer Kalibration
+    zugeordnet werden können.
+    """
+
+    def __init__(self, path="calibration_history.json"):
+        self.path = path
+        self.entries = []
+        if os.path.exists(path):
+            try:
+                with open(path, "r") as f:
+                    self.entries = json.load(f)
+            except Exception as e:
+                print(f"[WARNUNG] Kalibrationshistorie konnte nicht gelesen werden: {e}")
+
+    @property
+    def latest_version(self):
+        return self.entries[-1]["version"] if self.entries else 0
+
+    def find(self, coefficients):
+        """Versionsnummer eines Eintrags mit identischen Koeffizienten (oder None)."""
+        coefficients = np.asarray(coefficients, dtype=np.float64)
+        for entry in reversed(self.entries):
+            stored = np.asarray(entry["coefficients"])
+            if stored.shape == coefficients.shape and np.allclose(stored, coefficients, rtol=1e-12, atol=0):
+                return entry["version"]
+        return None
+
+    def register(self, coefficients, source, **extra):
+        """
+        Gibt die Version zu den Koeffizienten zurück und legt bei Bedarf eine neue an.
+
+        :param source: Herkunft, z. B. "datei", "dialog" oder "drift"
+        :param extra: zusätzliche Angaben (z. B. Offset/Skala der Drift-Korrektur)
+        """
+        version = self.find(coefficients)
+        if version is not None:
+            return version
+        version = self.latest_version + 1
+        entry = {
+            "version": version,
+            "timestamp": datetime.datetime.now().isoformat(timespec="seconds"),
+            "source": source,
+            "coefficients": np.asarray(coefficients, dtype=np.float64).tolist(),
+        }
+        entry.update(extra)
+        self.entries.append(entry)
+        try:
+            with open(self.path, "w") as f:
+                json.dump(self.entries, f, indent=4)
+        except Exception as e:
+            print(f"[WARNUNG] Kalibrationshistorie konnte nicht gespeichert werden: {e}")
+        return version
@@ -1,6 +1,10 @@
 import cv2
 import numpy as np
 from CameraSelectionDialog import CameraSelectionDialog
+from calibration_history import CalibrationHistory
+from camera_profile import CameraProfiles, HdrMerge, exposure_ratios, sensitivity_factor
+from dark_library import DarkLibrary
+from response import CameraResponse
 
 
 class Camera:
@@ -43,20 +47,36 @@ class Camera:
 
         # Der Rest der Initialisierung folgt hier:
         self.calibration_data = None
+        self.calibration_history = CalibrationHistory()
+        self.calibration_version = None  # Versionsnummer der aktiven Kalibration
+        self.dark_library = DarkLibrary()  # Master-Dunkelbilder je (Belichtung, Gain, Auflösung)
         self.load_calibration()
         self.fps = 1
         self.hdr_min_exposure = -10
         self.hdr_max_exposure = 1
         self.hdr_num_frames = 3
         self.exposure_thr = 0.95
+        self.adaptive = None  # AdaptiveAverager: HDR-Stufen bis zum Ziel-SNR mitteln statt hdr_num_frames Bilder
+        self.adaptive_peak = None  # optionale Spalte (im ROI-Rohbild), an der das SNR bewertet wird
 
         self.supports_high_bitdepth = False
 
-        # Sensitivitätsfaktoren für Belichtungsstufen von -10 bis 1
+        # Sensitivitätsfaktoren für Belichtungsstufen von -10 bis 1 (Altwerte für die Summen-Zusammenführung, falls kein Geräteprofil existiert)
         self.sensitivity_factors = [4.6, 3.2, 4.3, 15.3, 2.7, 4, 1.25, 2, 2, 1.1, 1.1, 1.1]
 
+        # Gerätespezifisches Profil (kalibrierte Faktoren je Belichtungswert)
+        self.profiles = CameraProfiles()
+        self.profile_key = CameraProfiles.device_key(
+            self.chosen_cam, (self.supported_properties["Frame Width"], self.supported_properties["Frame Height"]))
+        factors = self.profiles.get(self.profile_key).get("sensitivity_factors", {})
+        self.sensitivity_by_exposure = {int(float(e)): float(f) for e, f in factors.items()}
+
         self.supports_high_bitdepth = self.check_bitdepth_support()
 
+        # Kennlinien-LUT erst nach der Bittiefenprüfung laden (die braucht Rohwerte)
+        self.response = CameraResponse()
+        self.linearize = self.response.ready
+
         if self.supports_high_bitdepth:
             print("[INFO] Kamera unterstützt höhere Bittiefe. Umstellung auf 16-Bit-Modus...")
             self.cap.set(cv2.CAP_PROP_FORMAT, cv2.CV_16U)
@@ -147,12 +167,13 @@ class Camera:
 
         print(f"[INFO] Neue Belichtungszeit: {self.exposure}")
 
-    def capture_hdr_frame(self, roi=None):
+    def capture_hdr_frame(self, roi=None, subtract_dark=False):
         """
         Adaptive HDR-Aufnahme mit Mittelung mehrerer Bilder pro Belichtungsstufe,
         Noise-Floor-Unterdrückung, Sensitivitätsanpassung und flexibler Belichtungsbereich.
 
         :param roi: Optionaler ROI als (x, y, w, h)
+        :param subtract_dark: je Belichtungsstufe das passende Dunkelbild aus der Bibliothek abziehen
         :param num_frames: Anzahl der Bilder, die pro Belichtungsstufe gemittelt werden sollen.
         :param exposure_range: Tupel (min_exposure, max_exposure) z. B. (-10, 1)
         :return: HDR-Bild (als float32) oder None, falls kein gültiges Bild aufgenommen wurde.
@@ -163,43 +184,63 @@ class Camera:
         exposures = list(range(min_exposure, max_exposure + 1))
 
         print("[INFO] Starte adaptive HDR-Aufnahme...")
-        valid_exposures = 0
-        hdr_image = None
+        # Kalibrierte Faktoren: gewichteter Mittelwert; Altwerte: Summe wie bisher
+        merge = HdrMerge(bool(self.sensitivity_by_exposure), noise_floor=10, saturation=self.saturation_limit())
 
         exposures = list(range(min_exposure, max_exposure + 1))
 
         for exposure in exposures:
             print(f"[INFO] Aufnahme mit Belichtungszeit: {exposure}")
             self.set_exposure(exposure)
-            frames = []
-            for _ in range(num_frames):
-                frame = self.capture_frame()
-                if frame is not None:
-                    frames.append(frame.astype(np.float32))
-            if not frames:
-                print("[WARNUNG] Kein Bild empfangen!")
-                continue
-
-            avg_frame = np.mean(frames, axis=0)
-
-            if roi is not None:
-                x, y, w, h = roi
-                avg_frame = avg_frame[y:y + h, x:x + w]
-
-            noise_threshold = 10  # Beispielwert; anpassen je nach Kamera
-            avg_frame = np.where(avg_frame < noise_threshold, 0, avg_frame)
-
-            sensitivity = self.get_sensitivity_factor(exposure)
-            avg_frame *= sensitivity
-
-            valid_exposures += 1
-            if hdr_image is None:
-                hdr_image = avg_frame
+            noise_threshold = merge.noise_floor
+            if self.adaptive is not None:
+                # Adaptive Mittelung: nur so viele Bilder wie für das Ziel-SNR nötig (nur ROI)
+                resolution = None
+
+                def crop(frame):
+                    nonlocal resolution
+                    resolution = (frame.shape[1], frame.shape[0])
+                    if roi is None:
+                        return frame
+                    x, y, w, h = roi
+                    return frame[y:y + h, x:x + w]
+
+                avg_frame = self.adaptive.acquire(self.capture_frame, crop, saturation=self.saturation_limit(),
+                                                  peak=self.adaptive_peak, floor=noise_threshold)
+                if avg_frame is None:
+                    print("[WARNUNG] Kein Bild empfangen!")
+                    continue
+                print(f"[INFO] Belichtung {exposure}: {self.adaptive.summary()}")
             else:
-                hdr_image += avg_frame
-
-        if hdr_image is not None and valid_exposures > 0:
-            print(f"[INFO] HDR-Aufnahme aus {valid_exposures} gültigen Belichtungsstufen erstellt!")
+                frames = []
+                for _ in range(num_frames):
+                    frame = self.capture_frame()
+                    if frame is not None:
+                        frames.append(frame.astype(np.float32))
+                if not frames:
+                    print("[WARNUNG] Kein Bild empfangen!")
+                    continue
+
+                avg_frame = np.mean(frames, axis=0)
+                resolution = (avg_frame.shape[1], avg_frame.shape[0])
+
+                if roi is not None:
+                    x, y, w, h = roi
+                    avg_frame = avg_frame[y:y + h, x:x + w]
+
+            if subtract_dark:
+                region = roi if roi is not None else (0, 0) + resolution
+                dark = self.dark_library.get(exposure, self.gain, resolution, region)
+                if dark is not None:
+                    avg_frame = np.maximum(avg_frame - dark, 0)
+                else:
+                    print(f"[WARNUNG] Kein Dunkelbild für Belichtung {exposure} vorhanden.")
+
+            merge.add(avg_frame, self.get_sensitivity_factor(exposure))
+
+        hdr_image = merge.result()
+        if hdr_image is not None:
+            print(f"[INFO] HDR-Aufnahme aus {merge.count} gültigen Belichtungsstufen erstellt!")
             return hdr_image
 
         print("[FEHLER] Alle Bilder waren fehlerhaft!")
@@ -207,10 +248,62 @@ class Camera:
 
 
     def get_sensitivity_factor(self, exposure):
-        # Berechne den Index: Für exposure = -10 soll index 0 sein, für exposure = 1 index 11
-        index = exposure + 10
-        return self.sensitivity_factors[index]
+        """ Faktor, der eine Aufnahme mit Belichtung exposure auf die längste HDR-Belichtung skaliert """
+        return sensitivity_factor(exposure, self.sensitivity_by_exposure, self.sensitivity_factors,
+                                  self.hdr_max_exposure)
+
+    def saturation_limit(self):
+        """ Grauwert, ab dem ein Pixel als gesättigt gilt """
+        full_scale = 65535 if self.supports_high_bitdepth and not getattr(self, "linearize", False) else 255
+        return self.exposure_thr * full_scale
+
+    def calibrate_sensitivity(self, roi=None, frames_per_step=3, noise_floor=10):
+        """
+        Bestimmt die Sensitivitätsfaktoren aus einer Belichtungsreihe einer stabilen Lichtquelle.
+
+        Aus benachbarten Belichtungsstufen wird über die in beiden Bildern
+        gültigen Pixel das Helligkeitsverhältnis robust geschätzt; die
+        Verhältnisse werden zu Faktoren relativ zur längsten Belichtung verkettet
+        und im Geräteprofil gespeichert.
+
+        :param roi: Optionaler Ausschnitt (x, y, w, h); ohne Angabe das ganze Bild
+        :return: Faktoren {Belichtung: Faktor} oder None
+        """
+        current = self.exposure
+        exposures, stack = [], []
+        for exposure in range(self.hdr_min_exposure, self.hdr_max_exposure + 1):
+            self.set_exposure(exposure)
+            frames = [f for f in (self.capture_frame() for _ in range(frames_per_step)) if f is not None]
+            if not frames:
+                continue
+            frame = np.mean(frames, axis=0)
+            if roi is not None:
+                x, y, w, h = roi
+                frame = frame[y:y + h, x:x + w]
+            exposures.append(exposure)
+            stack.append(frame)
+        self.set_exposure(current)
+        if len(stack) < 2:
+            print("[FEHLER] Zu wenige Aufnahmen für die Sensitivitätskalibrierung.")
+            return None
 
+        ratios, counts = exposure_ratios(np.array(stack), self.saturation_limit(), noise_floor)
+        nominal = 2.0 ** np.diff(exposures)
+        missing = ~np.isfinite(ratios) | (ratios <= 0)
+        for i in np.nonzero(missing)[0]:
+            print(f"[WARNUNG] Belichtung {exposures[i]} -> {exposures[i + 1]}: nur {counts[i]} "
+                  f"gemeinsame Pixel, verwende Nennverhältnis {nominal[i]:g}.")
+        ratios = np.where(missing, nominal, ratios)
+
+        # Helligkeit relativ zur kürzesten Belichtung, Faktoren relativ zur längsten
+        relative = np.concatenate(([1.0], np.cumprod(ratios)))
+        factors = relative[-1] / relative
+        self.sensitivity_by_exposure = {int(e): float(f) for e, f in zip(exposures, factors)}
+        self.profiles.update(self.profile_key,
+                             sensitivity_factors={str(e): f for e, f in self.sensitivity_by_exposure.items()})
+        print("[INFO] Sensitivitätsfaktoren kalibriert: "
+              + ", ".join(f"{e}: {f:.3g}" for e, f in self.sensitivity_by_exposure.items()))
+        return self.sensitivity_by_exposure
 
     def set_gain(self, value):
         self.gain = value
@@ -237,23 +330,67 @@ class Camera:
                 return True  # Kamera liefert Werte über 8 Bit
         return False  # Kamera ist auf 8 Bit limitiert
 
-    def capture_frame(self):
-        """ Nimmt ein Bild auf und gibt es als 16-Bit-Float zurück """
+    def capture_raw_frame(self):
+        """ Nimmt ein Bild auf und gibt das Graubild in der Rohdatentiefe (uint8/uint16) zurück """
         ret, frame = self.cap.read()
         if not ret:
             return None
+        if frame.ndim == 3:
+            frame = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)  # Konvertiere in Graustufen
+        return frame
+
+    def capture_frame(self):
+        """ Nimmt ein Bild auf und gibt es als 16-Bit-Float zurück """
+        frame = self.capture_raw_frame()
+        if frame is None:
+            return None
 
-        frame = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)  # Konvertiere in Graustufen
+        # Linearisierung per LUT direkt auf den Rohwerten, ersetzt die Float-Konvertierung
+        if getattr(self, "linearize", False):
+            linear = self.response.apply(frame)
+            if linear is not None:
+                return linear
         frame = frame.astype(np.float32) # / 255.0 * 65535  # Skalieren auf 16-Bit Float
 
         # print(f"[DEBUG] Live-Bild als float32 geladen (Min: {np.min(frame)}, Max: {np.max(frame)})")
         return frame
 
+    def calibrate_response(self, roi=None, frames_per_step=3):
+        """
+        Bestimmt die Kamerakennlinie aus einer Belichtungsreihe (HDR-Bereich) einer stabilen Lichtquelle.
+
+        :param roi: Optionaler Ausschnitt (x, y, w, h); ohne Angabe das ganze Bild
+        :return: True bei Erfolg
+        """
+        current = self.exposure
+        exposures, stack = [], []
+        for exposure in range(self.hdr_min_exposure, self.hdr_max_exposure + 1):
+            self.set_exposure(exposure)
+            frames = [f for f in (self.capture_raw_frame() for _ in range(frames_per_step)) if f is not None]
+            if not frames or frames[0].dtype != np.uint8:
+                continue
+            frame = np.rint(np.mean(frames, axis=0)).astype(np.uint8)
+            if roi is not None:
+                x, y, w, h = roi
+                frame = frame[y:y + h, x:x + w]
+            exposures.append(exposure)
+            stack.append(frame)
+        self.set_exposure(current)
+        if len(stack) < 3:
+            print("[FEHLER] Zu wenige 8-Bit-Aufnahmen für die Kennlinienkalibrierung.")
+            return False
+        lut = self.response.calibrate(np.array(stack), exposures)
+        self.linearize = True
+        print(f"[INFO] Kamerakennlinie aus {len(stack)} Belichtungsstufen bestimmt "
+              f"(Rohwert 64 -> {lut[64]:.1f}, 128 -> {lut[128]:.1f}, 192 -> {lut[192]:.1f}).")
+        return True
+
     def load_calibration(self):
         """ Lade die Kalibrationsdaten für die Wellenlängenachse """
         try:
             self.calibration_data = np.loadtxt("wavelength_calibration.csv", delimiter=",")
-            print("[INFO] Kalibration geladen!")
+            self.calibration_version = self.calibration_history.register(self.calibration_data, "datei")
+            print(f"[INFO] Kalibration geladen (Version {self.calibration_version})!")
         except Exception as e:
             print(f"[WARNUNG] Keine Kalibrationsdaten gefunden: {e}")
 
@@ -265,6 +402,17 @@ class Camera:
 
         return np.polyval(self.calibration_data, pixel_positions)
 
+    def set_calibration(self, coefficients, source, **extra):
+        """ Setzt eine neue Kalibration und vergibt ihre Versionsnummer """
+        self.calibration_data = np.asarray(coefficients, dtype=np.float64)
+        self.calibration_version = self.calibration_history.register(self.calibration_data, source, **extra)
+        return self.calibration_version
+
+    def restore_calibration(self, coefficients, version):
+        """ Kehrt zu einer bereits registrierten Kalibration zurück, ohne einen neuen Eintrag anzulegen """
+        self.calibration_data = np.asarray(coefficients, dtype=np.float64)
+        self.calibration_version = version
+
     def release(self):
         """ Gibt die Kamera frei """
         self.cap.release()
@@ -0,0 +1,134 @@
+import json
+import os
+import warnings
+
+import numpy as np
+
+
+class CameraProfiles:
+    """
+    Gerätespezifische Kenndaten (z. B. HDR-Sensitivitätsfaktoren) je Kamera.
+
+    Die Profile liegen in einer JSON-Datei, Schlüssel ist Kameraindex und
+    Auflösung ("cam0_1920x1080"), damit ein Kamerawechsel nicht die Werte
+    einer anderen Kamera verwendet.
+    """
+
+    def __init__(self, path="camera_profiles.json"):
+        self.path = path
+        self.profiles = {}
+        if os.path.exists(path):
+            try:
+                with open(path, "r") as f:
+                    self.profiles = json.load(f)
+            except Exception as e:
+                print(f"[WARNUNG] Kameraprofile konnten nicht gelesen werden: {e}")
+
+    @staticmethod
+    def device_key(camera_index, resolution):
+        return f"cam{camera_index}_{int(resolution[0])}x{int(resolution[1])}"
+
+    def get(self, key):
+        return self.profiles.get(key, {})
+
+    def update(self, key, **values):
+        self.profiles.setdefault(key, {}).update(values)
+        try:
+            with open(self.path, "w") as f:
+                json.dump(self.profiles, f, indent=4)
+        except Exception as e:
+            print(f"[WARNUNG] Kameraprofile konnten nicht gespeichert werden: {e}")
+
+
+def exposure_ratios(stack, saturation, noise_floor, min_pixels=50, clip=3.0):
+    """
+    Robuste Helligkeitsverhältnisse aufeinanderfolgender Belichtungsstufen.
+
+    Für jedes Paar (k, k+1) werden nur Pixel verwendet, die in beiden Bildern
+    weder gesättigt noch im Rauschen sind. Startwert ist der Median der
+    Pixelquotienten; danach folgt ein Kleinste-Quadrate-Fit durch den Ursprung
+    nur über Pixel, deren Residuum unter clip robusten Sigmas liegt. Alle Paare
+    werden gemeinsam (vektorisiert) ausgewertet.
+
+    :param stack: gemittelte Bilder (Belichtungen, Pixel) in aufsteigender Belichtung
+    :return: (ratios, counts) je Paar; NaN, wo weniger als min_pixels überlappen
+    """
+    stack = np.asarray(stack, dtype=np.float64).reshape(len(stack), -1)
+    low, high = stack[:-1], stack[1:]
+    usable = ((low > noise_floor) & (low < saturation) & (high > noise_floor) & (high < saturation))
+    counts = usable.sum(axis=1)
+
+    with np.errstate(invalid="ignore", divide="ignore"), warnings.catch_warnings():
+        warnings.simplefilter("ignore", RuntimeWarning)  # Paare ohne Überlappung -> NaN
+        quotient = np.where(usable, high / low, np.nan)
+        ratio = np.nanmedian(quotient, axis=1)
+        residual = np.where(usable, high - ratio[:, None] * low, np.nan)
+        sigma = 1.4826 * np.nanmedian(np.abs(residual), axis=1)
+        inlier = usable & (np.abs(residual) <= clip * np.maximum(sigma, 1e-6)[:, None])
+        ratio = (np.where(inlier, low * high, 0).sum(axis=1)
+                 / np.where(inlier, low * low, 0).sum(axis=1))
+    ratio[counts < min_pixels] = np.nan
+    return ratio, counts
+
+
+def sensitivity_factor(exposure, calibrated, legacy, max_exposure, legacy_min=-10):
+    """
+    Faktor, der eine Aufnahme mit Belichtung exposure auf die längste HDR-Belichtung skaliert.
+
+    Reihenfolge: kalibriertes Geräteprofil, ohne Profil die Altwerte-Liste
+    (Index 0 = Belichtung legacy_min), sonst das Nennverhältnis 2 ** (max - exposure).
+    """
+    exposure = int(round(exposure))
+    if calibrated:
+        if exposure in calibrated:
+            return calibrated[exposure]
+    else:
+        index = exposure - legacy_min
+        if 0 <= index < len(legacy):
+            return legacy[index]
+    return float(2.0 ** (max_exposure - exposure))
+
+
+class HdrMerge:
+    """
+    Fügt skalierte Belichtungsstufen zu einem HDR-Bild zusammen.
+
+    Mit kalibrierten Faktoren (weighted=True) ist das Ergebnis der Mittelwert
+    der auf die längste Belichtung skalierten Stufen, gesättigte und verrauschte
+    Pixel tragen nicht bei; Pixel ohne gültige Stufe übernehmen die kürzeste
+    Belichtung. Die Altwerte-Faktoren sind auf die Summe abgestimmt, deshalb
+    werden sie wie bisher aufsummiert (Rauschen unter noise_floor auf 0).
+    """
+
+    def __init__(self, weighted, noise_floor, saturation):
+        self.weighted = weighted
+        self.noise_floor = noise_floor
+        self.saturation = saturation
+        self.count = 0
+        self.total = None
+        self.weights = None
+        self.fallback = None
+
+    def add(self, frame, factor):
+        frame = np.asarray(frame, dtype=np.float32)
+        if self.weighted:
+            valid = (frame >= self.noise_floor) & (frame < self.saturation)
+            scaled = frame * factor
+            if self.total is None:
+                self.total = np.zeros_like(scaled)
+                self.weights = np.zeros_like(scaled)
+                self.fallback = scaled
+            self.total += np.where(valid, scaled, 0)
+            self.weights += valid
+        else:
+            scaled = np.where(frame < self.noise_floor, 0, frame) * factor
+            self.total = scaled if self.total is None else self.total + scaled
+        self.count += 1
+
+    def result(self):
+        """ HDR-Bild (float32) oder None, falls keine Stufe hinzugefügt wurde """
+        if self.total is None:
+            return None
+        if not self.weighted:
+            return self.total
+        return np.where(self.weights > 0, self.total / np.maximum(self.weights, 1), self.fallback)
@@ -1,4 +1,4 @@
-from PyQt5.QtWidgets import QDialog, QSlider, QCheckBox, QFormLayout, QSpinBox, QPushButton, QDoubleSpinBox
+from PyQt5.QtWidgets import QDialog, QSlider, QCheckBox, QFormLayout, QSpinBox, QPushButton, QDoubleSpinBox, QComboBox
 import numpy as np
 
 class CameraSettingsDialog(QDialog):
@@ -72,6 +72,36 @@ class CameraSettingsDialog(QDialog):
         self.btn_capture_dark_field.clicked.connect(self.capture_dark_field)
         form_layout.addRow(self.btn_capture_dark_field)
 
+        self.btn_capture_dark_series = QPushButton("Dunkelfelder für HDR-Belichtungen aufnehmen")
+        self.btn_capture_dark_series.clicked.connect(self.capture_dark_series)
+        form_layout.addRow(self.btn_capture_dark_series)
+
+        # Linearisierung der Kamerakennlinie (LUT auf den 8-Bit-Rohwerten)
+        self.linearize_checkbox = QCheckBox("Kamerakennlinie linearisieren")
+        self.linearize_checkbox.setChecked(self.parent.camera.linearize)
+        self.linearize_checkbox.setEnabled(self.parent.camera.response.ready)
+        self.linearize_checkbox.stateChanged.connect(self.update_linearization)
+        form_layout.addRow(self.linearize_checkbox)
+
+        self.btn_calibrate_response = QPushButton("Kennlinie kalibrieren (stabile Lichtquelle)")
+        self.btn_calibrate_response.clicked.connect(self.calibrate_response)
+        form_layout.addRow(self.btn_calibrate_response)
+
+        # Hotpixel (Defektkarte aus Dunkelbildern) und Spikes (zeitlicher Median)
+        self.defect_checkbox = QCheckBox("Hotpixel korrigieren")
+        self.defect_checkbox.setChecked(getattr(self.parent, "defect_correction_enabled", False))
+        self.defect_checkbox.stateChanged.connect(self.update_defect_settings)
+        form_layout.addRow(self.defect_checkbox)
+
+        self.btn_build_defects = QPushButton("Defektkarte aus Dunkelfeldern erstellen")
+        self.btn_build_defects.clicked.connect(self.build_defect_map)
+        form_layout.addRow(self.btn_build_defects)
+
+        self.spike_checkbox = QCheckBox("Spikes unterdrücken (zeitlicher Median)")
+        self.spike_checkbox.setChecked(getattr(self.parent, "spike_rejection_enabled", False))
+        self.spike_checkbox.stateChanged.connect(self.update_defect_settings)
+        form_layout.addRow(self.spike_checkbox)
+
         # Bild spiegeln
         self.mirror_checkbox = QCheckBox("Horizontal spiegeln")
         self.mirror_checkbox.setChecked(self.parent.mirror)
@@ -97,13 +127,63 @@ class CameraSettingsDialog(QDialog):
         self.hdr_num_frames_input.valueChanged.connect(self.update_hdr_settings)
         form_layout.addRow("HDR Bilder/Stufe:", self.hdr_num_frames_input)
 
+        # Adaptive Mittelung (HDR-Stufen und Dunkelbilder bis zur Zielgenauigkeit)
+        self.adaptive_checkbox = QCheckBox("Adaptiv mitteln (bis Ziel-SNR statt fester Bildzahl)")
+        self.adaptive_checkbox.setChecked(getattr(self.parent, "adaptive_enabled", False))
+        self.adaptive_checkbox.stateChanged.connect(self.update_adaptive_settings)
+        form_layout.addRow(self.adaptive_checkbox)
+
+        self.adaptive_snr_input = QDoubleSpinBox()
+        self.adaptive_snr_input.setRange(1, 100000)
+        self.adaptive_snr_input.setValue(getattr(self.parent, "adaptive_snr", 100.0))
+        self.adaptive_snr_input.valueChanged.connect(self.update_adaptive_settings)
+        form_layout.addRow("Ziel-SNR:", self.adaptive_snr_input)
+
+        self.adaptive_dark_error_input = QDoubleSpinBox()
+        self.adaptive_dark_error_input.setRange(0.01, 100)
+        self.adaptive_dark_error_input.setDecimals(2)
+        self.adaptive_dark_error_input.setValue(getattr(self.parent, "adaptive_dark_error", 0.5))
+        self.adaptive_dark_error_input.valueChanged.connect(self.update_adaptive_settings)
+        form_layout.addRow("Ziel-Unsicherheit Dunkelbild:", self.adaptive_dark_error_input)
+
+        self.adaptive_time_input = QDoubleSpinBox()
+        self.adaptive_time_input.setRange(0.5, 600)
+        self.adaptive_time_input.setValue(getattr(self.parent, "adaptive_time_limit", 10.0))
+        self.adaptive_time_input.valueChanged.connect(self.update_adaptive_settings)
+        form_layout.addRow("Zeitlimit je Stufe (s):", self.adaptive_time_input)
+
+        self.btn_calibrate_sensitivity = QPushButton("HDR-Sensitivität kalibrieren (stabile Lichtquelle)")
+        self.btn_calibrate_sensitivity.clicked.connect(self.calibrate_sensitivity)
+        form_layout.addRow(self.btn_calibrate_sensitivity)
+
+        # Korrektur von Spaltneigung/-krümmung (aus Lampenbild)
+        self.slit_checkbox = QCheckBox("Spaltkrümmung korrigieren")
+        self.slit_checkbox.setChecked(getattr(self.parent, "slit_correction_enabled", False))
+        self.slit_checkbox.stateChanged.connect(self.update_slit_correction)
+        form_layout.addRow(self.slit_checkbox)
+
+        self.btn_estimate_slit = QPushButton("Spaltkrümmung aus Lampenbild schätzen")
+        self.btn_estimate_slit.clicked.connect(self.estimate_slit_correction)
+        form_layout.addRow(self.btn_estimate_slit)
+
+        self.optimal_extraction_checkbox = QCheckBox("Optimale (profilgewichtete) Extraktion")
+        self.optimal_extraction_checkbox.setChecked(getattr(self.parent, "optimal_extraction_enabled", False))
+        self.optimal_extraction_checkbox.stateChanged.connect(self.update_optimal_extraction)
+        form_layout.addRow(self.optimal_extraction_checkbox)
+
         # Neue Performance-Optionen:
-        self.low_res_checkbox = QCheckBox("Niedrigere Live-Auflösung verwenden")
+        self.low_res_checkbox = QCheckBox("Niedrigere Live-Auflösung verwenden (vertikales Binning)")
         # Standard: deaktiviert
         self.low_res_checkbox.setChecked(getattr(self.parent, "low_res_mode", False))
         self.low_res_checkbox.stateChanged.connect(self.update_performance_settings)
         form_layout.addRow(self.low_res_checkbox)
 
+        self.low_res_bin_input = QSpinBox()
+        self.low_res_bin_input.setRange(1, 16)
+        self.low_res_bin_input.setValue(getattr(self.parent, "low_res_bin", 4))
+        self.low_res_bin_input.valueChanged.connect(self.update_performance_settings)
+        form_layout.addRow("Binning (Zeilen):", self.low_res_bin_input)
+
         self.update_interval_input = QSpinBox()
         self.update_interval_input.setRange(50, 1000)  # in ms
         # Standardwert z.B. 200ms, falls im Performance-Modus aktiv:
@@ -139,12 +219,87 @@ class CameraSettingsDialog(QDialog):
         self.wavelength_max_input.valueChanged.connect(self.update_wavelength_limits)
         form_layout.addRow("Max. Wellenlänge (nm):", self.wavelength_max_input)
 
+        # Linienprofil für den Klick-Fit
+        self.fit_profile_input = QComboBox()
+        self.fit_profile_input.addItem("Gauß", "gauss")
+        self.fit_profile_input.addItem("Pseudo-Voigt", "voigt")
+        self.fit_profile_input.setCurrentIndex(max(self.fit_profile_input.findData(
+            getattr(self.parent, "fit_profile", "gauss")), 0))
+        self.fit_profile_input.currentIndexChanged.connect(self.update_fit_profile)
+        form_layout.addRow("Fit-Profil:", self.fit_profile_input)
+
+        # Export auf gleichmäßigem Wellenlängenraster
+        self.resample_step_input = QDoubleSpinBox()
+        self.resample_step_input.setRange(0, 50)
+        self.resample_step_input.setDecimals(2)
+        self.resample_step_input.setSingleStep(0.1)
+        self.resample_step_input.setValue(getattr(self.parent, "resample_step", 0.0))
+        self.resample_step_input.valueChanged.connect(self.update_resampling)
+        form_layout.addRow("Export-Raster (nm, 0 = Pixel):", self.resample_step_input)
+
+        self.resample_flux_checkbox = QCheckBox("Flusserhaltend umverteilen")
+        self.resample_flux_checkbox.setChecked(getattr(self.parent, "resample_flux", False))
+        self.resample_flux_checkbox.stateChanged.connect(self.update_resampling)
+        form_layout.addRow(self.resample_flux_checkbox)
+
+        # Zeitliche Mittelung der Live-Spektren
+        self.averaging_mode_input = QComboBox()
+        self.averaging_mode_input.addItem("Aus", "off")
+        self.averaging_mode_input.addItem("Gleitend (Boxcar)", "boxcar")
+        self.averaging_mode_input.addItem("Exponentiell (EMA)", "ema")
+        self.averaging_mode_input.addItem("Kumulativ (Welford)", "welford")
+        self.averaging_mode_input.setCurrentIndex(max(self.averaging_mode_input.findData(
+            getattr(self.parent, "averaging_mode", "off")), 0))
+        self.averaging_mode_input.currentIndexChanged.connect(self.update_averaging)
+        form_layout.addRow("Mittelung:", self.averaging_mode_input)
+
+        self.averaging_window_input = QSpinBox()
+        self.averaging_window_input.setRange(2, 10000)
+        self.averaging_window_input.setValue(getattr(self.parent, "averaging_window", 10))
+        self.averaging_window_input.valueChanged.connect(self.update_averaging)
+        form_layout.addRow("Fensterlänge (Spektren):", self.averaging_window_input)
+
+        self.averaging_alpha_input = QDoubleSpinBox()
+        self.averaging_alpha_input.setRange(0.001, 1.0)
+        self.averaging_alpha_input.setDecimals(3)
+        self.averaging_alpha_input.setSingleStep(0.01)
+        self.averaging_alpha_input.setValue(getattr(self.parent, "averaging_alpha", 0.1))
+        self.averaging_alpha_input.valueChanged.connect(self.update_averaging)
+        form_layout.addRow("EMA-Gewicht:", self.averaging_alpha_input)
+
+        self.std_error_checkbox = QCheckBox("Standardfehler als Band anzeigen")
+        self.std_error_checkbox.setChecked(getattr(self.parent, "show_std_error", True))
+        self.std_error_checkbox.stateChanged.connect(self.update_averaging)
+        form_layout.addRow(self.std_error_checkbox)
+
         self.btn_switch_camera = QPushButton("Kamera wechseln")
         self.btn_switch_camera.clicked.connect(self.switch_camera)
         form_layout.addRow(self.btn_switch_camera)
 
         self.setLayout(form_layout)
 
+    def update_averaging(self):
+        self.parent.averaging_mode = self.averaging_mode_input.currentData()
+        self.parent.averaging_window = self.averaging_window_input.value()
+        self.parent.averaging_alpha = self.averaging_alpha_input.value()
+        self.parent.show_std_error = self.std_error_checkbox.isChecked()
+        self.parent.update_averaging()
+
+    def update_slit_correction(self):
+        self.parent.slit_correction_enabled = self.slit_checkbox.isChecked()
+
+    def update_optimal_extraction(self):
+        self.parent.optimal_extraction_enabled = self.optimal_extraction_checkbox.isChecked()
+        self.parent.optimal_extractor.reset()
+
+    def estimate_slit_correction(self):
+        if self.parent.estimate_slit_correction():
+            self.slit_checkbox.setChecked(True)
+
+    def update_resampling(self):
+        self.parent.resample_step = self.resample_step_input.value()
+        self.parent.resample_flux = self.resample_flux_checkbox.isChecked()
+
     def update_dark_field_setting(self):
         self.parent.dark_field_enabled = self.dark_field_checkbox.isChecked()
 
@@ -165,17 +320,39 @@ class CameraSettingsDialog(QDialog):
             print(f"[INFO] Kamera gewechselt zu {new_cam}")
 
     def capture_dark_field(self):
-        frames = []
-        for i in range(self.parent.hdr_num_frames):
-            frame = self.parent.camera.capture_frame()
-            if frame is not None:
-                frames.append(frame.astype(np.float32))
-        if frames:
-            dark_field = np.mean(frames, axis=0)
-            self.parent.dark_field = dark_field
-            print("[INFO] Dunkelfeld (gemittelt) aufgenommen!")
-        else:
-            print("[WARNUNG] Dunkelfeldaufnahme fehlgeschlagen!")
+        # Master-Dunkelbild für die aktuelle Belichtung, nur für ROI/Spuren
+        self.parent.capture_dark()
+
+    def update_linearization(self):
+        self.parent.camera.linearize = self.linearize_checkbox.isChecked() and self.parent.camera.response.ready
+
+    def calibrate_response(self):
+        if self.parent.camera.calibrate_response(self.parent.roi):
+            self.linearize_checkbox.setEnabled(True)
+            self.linearize_checkbox.setChecked(True)
+
+    def update_adaptive_settings(self):
+        self.parent.adaptive_enabled = self.adaptive_checkbox.isChecked()
+        self.parent.adaptive_snr = self.adaptive_snr_input.value()
+        self.parent.adaptive_dark_error = self.adaptive_dark_error_input.value()
+        self.parent.adaptive_time_limit = self.adaptive_time_input.value()
+
+    def calibrate_sensitivity(self):
+        # Faktoren landen im Geräteprofil der Kamera, nicht in settings.json
+        self.parent.camera.calibrate_sensitivity(self.parent.roi, self.parent.hdr_num_frames)
+
+    def update_defect_settings(self):
+        self.parent.defect_correction_enabled = self.defect_checkbox.isChecked()
+        self.parent.spike_rejection_enabled = self.spike_checkbox.isChecked()
+        self.parent.spike_rejector.reset()
+
+    def build_defect_map(self):
+        if self.parent.build_defect_map():
+            self.defect_checkbox.setChecked(True)
+
+    def capture_dark_series(self):
+        camera = self.parent.camera
+        self.parent.capture_dark(list(range(camera.hdr_min_exposure, camera.hdr_max_exposure + 1)))
 
     def toggle_mirror(self):
         self.parent.mirror = self.mirror_checkbox.isChecked()
@@ -210,6 +387,9 @@ class CameraSettingsDialog(QDialog):
         self.parent.wavelength_min = self.wavelength_min_input.value()
         self.parent.wavelength_max = self.wavelength_max_input.value()
 
+    def update_fit_profile(self):
+        self.parent.fit_profile = self.fit_profile_input.currentData()
+
     def update_hdr_settings(self):
         self.parent.hdr_min_exposure = self.hdr_min_exposure_input.value()
         self.parent.hdr_max_exposure = self.hdr_max_exposure_input.value()
@@ -217,5 +397,6 @@ class CameraSettingsDialog(QDialog):
 
     def update_performance_settings(self):
         # Diese Methode speichert Performance-Optionen in der Hauptanwendung
-        self.parent.low_res_mode = False #self.low_res_checkbox.isChecked()
+        self.parent.low_res_mode = self.low_res_checkbox.isChecked()
+        self.parent.low_res_bin = self.low_res_bin_input.value()
         self.parent.update_interval = self.update_interval_input.value()
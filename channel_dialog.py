@@ -0,0 +1,74 @@
+from PyQt5.QtWidgets import (QDialog, QVBoxLayout, QFormLayout, QLabel, QPlainTextEdit, QCheckBox, QPushButton,
+                             QMessageBox, QSpinBox, QDoubleSpinBox)
+from channels import ChannelEngine
+
+
+class ChannelDialog(QDialog):
+    """Bearbeitung der Kanaldefinitionen (Bandflächen, -verhältnisse) und der Aufzeichnung."""
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.setWindowTitle("Kanäle")
+        self.setStyleSheet("background-color: #1e1e1e; color: white;")
+        self.setGeometry(200, 200, 480, 360)
+        self.parent = parent
+        self.initUI()
+
+    def initUI(self):
+        layout = QVBoxLayout()
+        layout.addWidget(QLabel("Eine Definition je Zeile: Name = Ausdruck\n"
+                                "Funktionen: area(a, b), net(a, b), mean(a, b), height(c, w), value(c)\n"
+                                "Beispiel: ratio = net(650, 660) / net(480, 490)"))
+        self.definitions_input = QPlainTextEdit()
+        self.definitions_input.setPlainText(self.parent.channels.format())
+        layout.addWidget(self.definitions_input)
+
+        self.enable_cb = QCheckBox("Kanäle auswerten und als Verlauf anzeigen")
+        self.enable_cb.setChecked(getattr(self.parent, "channels_enabled", False))
+        layout.addWidget(self.enable_cb)
+
+        self.record_spectra_cb = QCheckBox("Spektren mit aufzeichnen")
+        self.record_spectra_cb.setChecked(getattr(self.parent, "record_spectra", False))
+        layout.addWidget(self.record_spectra_cb)
+
+        # Änderungsgesteuerte Aufzeichnung
+        trigger_layout = QFormLayout()
+        self.trigger_cb = QCheckBox("Nur bei Änderung aufzeichnen")
+        self.trigger_cb.setChecked(getattr(self.parent, "trigger_enabled", False))
+        trigger_layout.addRow(self.trigger_cb)
+        self.trigger_threshold_input = QDoubleSpinBox()
+        self.trigger_threshold_input.setRange(0.0001, 10)
+        self.trigger_threshold_input.setDecimals(4)
+        self.trigger_threshold_input.setSingleStep(0.005)
+        self.trigger_threshold_input.setValue(getattr(self.parent, "trigger_threshold", 0.02))
+        trigger_layout.addRow("Schwelle (relative Änderung):", self.trigger_threshold_input)
+        self.trigger_pre_input = QSpinBox()
+        self.trigger_pre_input.setRange(0, 10000)
+        self.trigger_pre_input.setValue(getattr(self.parent, "trigger_pre", 10))
+        trigger_layout.addRow("Vorlauf (Frames):", self.trigger_pre_input)
+        self.trigger_heartbeat_input = QDoubleSpinBox()
+        self.trigger_heartbeat_input.setRange(1, 86400)
+        self.trigger_heartbeat_input.setValue(getattr(self.parent, "trigger_heartbeat", 60.0))
+        trigger_layout.addRow("Heartbeat (s):", self.trigger_heartbeat_input)
+        layout.addLayout(trigger_layout)
+
+        self.btn_apply = QPushButton("Übernehmen")
+        self.btn_apply.clicked.connect(self.apply_channels)
+        layout.addWidget(self.btn_apply)
+        self.setLayout(layout)
+
+    def apply_channels(self):
+        try:
+            definitions = ChannelEngine.parse(self.definitions_input.toPlainText())
+            self.parent.channels.set_definitions(definitions)
+        except ValueError as e:
+            QMessageBox.warning(self, "Fehler", str(e))
+            return
+        self.parent.record_spectra = self.record_spectra_cb.isChecked()
+        self.parent.trigger_enabled = self.trigger_cb.isChecked()
+        self.parent.trigger_threshold = self.trigger_threshold_input.value()
+        self.parent.trigger_pre = self.trigger_pre_input.value()
+        self.parent.trigger_heartbeat = self.trigger_heartbeat_input.value()
+        self.parent.set_channels_enabled(self.enable_cb.isChecked())
+        print(f"[INFO] {len(self.parent.channels)} Kanäle übernommen.")
+        self.accept()
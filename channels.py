@@ -0,0 +1,249 @@
+import ast
+
+import numpy as np
+from scipy import sparse
+
+
+# Bandfunktionen, die in Kanalausdrücken erlaubt sind (Anzahl Argumente: min, max)
+PRIMITIVES = {
+    "area": (2, 2),    # area(a, b): Integral der Intensität über [a, b] (Intensität * nm)
+    "net": (2, 2),     # net(a, b): Fläche über der linearen Basislinie zwischen den Bandrändern
+    "mean": (2, 2),    # mean(a, b): mittlere Intensität im Band
+    "height": (1, 2),  # height(c, w=1): mittlere Intensität in [c - w, c + w]
+    "value": (1, 1),   # value(c): linear interpolierte Intensität bei c
+}
+
+
+class _Compiler(ast.NodeTransformer):
+    """Prüft einen Kanalausdruck und ersetzt Bandfunktionen durch v[i], Kanalnamen durch c[j]."""
+
+    def __init__(self, primitives, names):
+        self.primitives = primitives  # gemeinsame Liste (Funktion, Argumente) aller Kanäle
+        self.names = names            # bereits definierte Kanäle
+
+    def generic_visit(self, node):
+        allowed = (ast.Expression, ast.BinOp, ast.UnaryOp, ast.Add, ast.Sub, ast.Mult, ast.Div, ast.Pow,
+                   ast.USub, ast.UAdd, ast.Load)
+        if not isinstance(node, allowed):
+            raise ValueError(f"Nicht erlaubter Ausdruck: {ast.dump(node)[:40]}")
+        return super().generic_visit(node)
+
+    def visit_Constant(self, node):
+        if not isinstance(node.value, (int, float)):
+            raise ValueError(f"Nur Zahlen sind als Konstanten erlaubt: {node.value!r}")
+        return node
+
+    def visit_Name(self, node):
+        if node.id not in self.names:
+            raise ValueError(f"Unbekannter Kanal: {node.id}")
+        return self._subscript("c", self.names.index(node.id))
+
+    def visit_Call(self, node):
+        name = node.func.id if isinstance(node.func, ast.Name) else None
+        if name not in PRIMITIVES or node.keywords:
+            raise ValueError(f"Unbekannte Funktion: {name}")
+        low, high = PRIMITIVES[name]
+        if not low <= len(node.args) <= high:
+            raise ValueError(f"{name} erwartet {low}–{high} Argumente.")
+        try:
+            args = tuple(float(ast.literal_eval(a)) for a in node.args)
+        except ValueError:
+            raise ValueError(f"Argumente von {name} müssen Zahlen sein.")
+        key = (name, args)
+        if key not in self.primitives:
+            self.primitives.append(key)
+        return self._subscript("v", self.primitives.index(key))
+
+    @staticmethod
+    def _subscript(array, index):
+        return ast.Subscript(value=ast.Name(id=array, ctx=ast.Load()), slice=ast.Constant(index), ctx=ast.Load())
+
+
+class ChannelEngine:
+    """
+    Abgeleitete Messgrößen (Bandflächen, Bandverhältnisse, Peakhöhen) je Frame.
+
+    Kanäle sind benannte Ausdrücke wie "ratio = net(650, 660) / net(480, 490)"
+    aus Bandfunktionen (siehe PRIMITIVES), Zahlen, Grundrechenarten und bereits
+    definierten Kanälen. Alle Bandfunktionen sind linear im Spektrum und werden
+    für die aktuelle Kalibration in eine dünn besetzte Gewichtsmatrix über den
+    kumulierten Summen des Spektrums übersetzt: jede Bandsumme ist eine
+    Differenz zweier Einträge, egal wie viele Pixel das Band umfasst. Pro
+    Frame bleiben zwei np.cumsum und ein Matrix-Vektor-Produkt, danach werden
+    die (wenigen) Ausdrücke auf den Bandwerten ausgewertet.
+
+    Die Ergebnisse landen in einem Ringpuffer fester Größe (Streifenschreiber).
+    """
+
+    def __init__(self, definitions=(), capacity=600):
+        self.capacity = capacity
+        self.set_definitions(definitions)
+
+    def set_definitions(self, definitions):
+        """
+        Übernimmt Kanaldefinitionen [(Name, Ausdruck), ...]; wirft ValueError bei ungültigen Ausdrücken.
+        """
+        names, primitives, codes = [], [], []
+        for name, expression in definitions:
+            name = name.strip()
+            if not name.isidentifier() or name in PRIMITIVES or name in names:
+                raise ValueError(f"Ungültiger oder doppelter Kanalname: {name!r}")
+            try:
+                tree = ast.parse(expression.strip(), mode="eval")
+            except SyntaxError as e:
+                raise ValueError(f"Syntaxfehler in Kanal {name}: {e.msg}")
+            tree = ast.fix_missing_locations(_Compiler(primitives, names).visit(tree))
+            codes.append(compile(tree, f"<Kanal {name}>", "eval"))
+            names.append(name)
+        self.definitions = [(n, e.strip()) for n, e in definitions]
+        self.names = names
+        self.primitives = primitives
+        self._codes = codes
+        self._key = None
+        self.clear()
+
+    def clear(self):
+        """Leert den Verlauf."""
+        self.times = np.full(self.capacity, np.nan)
+        self.history = np.full((self.capacity, len(self.names)), np.nan)
+        self._head = 0
+        self._count = 0
+
+    def __len__(self):
+        return len(self.names)
+
+    @staticmethod
+    def parse(text):
+        """Liest Definitionen im Format "Name = Ausdruck" (eine je Zeile, # für Kommentare)."""
+        definitions = []
+        for line in text.splitlines():
+            line = line.split("#", 1)[0].strip()
+            if not line:
+                continue
+            if "=" not in line:
+                raise ValueError(f"Erwartet 'Name = Ausdruck': {line}")
+            name, expression = line.split("=", 1)
+            definitions.append((name.strip(), expression.strip()))
+        return definitions
+
+    def format(self):
+        return "\n".join(f"{n} = {e}" for n, e in self.definitions)
+
+    def to_list(self):
+        return [{"name": n, "expression": e} for n, e in self.definitions]
+
+    @classmethod
+    def from_list(cls, data):
+        try:
+            return cls([(d["name"], d["expression"]) for d in (data or [])])
+        except ValueError as e:
+            print(f"[WARNUNG] Kanaldefinitionen konnten nicht geladen werden: {e}")
+            return cls()
+
+    def compile(self, wavelengths):
+        """
+        Baut die Gewichtsmatrix für die Wellenlängen der Pixel (monoton).
+
+        Zeilen = Bandfunktionen, Spalten = [kumulierte Intensität (n + 1), kumulierte Intensität * dλ (n + 1)].
+        """
+        wavelengths = np.asarray(wavelengths, dtype=np.float64)
+        n = len(wavelengths)
+        self._step = np.abs(np.gradient(wavelengths)) if n > 1 else np.ones(n)
+        rows, cols, vals = [], [], []
+        used = np.zeros(n, dtype=bool)  # Pixel, die in irgendeine Bandfunktion eingehen
+
+        def band(a, b):
+            low, high = min(a, b), max(a, b)
+            inside = np.nonzero((wavelengths >= low) & (wavelengths <= high))[0]
+            if not len(inside):  # schmaler als ein Pixel: nächstes Pixel
+                inside = np.array([np.argmin(np.abs(wavelengths - 0.5 * (low + high)))])
+            used[inside[0]:inside[-1] + 1] = True
+            return int(inside[0]), int(inside[-1])
+
+        def pixel(r, i, weight):  # I[i] = C[i + 1] - C[i]
+            used[i] = True
+            rows.extend((r, r))
+            cols.extend((i + 1, i))
+            vals.extend((weight, -weight))
+
+        for r, (name, args) in enumerate(self.primitives):
+            if name in ("area", "net"):
+                i0, i1 = band(*args)
+                rows.extend((r, r))
+                cols.extend((n + 1 + i1 + 1, n + 1 + i0))
+                vals.extend((1.0, -1.0))
+                if name == "net":
+                    width = self._step[i0:i1 + 1].sum()
+                    pixel(r, i0, -0.5 * width)
+                    pixel(r, i1, -0.5 * width)
+            elif name in ("mean", "height"):
+                if name == "height":
+                    half = args[1] if len(args) > 1 else 1.0
+                    args = (args[0] - half, args[0] + half)
+                i0, i1 = band(*args)
+                rows.extend((r, r))
+                cols.extend((i1 + 1, i0))
+                vals.extend((1.0 / (i1 - i0 + 1), -1.0 / (i1 - i0 + 1)))
+            else:  # value
+                order = np.argsort(wavelengths)
+                position = np.interp(args[0], wavelengths[order], order.astype(np.float64))
+                i = int(np.clip(np.floor(position), 0, max(n - 2, 0)))
+                fraction = float(np.clip(position - i, 0.0, 1.0))
+                pixel(r, i, 1.0 - fraction)
+                if n > 1:
+                    pixel(r, i + 1, fraction)
+        self.weights = sparse.csr_matrix((vals, (rows, cols)), shape=(len(self.primitives), 2 * (n + 1)))
+        self._prefix = np.zeros(2 * (n + 1))
+        self._scratch = np.empty(n)
+        self.used_columns = np.nonzero(used)[0]
+
+    def columns(self, wavelengths, key):
+        """Pixelindizes, die für die Auswertung aller Kanäle gebraucht werden (Vereinigung der Bänder)."""
+        key = (key, len(wavelengths))
+        if key != self._key:
+            self.compile(wavelengths)
+            self._key = key
+        return self.used_columns
+
+    def evaluate(self, spectrum, wavelengths, key, timestamp=None):
+        """
+        Wertet alle Kanäle für ein Spektrum aus.
+
+        :param key: Kennung der Wellenlängenachse (z. B. Kalibrationsversion); bei Änderung wird neu übersetzt
+        :return: Kanalwerte, Form (Kanäle,)
+        """
+        spectrum = np.asarray(spectrum, dtype=np.float64)
+        key = (key, len(spectrum))
+        if key != self._key:
+            self.compile(wavelengths)
+            self._key = key
+        n = len(spectrum)
+        np.cumsum(spectrum, out=self._prefix[1:n + 1])
+        np.multiply(spectrum, self._step, out=self._scratch)
+        np.cumsum(self._scratch, out=self._prefix[n + 2:])
+        v = self.weights @ self._prefix
+
+        c = np.empty(len(self.names))
+        scope = {"__builtins__": {}, "v": v, "c": c}
+        with np.errstate(divide="ignore", invalid="ignore"):
+            for j, code in enumerate(self._codes):
+                try:
+                    c[j] = eval(code, scope)
+                except ZeroDivisionError:
+                    c[j] = np.nan
+
+        if timestamp is not None:
+            self.history[self._head] = c
+            self.times[self._head] = timestamp
+            self._head = (self._head + 1) % self.capacity
+            self._count = min(self._count + 1, self.capacity)
+        return c
+
+    def series(self):
+        """
+        Chronologisch sortierter Verlauf.
+
+        :return: (times, history) mit Formen (n,) und (n, Kanäle)
+        """
+        order = (self._head - self._count + np.arange(self._count)) % self.capacity
+        return self.times[order], self.history[order]
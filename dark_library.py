@@ -0,0 +1,178 @@
+import os
+
+import numpy as np
+
+
+def exposure_time(exposure):
+    """Belichtungszeit in s aus dem OpenCV-Belichtungswert (log2-Skala, z. B. -6 -> 1/64 s)."""
+    return 2.0 ** np.asarray(exposure, dtype=np.float64)
+
+
+class RegionAverager:
+    """
+    Mittelt Bilder (Dunkel- oder Flatbilder) im laufenden Betrieb (Summe + Anzahl).
+
+    Es wird nur der Ausschnitt region = (x, y, w, h) aufsummiert, die
+    einzelnen Vollbilder werden nicht aufbewahrt.
+    """
+
+    def __init__(self, region):
+        self.region = tuple(int(v) for v in region)
+        x, y, w, h = self.region
+        self.sum = np.zeros((h, w), dtype=np.float64)
+        self.count = 0
+
+    def add(self, frame):
+        x, y, w, h = self.region
+        self.sum += frame[y:y + h, x:x + w]
+        self.count += 1
+
+    def result(self):
+        return (self.sum / max(self.count, 1)).astype(np.float32)
+
+
+class DarkLibrary:
+    """
+    Bibliothek von Master-Dunkelbildern je (Belichtung, Gain, Auflösung).
+
+    Jeder Eintrag enthält nur den benötigten Bildausschnitt (ROI bzw. Spuren,
+    in Rohbild-Koordinaten ohne Spiegelung) und liegt als .npz im Verzeichnis
+    der Bibliothek. Für Belichtungen ohne eigenes Dunkelbild wird pixelweise
+    linear in der Belichtungszeit zwischen den beiden nächsten vorhandenen
+    Belichtungen inter-/extrapoliert (Offset + Dunkelstrom * t). Ergebnisse
+    werden je Anfrage zwischengespeichert, sodass im Live-Betrieb pro Frame nur
+    noch die Subtraktion auf dem Ausschnitt anfällt.
+    """
+
+    def __init__(self, directory="darks"):
+        self.directory = directory
+        self.entries = {}  # (exposure, gain, resolution) -> {"region", "path", "dark"}
+        self._cache = {}
+        if os.path.isdir(directory):
+            for name in sorted(os.listdir(directory)):
+                if name.endswith(".npz"):
+                    self._index(os.path.join(directory, name))
+
+    @staticmethod
+    def key(exposure, gain, resolution):
+        return float(exposure), float(gain), (int(resolution[0]), int(resolution[1]))
+
+    def _index(self, path):
+        try:
+            with np.load(path) as data:
+                key = self.key(data["exposure"], data["gain"], data["resolution"])
+                region = tuple(int(v) for v in data["region"])
+        except Exception as e:
+            print(f"[WARNUNG] Dunkelbild {path} konnte nicht gelesen werden: {e}")
+            return
+        self.entries[key] = {"region": region, "path": path, "dark": None}
+
+    def _dark(self, key):
+        entry = self.entries[key]
+        if entry["dark"] is None:
+            with np.load(entry["path"]) as data:
+                entry["dark"] = data["dark"].astype(np.float32)
+        return entry["dark"]
+
+    def add(self, exposure, gain, resolution, region, dark, frames=0):
+        """Speichert ein Master-Dunkelbild (Ausschnitt region) und ersetzt einen vorhandenen Eintrag."""
+        key = self.key(exposure, gain, resolution)
+        os.makedirs(self.directory, exist_ok=True)
+        path = os.path.join(self.directory,
+                            f"dark_e{key[0]:g}_g{key[1]:g}_{key[2][0]}x{key[2][1]}.npz")
+        np.savez_compressed(path, dark=dark, region=np.asarray(region), exposure=key[0], gain=key[1],
+                            resolution=np.asarray(key[2]), frames=frames)
+        self.entries[key] = {"region": tuple(int(v) for v in region), "path": path,
+                             "dark": np.asarray(dark, dtype=np.float32)}
+        self._cache = {}
+        return key
+
+    def capture(self, camera, region, num_frames=10, exposure=None, adaptive=None):
+        """
+        Nimmt ein Master-Dunkelbild mit der Kamera auf (gleitende Summe, nur Ausschnitt).
+
+        :param region: (x, y, w, h) in Rohbild-Koordinaten
+        :param exposure: Belichtungswert; None = aktuelle Einstellung
+        :param adaptive: AdaptiveAverager; mittelt bis zur Zielunsicherheit statt num_frames Bilder
+        """
+        if exposure is not None:
+            camera.set_exposure(exposure)
+        if adaptive is not None:
+            x, y, w, h = (int(v) for v in region)
+            resolution = None
+
+            def crop(frame):
+                nonlocal resolution
+                resolution = (frame.shape[1], frame.shape[0])
+                return frame[y:y + h, x:x + w]
+
+            dark = adaptive.acquire(camera.capture_frame, crop)
+            if dark is None:
+                return None
+            print(f"[INFO] Dunkelbild (Belichtung {camera.exposure:g}): {adaptive.summary()}")
+            return self.add(camera.exposure, camera.gain, resolution, region, dark, adaptive.frames)
+        builder = RegionAverager(region)
+        resolution = None
+        for _ in range(num_frames):
+            frame = camera.capture_frame()
+            if frame is None:
+                continue
+            resolution = (frame.shape[1], frame.shape[0])
+            builder.add(frame)
+        if not builder.count:
+            return None
+        return self.add(camera.exposure, camera.gain, resolution, builder.region, builder.result(), builder.count)
+
+    def master(self, key):
+        """(region, Dunkelbild) eines gespeicherten Eintrags."""
+        return self.entries[key]["region"], self._dark(key)
+
+    @staticmethod
+    def _contains(stored, region):
+        sx, sy, sw, sh = stored
+        x, y, w, h = region
+        return sx <= x and sy <= y and x + w <= sx + sw and y + h <= sy + sh
+
+    def _crop(self, key, region):
+        """Schneidet region aus dem Dunkelbild des Eintrags key aus (None, falls nicht enthalten)."""
+        stored = self.entries[key]["region"]
+        if not self._contains(stored, region):
+            return None
+        x, y, w, h = region
+        return self._dark(key)[y - stored[1]:y - stored[1] + h, x - stored[0]:x - stored[0] + w]
+
+    def get(self, exposure, gain, resolution, region):
+        """
+        Dunkelbild für den Ausschnitt region bei der gegebenen Belichtung (oder None).
+
+        Exakte Einträge werden direkt verwendet, sonst wird zwischen den beiden
+        nächsten Belichtungen mit gleichem Gain und gleicher Auflösung interpoliert.
+        """
+        key = self.key(exposure, gain, resolution)
+        region = tuple(int(v) for v in region)
+        cache_key = (key, region)
+        if cache_key in self._cache:
+            return self._cache[cache_key]
+
+        dark = None
+        if key in self.entries:
+            dark = self._crop(key, region)
+        if dark is None:
+            candidates = sorted((k for k, e in self.entries.items()
+                                 if k[1:] == key[1:] and self._contains(e["region"], region)),
+                                key=lambda k: abs(k[0] - key[0]))
+            below = [k for k in candidates if k[0] < key[0]]
+            above = [k for k in candidates if k[0] > key[0]]
+            if below and above:  # Interpolation bevorzugen
+                candidates = [below[0], above[0]]
+            if len(candidates) == 1:
+                dark = self._crop(candidates[0], region)
+            elif len(candidates) >= 2:
+                e1, e2 = candidates[:2]
+                d1, d2 = self._crop(e1, region), self._crop(e2, region)
+                t, t1, t2 = exposure_time([key[0], e1[0], e2[0]])
+                dark = np.maximum(d1 + (d2 - d1) * np.float32((t - t1) / (t2 - t1)), 0)
+        if dark is not None:
+            dark = np.ascontiguousarray(dark, dtype=np.float32)
+        self._cache[cache_key] = dark
+        return dark
@@ -0,0 +1,123 @@
+import numpy as np
+from peak_detection import PeakIndex
+from peak_tracker import PeakTracker
+
+
+class DriftMonitor:
+    """
+    Korrigiert die Wellenlängenkalibration während der Live-Messung.
+
+    Einige Referenzlinien werden mit einem PeakTracker verfolgt. Ihre aktuelle
+    Pixelposition p wird auf die Position beim Start (Referenzzustand) abgebildet:
+
+        p_ref = p + d0 + d1 * u,   u = (p - c) / s
+
+    d0 (Offset) und d1 (Skala) werden pro Frame per rekursiver kleinster Quadrate
+    (RLS mit Vergessensfaktor) nachgeführt; der Aufwand ist O(Linien) je Frame.
+    Die korrigierte Kalibration ist base(p_ref(p)). Eine neue Kalibrationsversion
+    entsteht erst, wenn sich die Korrektur irgendwo auf dem Detektor um mehr als
+    version_threshold Pixel gegenüber der letzten Version geändert hat.
+    """
+
+    def __init__(self, forgetting=0.98, noise=0.05, offset_range=5.0, scale_range=2.0,
+                 version_threshold=0.1, half_width=10):
+        self.forgetting = forgetting
+        self.noise_var = noise ** 2
+        self.prior = np.diag([offset_range ** 2, scale_range ** 2])
+        self.version_threshold = version_threshold
+        self.tracker = PeakTracker(half_width=half_width, capacity=2)
+        self.base = None
+        self.reference_pixels = np.empty(0)
+        self.theta = np.zeros(2)
+        self.published = np.zeros(2)
+
+    @property
+    def active(self):
+        return self.base is not None and self.tracker.count > 0
+
+    def start(self, spectrum, calibration, pixels=None, line_count=3):
+        """
+        Legt den Referenzzustand fest.
+
+        :param calibration: Polynom (np.polyval) der aktuell gültigen Kalibration
+        :param pixels: Pixelpositionen der Referenzlinien; ohne Angabe werden die
+                       line_count prominentesten Peaks des Spektrums verwendet
+        :return: Anzahl der verfolgten Linien
+        """
+        spectrum = np.asarray(spectrum, dtype=np.float64)
+        self.tracker.clear()
+        if pixels is None:
+            index = PeakIndex(spectrum)
+            order = np.argsort(index.prominences)[::-1][:line_count]
+            pixels = np.sort(index.positions[order])
+        for pixel in pixels:
+            self.tracker.add_peak(spectrum, pixel)
+        # Subpixelgenaue Startpositionen als Referenz
+        current = self.tracker.update(spectrum, 0.0)
+        valid = np.isfinite(current[:, 0])
+        self.reference_pixels = np.where(valid, current[:, 0], self.tracker.params[:, 1])
+
+        self.base = np.asarray(calibration, dtype=np.float64)
+        self.length = len(spectrum)
+        self.center = (self.length - 1) / 2
+        self.half_span = max(self.length / 2, 1.0)
+        self.theta = np.zeros(2)
+        self.published = np.zeros(2)
+        self.P = self.prior.copy()
+        return self.tracker.count
+
+    def stop(self):
+        self.tracker.clear()
+        self.base = None
+
+    def update(self, spectrum, timestamp):
+        """
+        Verfolgt die Referenzlinien und führt Offset/Skala nach.
+
+        :return: korrigiertes Kalibrationspolynom, falls eine neue Version fällig ist, sonst None
+        """
+        if not self.active or len(spectrum) != self.length:
+            return None
+        current = self.tracker.update(spectrum, timestamp)[:, 0]
+        valid = np.isfinite(current)
+        if not valid.any():
+            return None
+
+        # Vergessensfaktor einmal pro Frame, danach skalare RLS-Updates je Linie.
+        # Die Varianzen werden auf die Startunsicherheit begrenzt, damit die Skala
+        # bei nur einer sichtbaren Linie nicht "aufbläht" (Windup). Skaliert wird
+        # per D P D, so bleiben die Korrelationen und die Definitheit von P erhalten.
+        self.P /= self.forgetting
+        for p, p_ref in zip(current[valid], self.reference_pixels[valid]):
+            h = np.array([1.0, (p - self.center) / self.half_span])
+            Ph = self.P @ h
+            gain = Ph / (self.noise_var + h @ Ph)
+            self.theta += gain * ((p_ref - p) - h @ self.theta)
+            self.P -= np.outer(gain, Ph)
+        variances = np.diag(self.P)
+        shrink = np.sqrt(np.minimum(variances, np.diag(self.prior)) / variances)
+        self.P *= np.outer(shrink, shrink)
+
+        # Größte Änderung der Korrektur über den Detektor (linear -> Randwerte genügen)
+        delta = self.theta - self.published
+        if abs(delta[0]) + abs(delta[1]) * (self.length / 2) / self.half_span < self.version_threshold:
+            return None
+        self.published = self.theta.copy()
+        return self.corrected_calibration()
+
+    def corrected_calibration(self):
+        """Kalibrationspolynom base(p + d0 + d1 * (p - c) / s) für np.polyval."""
+        d0, d1 = self.published
+        slope = d1 / self.half_span
+        inner = np.poly1d([1.0 + slope, d0 - slope * self.center])
+        return np.poly1d(self.base)(inner).coeffs
+
+    @property
+    def offset(self):
+        """Aktuelle Verschiebung in Pixeln (Detektormitte)."""
+        return float(self.theta[0])
+
+    @property
+    def scale(self):
+        """Aktueller Skalenfaktor der Pixelachse."""
+        return float(1.0 + self.theta[1] / self.half_span)
@@ -0,0 +1,110 @@
+import collections
+import os
+import queue
+import threading
+import time
+
+import cv2
+import numpy as np
+from atomic_write import write_atomic
+
+
+class ExportService:
+    """
+    Export (CSV, JPG, Serien) in einem Hintergrund-Thread.
+
+    Die GUI übergibt nur Schnappschüsse (Kopien der Arrays bzw. das bereits
+    gerenderte Bild) und kehrt sofort zurück; geschrieben wird im Worker,
+    jeweils atomar über eine temporäre Datei. Meldungen über erledigte oder
+    fehlgeschlagene Aufträge holt die GUI mit poll() ab.
+    """
+
+    def __init__(self):
+        self.jobs = queue.Queue()
+        self.messages = collections.deque()
+        self._thread = None
+
+    @property
+    def pending(self):
+        return self.jobs.unfinished_tasks
+
+    def wait(self, timeout=None):
+        """Wartet, bis alle Aufträge erledigt sind; False, falls timeout (s) vorher abläuft."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self.jobs.all_tasks_done:
+            while self.jobs.unfinished_tasks:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self.jobs.all_tasks_done.wait(remaining)
+        return True
+
+    def _submit(self, description, work):
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._run, name="Export", daemon=True)
+            self._thread.start()
+        self.jobs.put((description, work))
+
+    def _run(self):
+        while True:
+            description, work = self.jobs.get()
+            try:
+                result = work()
+                self.messages.append(("INFO", f"{description}: {result}"))
+            except Exception as e:
+                self.messages.append(("FEHLER", f"{description} fehlgeschlagen: {e}"))
+            finally:
+                self.jobs.task_done()
+
+    def poll(self):
+        """Liefert alle neuen Meldungen [(Stufe, Text), ...]."""
+        items = []
+        while self.messages:
+            items.append(self.messages.popleft())
+        return items
+
+    @staticmethod
+    def _csv(path, data, header):
+        def write(f):
+            np.savetxt(f, data, delimiter=",", header=header, comments="", encoding="utf-8")
+        write_atomic(path, write)
+
+    def submit_csv(self, path, data, header):
+        """Schreibt ein 2D-Array als CSV; data wird hier kopiert (Schnappschuss)."""
+        data = np.array(data, copy=True)
+
+        def work():
+            self._csv(path, data, header)
+            return f"gespeichert unter {path}"
+
+        self._submit("CSV", work)
+
+    def submit_image(self, path, rgba):
+        """Kodiert ein gerendertes RGBA-Bild (z. B. canvas.buffer_rgba()) als JPG/PNG."""
+        rgba = np.array(rgba, copy=True)
+
+        def work():
+            ok, encoded = cv2.imencode(os.path.splitext(path)[1] or ".jpg", cv2.cvtColor(rgba, cv2.COLOR_RGBA2BGR))
+            if not ok:
+                raise ValueError("Bild konnte nicht kodiert werden")
+            write_atomic(path, lambda f: f.write(encoded.tobytes()))
+            return f"gespeichert unter {path}"
+
+        self._submit("Bild", work)
+
+    def submit_batch(self, directory, x_values, spectra, names, header):
+        """
+        Schreibt viele Spektren auf einmal, je Spektrum eine CSV-Datei (Wellenlänge, Intensität).
+
+        :param spectra: (Spektren, Punkte); names: Dateinamen ohne Endung
+        """
+        x_values = np.array(x_values, copy=True)
+        spectra = np.array(spectra, copy=True)
+        names = list(names)
+
+        def work():
+            for name, spectrum in zip(names, spectra):
+                self._csv(os.path.join(directory, f"{name}.csv"), np.column_stack((x_values, spectrum)), header)
+            return f"{len(names)} Spektren in {directory} gespeichert"
+
+        self._submit("Serienexport", work)
@@ -0,0 +1,99 @@
+import os
+
+import numpy as np
+from scipy.ndimage import uniform_filter1d
+from dark_library import RegionAverager
+
+
+class FlatField:
+    """
+    Flatfield-Korrektur (Pixelempfindlichkeit und Vignettierung entlang des Spalts).
+
+    Aus vielen Bildern einer gleichmäßig ausgeleuchteten Quelle wird ein
+    Master-Flat gemittelt. Das Lampenspektrum wird entfernt, indem jedes
+    Pixel durch das entlang der Dispersion geglättete Spaltenmittel geteilt
+    wird; übrig bleibt eine auf 1 normierte Gain-Karte des Ausschnitts.
+    Gespeichert wird direkt deren Kehrwert, sodass die Korrektur pro Frame
+    eine einzige Multiplikation vor der Zeilenreduktion ist.
+    """
+
+    def __init__(self, path="flat_field.npz"):
+        self.path = path
+        self.region = None
+        self.reciprocal = None
+        self.calibration_version = None
+        if os.path.exists(path):
+            try:
+                with np.load(path) as data:
+                    self.region = tuple(int(v) for v in data["region"])
+                    self.reciprocal = data["reciprocal"].astype(np.float32)
+                    version = int(data["calibration_version"])
+                    self.calibration_version = version if version >= 0 else None
+            except Exception as e:
+                print(f"[WARNUNG] Flatfield konnte nicht geladen werden: {e}")
+
+    @property
+    def ready(self):
+        return self.reciprocal is not None
+
+    @staticmethod
+    def builder(region):
+        """Streaming-Mittelung der Flat-Bilder über den Ausschnitt region = (x, y, w, h)."""
+        return RegionAverager(region)
+
+    def build(self, master, region, smooth=31, min_gain=0.1, calibration_version=None):
+        """
+        Berechnet Gain-Karte und Kehrwert aus einem gemittelten Flat und speichert sie.
+
+        :param smooth: Fensterbreite (Spalten) für das geglättete Lampenspektrum
+        :param min_gain: Pixel mit kleinerem Gain gelten als defekt und bleiben unkorrigiert
+        """
+        master = np.asarray(master, dtype=np.float64)
+        spectrum = uniform_filter1d(master.mean(axis=0), smooth, mode="nearest")
+        gain = np.divide(master, spectrum, out=np.zeros_like(master), where=spectrum > 0)
+        usable = gain > min_gain * np.median(gain)
+        gain /= gain[usable].mean()
+        reciprocal = np.ones_like(gain)
+        np.divide(1.0, gain, out=reciprocal, where=usable & (gain > min_gain))
+        self.region = tuple(int(v) for v in region)
+        self.reciprocal = reciprocal.astype(np.float32)
+        self.calibration_version = calibration_version
+        np.savez_compressed(self.path, region=np.asarray(self.region), reciprocal=self.reciprocal,
+                            calibration_version=-1 if calibration_version is None else calibration_version)
+        return gain
+
+    def apply(self, block, origin):
+        """
+        Multipliziert einen Bildausschnitt mit dem Kehrwert der Gain-Karte.
+
+        :param origin: (x, y) des Ausschnitts im Bild
+        :return: korrigierter Ausschnitt; unverändert, falls die Karte ihn nicht abdeckt
+        """
+        if not self.covers(origin, block.shape):
+            return block
+        sx, sy = self.region[:2]
+        x, y = origin
+        h, w = block.shape
+        return block * self.reciprocal[y - sy:y - sy + h, x - sx:x - sx + w]
+
+    def covers(self, origin, shape):
+        """True, wenn die Karte den Ausschnitt (origin, shape) vollständig abdeckt."""
+        if not self.ready:
+            return False
+        sx, sy, sw, sh = self.region
+        x, y = origin
+        h, w = shape
+        return sx <= x and sy <= y and x + w <= sx + sw and y + h <= sy + sh
+
+    def gains(self, origin, shape, columns):
+        """
+        Kehrwert der Gain-Karte für einzelne Spalten eines Ausschnitts (Kinetik-Modus).
+
+        :param columns: Spaltenindizes innerhalb des Ausschnitts
+        :return: Array (Zeilen, len(columns)) oder None, wenn apply() den Ausschnitt unverändert ließe
+        """
+        if not self.covers(origin, shape):
+            return None
+        sx, sy = self.region[:2]
+        x, y = origin
+        return self.reciprocal[y - sy:y - sy + shape[0], x - sx + np.asarray(columns)]
@@ -5,9 +5,9 @@ import numpy as np
 import matplotlib as mpl
 import matplotlib.pyplot as plt
 import pandas as pd
-from scipy.optimize import curve_fit
 import numpy as np
 import datetime
+import time
 from PyQt5.QtWidgets import QFileDialog
 from PyQt5.QtWidgets import QMainWindow, QWidget,  QHBoxLayout, QVBoxLayout, QPushButton
 from PyQt5.QtGui import QImage, QPixmap
@@ -15,9 +15,29 @@ from PyQt5.QtCore import QTimer, Qt
 from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg as FigureCanvas
 from camera import Camera
 from roi_dialog import ROIDialog
+from roi_model import TrackSet
 from intensity_settings import IntensitySettingsDialog
 from camera_settings import CameraSettingsDialog
 from calibration_dialog import CalibrationDialog
+from peak_fit import fit_multi_peak, multi_peak_model
+from peak_tracker import PeakTracker
+from drift_monitor import DriftMonitor
+from resampling import Resampler, uniform_grid
+from slit_correction import SlitCorrection
+from extraction import OptimalExtractor
+from flat_field import FlatField
+from defects import DefectMap, SpikeRejector
+from binning import bin_rows, display_envelope
+from averaging import SpectrumAverager, AdaptiveAverager
+from waterfall import WaterfallBuffer
+from channels import ChannelEngine
+from channel_dialog import ChannelDialog
+from recorder import Recorder
+from kinetics import ColumnReduction, KineticsAcquisition
+from trigger import ChangeTrigger
+from export import ExportService
+from sidecar import SidecarStore
+from reference_library import ReferenceLibrary
 from scipy.signal import find_peaks
 from matplotlib.patches import Rectangle
 
@@ -31,9 +51,13 @@ mpl.rcParams['ytick.color'] = 'white'
 mpl.rcParams['text.color'] = 'white'
 mpl.rcParams['figure.autolayout'] = True
 
+# Farben der Spuren im Mehrspur-Modus
+TRACK_COLORS = ['white', 'cyan', 'orange', 'lime', 'magenta', 'yellow']
+
 class SpectrometerApp(QMainWindow):
     def __init__(self):
         super().__init__()
+        self.sidecars = SidecarStore()  # große Arrays als .npy neben settings.json
         self.load_settings()
         # Lade Einstellungen, falls vorhanden:
         self.camera = Camera()
@@ -43,23 +67,99 @@ class SpectrometerApp(QMainWindow):
         self.auto_scale_intensity = True
         self.fixed_intensity_max = 255
         self.mirror = True
-        self.low_res_mode = False
-        self.update_interval = 200  # Standard-Update-Intervall in ms, wenn low_res_mode aktiviert wird
+        if not hasattr(self, "low_res_mode"):
+            self.low_res_mode = False
+            self.update_interval = 200  # Standard-Update-Intervall in ms, wenn low_res_mode aktiviert wird
+        if not hasattr(self, "low_res_bin"):
+            self.low_res_bin = 4  # vertikaler Binning-Faktor im Low-Res-Modus (Spalten bleiben voll aufgelöst)
         self.timer = QTimer()
         self.timer.timeout.connect(self.update_frame)
         self.live_update = True
         self.update_timer_interval()
         self.hdr_result = None
         self.hdr_num_frames = 5
-        self.relative_spectrum_enabled = False  # Quotientenbildung aktiv?
-        self.normalize_relative_spectrum = False  # Quotient normieren (max = 1)?
+        if not hasattr(self, "relative_spectrum_enabled"):
+            self.relative_spectrum_enabled = False  # Quotientenbildung aktiv?
+            self.normalize_relative_spectrum = False  # Quotient normieren (max = 1)?
         self.canvas.mpl_connect("button_press_event", self.on_fit_click)
         self.canvas.mpl_connect("scroll_event", self.on_scroll_zoom)
         self.fit_text = None
         self.fit_line, = self.ax.plot([], [], "g--", label="Fit")
         self.peak_marker, = self.ax.plot([], [], "rx", markersize=10)
+        self.peak_tracker = PeakTracker()
+        self.tracking_enabled = False
+        self.track_lines = []
+        if not hasattr(self, "fit_profile"):
+            self.fit_profile = "gauss"  # "gauss" oder "voigt" für den Klick-Fit
+        self.drift_monitor = DriftMonitor()
+        if not hasattr(self, "drift_line_count"):
+            self.drift_line_count = 3  # Anzahl Referenzlinien für die Drift-Korrektur
+        self.resampler = Resampler()
+        if not hasattr(self, "resample_step"):
+            self.resample_step = 0.0  # Exportraster in nm (0 = native Pixelachse)
+            self.resample_flux = False  # flusserhaltend umverteilen statt interpolieren
+        if not hasattr(self, "slit_correction"):
+            self.slit_correction = SlitCorrection()
+            self.slit_correction_enabled = False
+        self.optimal_extractor = OptimalExtractor()
+        if not hasattr(self, "optimal_extraction_enabled"):
+            self.optimal_extraction_enabled = False  # profilgewichtete statt einfacher Spaltensumme
+        if not hasattr(self, "tracks"):
+            self.tracks = TrackSet()  # benannte Spuren (z. B. Fasern) für den Mehrspur-Modus
+            self.multitrack_enabled = False
+        self.track_spectra = None  # (Spuren, Spalten) im Mehrspur-Modus, sonst None
+        self.flat_field = FlatField()
+        if not hasattr(self, "flat_field_enabled"):
+            self.flat_field_enabled = False
+        self.defect_map = DefectMap()
+        self.spike_rejector = SpikeRejector()
+        if not hasattr(self, "defect_correction_enabled"):
+            self.defect_correction_enabled = False  # Hotpixel aus der Defektkarte reparieren
+            self.spike_rejection_enabled = False  # zeitliche Spike-Unterdrückung (Median der letzten Frames)
+        if not hasattr(self, "averaging_mode"):
+            self.averaging_mode = "off"  # "off", "boxcar", "ema" oder "welford"
+            self.averaging_window = 10
+            self.averaging_alpha = 0.1
+            self.show_std_error = True  # Standardfehler als Band um das gemittelte Spektrum
+        self.averager = SpectrumAverager(self.averaging_mode, self.averaging_window, self.averaging_alpha)
+        self.spectrum_error = None  # Standardfehler je Pixel (bzw. je Spur und Pixel) oder None
+        if not hasattr(self, "waterfall_rows"):
+            self.waterfall_rows = 300  # Anzahl Spektren im Wasserfall
+        self.waterfall = WaterfallBuffer(self.waterfall_rows)
+        self.waterfall_enabled = False
+        self.waterfall_image = None
+        if not hasattr(self, "channels"):
+            self.channels = ChannelEngine()  # benannte Bandausdrücke, je Frame ausgewertet
+            self.channels_enabled = False
+            self.record_spectra = False  # Spektren zusätzlich zu den Kanälen aufzeichnen
+        if not hasattr(self, "trigger_enabled"):
+            self.trigger_enabled = False  # nur bei Änderung aufzeichnen
+            self.trigger_threshold = 0.02  # relative Änderung gegenüber dem zuletzt gespeicherten Frame
+            self.trigger_pre = 10  # Vorlauf-Frames, die bei einem Ereignis mitgeschrieben werden
+            self.trigger_heartbeat = 60.0  # s; spätestens dann wird auch ohne Änderung geschrieben
+        self.trigger = ChangeTrigger()
+        self.channel_canvas.setVisible(self.channels_enabled)
+        self.channel_values = None
+        self.channel_lines = []
+        self.recorder = Recorder()
+        self.kinetics = None  # KineticsAcquisition, solange der Kinetik-Modus läuft
+        self.kinetics_timer = QTimer()
+        self.kinetics_timer.timeout.connect(self.drain_kinetics)
+        self.exporter = ExportService()  # CSV/JPG/Serien im Hintergrund schreiben
+        self.export_timer = QTimer()
+        self.export_timer.timeout.connect(self.show_export_messages)
+        self.export_timer.start(250)
+        if not hasattr(self, "adaptive_enabled"):
+            self.adaptive_enabled = False  # HDR/Dunkelbilder bis zur Zielgenauigkeit statt fester Bildzahl mitteln
+            self.adaptive_snr = 100.0  # Ziel-SNR des Spektrums (bzw. am ersten verfolgten Peak)
+            self.adaptive_dark_error = 0.5  # Ziel-Standardfehler der Dunkelbilder in Grauwerten
+            self.adaptive_time_limit = 10.0  # s je Belichtungsstufe bzw. Dunkelbild
+            self.adaptive_max_frames = 500
 
-        self.reference_spectrum = None  # Hier wird das aufgenommene Referenzspektrum gespeichert
+        if not hasattr(self, "references"):
+            self.references = ReferenceLibrary()  # benannte Referenzspektren für die Quotientenbildung
+        self.reference_capture = None  # laufende Referenzaufnahme (Name, Mittelung, Bildzahl, Rückruf)
+        self.relative_buffer = None  # Ausgabepuffer des Quotienten (wird je Frame überschrieben)
         self.fps = 1#self.camera.cap.get(cv2.CAP_PROP_FPS) # Aktuelle FPS, falls keine Einstellung vorhanden ist
         self.roi = (0, 470, 1920, 150)
         self.setWindowTitle("USB-Spektrometer GUI")
@@ -81,6 +181,9 @@ class SpectrometerApp(QMainWindow):
         self.btn_save_image = QPushButton("JPG speichern")
         self.btn_save_image.clicked.connect(self.save_spectrum_as_jpg)
         button_layout.addWidget(self.btn_save_image)
+        self.btn_export_history = QPushButton("Verlauf exportieren")
+        self.btn_export_history.clicked.connect(self.export_history)
+        button_layout.addWidget(self.btn_export_history)
         self.btn_roi = QPushButton("ROI einstellen")
         self.btn_roi.clicked.connect(self.open_roi_dialog)
         button_layout.addWidget(self.btn_roi)
@@ -99,6 +202,24 @@ class SpectrometerApp(QMainWindow):
         self.btn_relative = QPushButton("Relativspektrum")
         self.btn_relative.clicked.connect(self.open_relative_spectrum_dialog)
         button_layout.addWidget(self.btn_relative)
+        self.btn_tracking = QPushButton("Peak-Tracking ein/aus")
+        self.btn_tracking.clicked.connect(self.toggle_peak_tracking)
+        button_layout.addWidget(self.btn_tracking)
+        self.btn_drift = QPushButton("Drift-Monitor ein/aus")
+        self.btn_drift.clicked.connect(self.toggle_drift_monitor)
+        button_layout.addWidget(self.btn_drift)
+        self.btn_waterfall = QPushButton("Wasserfall ein/aus")
+        self.btn_waterfall.clicked.connect(self.toggle_waterfall)
+        button_layout.addWidget(self.btn_waterfall)
+        self.btn_channels = QPushButton("Kanäle")
+        self.btn_channels.clicked.connect(self.open_channel_dialog)
+        button_layout.addWidget(self.btn_channels)
+        self.btn_record = QPushButton("Aufzeichnung starten")
+        self.btn_record.clicked.connect(self.toggle_recording)
+        button_layout.addWidget(self.btn_record)
+        self.btn_kinetics = QPushButton("Kinetik-Modus ein/aus")
+        self.btn_kinetics.clicked.connect(self.toggle_kinetics)
+        button_layout.addWidget(self.btn_kinetics)
         button_layout.addStretch()
         main_layout.addLayout(button_layout, 1)
         self.btn_save_settings = QPushButton("Einstellungen speichern")
@@ -115,6 +236,27 @@ class SpectrometerApp(QMainWindow):
         self.canvas.mpl_connect("button_release_event", self.on_mouse_release)
         spectrum_layout = QVBoxLayout()
         spectrum_layout.addWidget(self.canvas)
+        # Verlauf der verfolgten Peaks (nur sichtbar, wenn Tracking aktiv)
+        self.track_figure, self.track_ax = plt.subplots()
+        self.track_canvas = FigureCanvas(self.track_figure)
+        self.track_canvas.figure.set_facecolor(self.bg_color)
+        self.track_ax.set_facecolor(self.bg_color)
+        self.track_canvas.setVisible(False)
+        spectrum_layout.addWidget(self.track_canvas)
+        # Wasserfall: zeitlicher Verlauf der Spektren (nur sichtbar, wenn aktiviert)
+        self.waterfall_figure, self.waterfall_ax = plt.subplots()
+        self.waterfall_canvas = FigureCanvas(self.waterfall_figure)
+        self.waterfall_canvas.figure.set_facecolor(self.bg_color)
+        self.waterfall_ax.set_facecolor(self.bg_color)
+        self.waterfall_canvas.setVisible(False)
+        spectrum_layout.addWidget(self.waterfall_canvas)
+        # Streifenschreiber der Kanäle (nur sichtbar, wenn Kanäle aktiv)
+        self.channel_figure, self.channel_ax = plt.subplots()
+        self.channel_canvas = FigureCanvas(self.channel_figure)
+        self.channel_canvas.figure.set_facecolor(self.bg_color)
+        self.channel_ax.set_facecolor(self.bg_color)
+        self.channel_canvas.setVisible(False)
+        spectrum_layout.addWidget(self.channel_canvas)
         main_layout.addLayout(spectrum_layout, 3)
 
         container = QWidget()
@@ -129,14 +271,22 @@ class SpectrometerApp(QMainWindow):
     def load_csv_and_display(self):
         filename, _ = QFileDialog.getOpenFileName(self, "CSV-Datei laden", "", "CSV Files (*.csv)")
         if filename:
-            df = pd.read_csv(filename)
-            if "Wavelength" in df.columns and "Intensity" in df.columns:
+            df = pd.read_csv(filename, comment="#")
+            channels = [c for c in df.columns if c != "Wavelength"]
+            if "Wavelength" in df.columns and channels:
                 wavelength = df["Wavelength"].to_numpy()
-                intensity = df["Intensity"].to_numpy()
+                # Einkanalige Dateien haben "Intensity", Mehrspur-Dateien eine Spalte je Spur
+                intensity = df["Intensity"].to_numpy() if "Intensity" in df.columns else df[channels[0]].to_numpy()
                 self.loaded_spectrum = (wavelength, intensity)
                 self.live_update = False
                 self.ax.clear()
-                self.ax.plot(wavelength, intensity, color='cyan')
+                if "Intensity" in df.columns:
+                    self.ax.plot(wavelength, intensity, color='cyan')
+                else:
+                    for i, name in enumerate(channels):
+                        self.ax.plot(wavelength, df[name].to_numpy(), color=TRACK_COLORS[i % len(TRACK_COLORS)],
+                                     label=name)
+                    self.ax.legend(loc="upper right", fontsize=8)
                 self.ax.set_xlabel("Wellenlänge (nm)")
                 self.ax.set_ylabel("Intensität")
                 self.canvas.draw()
@@ -156,6 +306,44 @@ class SpectrometerApp(QMainWindow):
             self.roi = tuple(settings.get("roi", [0, 470, 1920, 150]))
             self.low_res_mode = settings.get("low_res_mode", False)
             self.update_interval = settings.get("update_interval", 200)
+            self.low_res_bin = settings.get("low_res_bin", 4)
+            self.fit_profile = settings.get("fit_profile", "gauss")
+            self.drift_line_count = settings.get("drift_line_count", 3)
+            self.resample_step = settings.get("resample_step", 0.0)
+            self.resample_flux = settings.get("resample_flux", False)
+            self.slit_correction = SlitCorrection.from_dict(settings.get("slit_correction"))
+            self.slit_correction_enabled = settings.get("slit_correction_enabled", False)
+            self.optimal_extraction_enabled = settings.get("optimal_extraction_enabled", False)
+            self.tracks = TrackSet.from_list(settings.get("tracks"))
+            self.multitrack_enabled = settings.get("multitrack_enabled", False)
+            self.flat_field_enabled = settings.get("flat_field_enabled", False)
+            self.defect_correction_enabled = settings.get("defect_correction_enabled", False)
+            self.spike_rejection_enabled = settings.get("spike_rejection_enabled", False)
+            self.averaging_mode = settings.get("averaging_mode", "off")
+            self.averaging_window = settings.get("averaging_window", 10)
+            self.averaging_alpha = settings.get("averaging_alpha", 0.1)
+            self.show_std_error = settings.get("show_std_error", True)
+            self.adaptive_enabled = settings.get("adaptive_enabled", False)
+            self.adaptive_snr = settings.get("adaptive_snr", 100.0)
+            self.adaptive_dark_error = settings.get("adaptive_dark_error", 0.5)
+            self.adaptive_time_limit = settings.get("adaptive_time_limit", 10.0)
+            self.adaptive_max_frames = settings.get("adaptive_max_frames", 500)
+            self.waterfall_rows = settings.get("waterfall_rows", 300)
+            self.channels = ChannelEngine.from_list(settings.get("channels"))
+            self.channels_enabled = settings.get("channels_enabled", False)
+            self.record_spectra = settings.get("record_spectra", False)
+            self.trigger_enabled = settings.get("trigger_enabled", False)
+            self.trigger_threshold = settings.get("trigger_threshold", 0.02)
+            self.trigger_pre = settings.get("trigger_pre", 10)
+            self.trigger_heartbeat = settings.get("trigger_heartbeat", 60.0)
+            self.relative_spectrum_enabled = settings.get("relative_spectrum_enabled", False)
+            self.normalize_relative_spectrum = settings.get("normalize_relative_spectrum", False)
+            # Große Arrays liegen als Memory-Map in Binärdateien, settings.json enthält nur den Verweis
+            self.references = ReferenceLibrary.from_list(settings.get("references"), self.sidecars,
+                                                         settings.get("active_reference"))
+            legacy = self.sidecars.get("reference_spectrum", settings.get("reference_spectrum"))
+            if legacy is not None and not len(self.references):
+                self.references.add("Referenz", legacy)  # einzelne Referenz älterer Versionen übernehmen
             # Kameraeinstellungen:
             cam_settings = settings.get("camera", {})
             chosen_cam = cam_settings.get("chosen_cam", None)
@@ -171,6 +359,7 @@ class SpectrometerApp(QMainWindow):
             self.camera.hdr_min_exposure = cam_settings.get("hdr_min_exposure", self.camera.hdr_min_exposure)
             self.camera.hdr_max_exposure = cam_settings.get("hdr_max_exposure", self.camera.hdr_max_exposure)
             self.camera.sensitivity_factors = cam_settings.get("sensitivity_factors", self.camera.sensitivity_factors)
+            self.camera.linearize = cam_settings.get("linearize", self.camera.linearize) and self.camera.response.ready
             self.camera.apply_settings()
 
             print("Einstellungen geladen.")
@@ -186,6 +375,36 @@ class SpectrometerApp(QMainWindow):
             "roi": self.roi,  # als Tupel oder Liste
             "low_res_mode": self.low_res_mode,
             "update_interval": self.update_interval,
+            "low_res_bin": self.low_res_bin,
+            "fit_profile": self.fit_profile,
+            "drift_line_count": self.drift_line_count,
+            "resample_step": self.resample_step,
+            "resample_flux": self.resample_flux,
+            "slit_correction": self.slit_correction.to_dict(),
+            "slit_correction_enabled": self.slit_correction_enabled,
+            "optimal_extraction_enabled": self.optimal_extraction_enabled,
+            "tracks": self.tracks.to_list(),
+            "multitrack_enabled": self.multitrack_enabled,
+            "flat_field_enabled": self.flat_field_enabled,
+            "defect_correction_enabled": self.defect_correction_enabled,
+            "spike_rejection_enabled": self.spike_rejection_enabled,
+            "averaging_mode": self.averaging_mode,
+            "averaging_window": self.averaging_window,
+            "averaging_alpha": self.averaging_alpha,
+            "show_std_error": self.show_std_error,
+            "adaptive_enabled": self.adaptive_enabled,
+            "adaptive_snr": self.adaptive_snr,
+            "adaptive_dark_error": self.adaptive_dark_error,
+            "adaptive_time_limit": self.adaptive_time_limit,
+            "adaptive_max_frames": self.adaptive_max_frames,
+            "waterfall_rows": self.waterfall_rows,
+            "channels": self.channels.to_list(),
+            "channels_enabled": self.channels_enabled,
+            "record_spectra": self.record_spectra,
+            "trigger_enabled": self.trigger_enabled,
+            "trigger_threshold": self.trigger_threshold,
+            "trigger_pre": self.trigger_pre,
+            "trigger_heartbeat": self.trigger_heartbeat,
             # Kameraeinstellungen:
             "camera": {
                 "cams": self.camera.cams,
@@ -199,32 +418,35 @@ class SpectrometerApp(QMainWindow):
                 "hdr_min_exposure": self.camera.hdr_min_exposure,
                 "hdr_max_exposure": self.camera.hdr_max_exposure,
                 "sensitivity_factors": self.camera.sensitivity_factors,
+                "linearize": self.camera.linearize,
             },
             # Optional: Falls du Wellenlängen-Limits festlegst:
             "wavelength_min": getattr(self, "wavelength_min", 400),
             "wavelength_max": getattr(self, "wavelength_max", 700),
             "relative_spectrum_enabled": self.relative_spectrum_enabled,
             "normalize_relative_spectrum": self.normalize_relative_spectrum,
-            # Referenzspektrum als Liste abspeichern:
-            "reference_spectrum": self.reference_spectrum.tolist() if self.reference_spectrum is not None else None,
+            # Referenzbibliothek; die Spektren liegen als Binärdateien (Verweis über den Inhalts-Hash):
+            "references": self.references.to_list(self.sidecars),
+            "active_reference": self.references.active,
         }
         with open("settings.json", "w") as f:
             json.dump(settings, f, indent=4)
+        self.sidecars.prune([item[key] for item in settings["references"] for key in ("spectrum", "reciprocal")])
         print("Einstellungen gespeichert.")
     def update_timer_interval(self):
         if self.live_update:
             self.timer.setInterval(self.integration_time if not self.low_res_mode else self.update_interval)
             self.timer.start()
 
-    def gauss(self, x, A, x0, sigma, C):
-        return A * np.exp(-0.5 * ((x - x0) / sigma) ** 2) + C
-
     def fwhm_from_sigma(self, sigma):
         return 2.354820045 * sigma
 
     def on_fit_click(self, event):
         if event.inaxes != self.ax or event.xdata is None:
             return
+        if self.tracking_enabled:
+            self.on_tracking_click(event)
+            return
         self.live_update = False
         if hasattr(self, "loaded_spectrum") and self.loaded_spectrum is not None:
             xdata, ydata = self.loaded_spectrum
@@ -250,35 +472,36 @@ class SpectrometerApp(QMainWindow):
         xlabel = "Wellenlänge (nm)"
 
         try:
-            p0 = [y.max() - y.min(), x[np.argmax(y)], (x.max() - x.min()) / 6, np.median(y)]
-            popt, _ = curve_fit(self.gauss, x, y, p0=p0, maxfev=2000)
-            A, x0, sigma, C = popt
+            # Mehrlinien-Fit: Linienzahl wird im Fenster automatisch bestimmt
+            components, baseline = fit_multi_peak(x, y, profile=self.fit_profile)
             x_fit = np.linspace(x.min(), x.max(), 200)
-            y_fit = self.gauss(x_fit, *popt)
-            y0 = self.gauss(x0, *popt)
+            y_fit = multi_peak_model(x_fit, components, baseline)
+            x0 = components[:, 1]
+            y0 = multi_peak_model(x0, components, baseline)
             self.fit_line.set_data(x_fit, y_fit)
-            self.peak_marker.set_data([x0], [self.gauss(x0, *popt)])
-            fwhm = self.fwhm_from_sigma(sigma)
-            txt = f"Peak: {x0:.2f}, FWHM: {fwhm:.2f}"
+            self.peak_marker.set_data(x0, y0)
+            txt = "\n".join(f"Peak: {c:.2f}, FWHM: {self.fwhm_from_sigma(s):.2f}"
+                             for c, s in components[:, 1:3]) or "Kein Peak im Fenster"
         except Exception as e:
             coeffs = np.polyfit(x, y, 2)
             a, b, c = coeffs
             x0 = -b / (2 * a)
             y0 = np.polyval(coeffs, x0)
+            x_fit, y_fit = [], []
             self.fit_line.set_data([], [])
             self.peak_marker.set_data([x0], [y0])
             txt = f"Peak (Parabel): {x0:.2f}"
 
-        if self.fit_text:
-            self.fit_text.set_text("")
-
+        self.ax.clear()
         self.fit_text = self.ax.text(0.02, 0.95, txt, transform=self.ax.transAxes,
                                      va="top", color="yellow")
-        self.ax.clear()
         self.ax.plot(xdata, ydata, color=plotColor, label="Spektrum")
         if len(x_fit) > 0:
             self.ax.plot(x_fit, y_fit, "g--", label="Fit")
-        self.ax.plot([x0], [y0], "rx", label="Peak")
+            if len(components) > 1:
+                for component in components:
+                    self.ax.plot(x_fit, multi_peak_model(x_fit, component, baseline), ":", color="green")
+        self.ax.plot(np.atleast_1d(x0), np.atleast_1d(y0), "rx", label="Peak")
 
         self.ax.set_xlabel(xlabel)
         self.ax.set_ylabel("Intensität")
@@ -306,53 +529,103 @@ class SpectrometerApp(QMainWindow):
         self.ax.autoscale_view(scaley=True)
         self.canvas.draw()
 
-    def save_spectrum_to_csv(self):
-        # Stelle sicher, dass ein Spektrum (self.spectrum_line) vorliegt:
-        if not hasattr(self, "spectrum_line") or self.spectrum_line is None:
-            print("Kein Spektrum vorhanden!")
-            return
+    def export_arrays(self, intensities):
+        """
+        Wellenlängenachse und Intensitäten für den Export (optional Raster, Wellenlängenbereich).
 
-        # Falls Kalibrationsdaten vorhanden sind, berechne die Wellenlängen.
-        if self.camera.calibration_data is not None:
-            x_values = np.polyval(self.camera.calibration_data, np.arange(len(self.spectrum_line)))
-        else:
-            x_values = np.arange(len(self.spectrum_line))
+        :param intensities: Spektrum (Punkte,) oder mehrere Spektren (n, Punkte)
+        """
+        x_values = self.wavelength_axis(np.shape(intensities)[-1])
+        several = np.ndim(intensities) == 2
 
-        intensities = self.spectrum_line
+        # Optional auf ein gleichmäßiges Wellenlängenraster umrechnen (vergleichbar über Kalibrationen)
+        if self.camera.calibration_data is not None and self.resample_step > 0:
+            grid = uniform_grid(getattr(self, "wavelength_min", 400), getattr(self, "wavelength_max", 700),
+                                self.resample_step)
+            try:
+                intensities = self.resampler.resample(intensities, self.camera.calibration_data, grid,
+                                                      flux_conserving=self.resample_flux)
+                valid = np.isfinite(intensities).all(axis=0) if several else np.isfinite(intensities)
+                x_values, intensities = grid[valid], intensities[..., valid]
+            except ValueError as e:
+                print(f"[WARNUNG] Umrechnung auf Raster nicht möglich: {e}")
 
         # Falls der Benutzer einen spezifischen Wellenlängenbereich eingestellt hat, filtere die Daten.
         if hasattr(self, 'wavelength_min') and hasattr(self, 'wavelength_max'):
             mask = (x_values >= self.wavelength_min) & (x_values <= self.wavelength_max)
             x_values = x_values[mask]
-            intensities = intensities[mask]
+            intensities = intensities[..., mask]
+        return x_values, intensities
 
-        # Kombiniere die Daten in ein 2D-Array (zwei Spalten: Wellenlänge, Intensität)
-        data = np.column_stack((x_values, intensities))
+    def export_header(self, columns):
+        if self.relative_spectrum_enabled and self.references.current is not None:
+            columns = (f"# reference: {self.references.active} "
+                       f"(version {self.references.current['version']})\n" + columns)
+        if self.camera.calibration_version is not None:
+            return f"# calibration_version: {self.camera.calibration_version}\n" + columns
+        return columns
+
+    def save_spectrum_to_csv(self):
+        # Stelle sicher, dass ein Spektrum (self.spectrum_line) vorliegt:
+        if not hasattr(self, "spectrum_line") or self.spectrum_line is None:
+            print("Kein Spektrum vorhanden!")
+            return
+
+        # Schnappschuss vor dem Dialog: der Live-Betrieb läuft währenddessen weiter
+        # Im Mehrspur-Modus eine Spalte je Spur
+        multitrack = getattr(self, "track_spectra", None) is not None
+        x_values, intensities = self.export_arrays(self.track_spectra if multitrack else self.spectrum_line)
+
+        # Kombiniere die Daten in ein 2D-Array (Spalten: Wellenlänge, Intensität bzw. eine je Spur)
+        data = np.column_stack((x_values, np.atleast_2d(intensities).T))
+        columns = "Wavelength," + (",".join(self.tracks.names) if multitrack else "Intensity")
 
         # Erzeuge einen Default-Dateinamen mit Zeitstempel:
-        import datetime
         timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
         default_filename = f"spectrum_{timestamp}.csv"
 
         # Öffne einen Save-Dialog:
-        from PyQt5.QtWidgets import QFileDialog
         filename, _ = QFileDialog.getSaveFileName(self, "Spektrum speichern", default_filename, "CSV Files (*.csv)")
         if filename:
-            np.savetxt(filename, data, delimiter=",", header="Wavelength,Intensity", comments="")
-            print(f"Spektrum gespeichert unter {filename}")
+            # Geschrieben wird im Hintergrund, die Meldung erscheint in der Statusleiste
+            self.exporter.submit_csv(filename, data, self.export_header(columns))
 
     def save_spectrum_as_jpg(self):
-        from PyQt5.QtWidgets import QFileDialog
         # Erzeuge einen Default-Dateinamen mit Zeitstempel
-        import datetime
         timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
         default_filename = f"spectrum_{timestamp}.jpg"
+        # Schnappschuss des bereits gezeichneten Plots; kodiert und geschrieben wird im Hintergrund
+        image = np.asarray(self.canvas.buffer_rgba())
         filename, _ = QFileDialog.getSaveFileName(self, "Spektrum als JPG speichern", default_filename,
                                                   "JPEG Files (*.jpg)")
         if filename:
-            # Speichere die Figure als JPG:
-            self.figure.savefig(filename, format="jpg")
-            print(f"Spektrum-Bild gespeichert unter {filename}")
+            self.exporter.submit_image(filename, image)
+
+    def export_history(self):
+        """Exportiert alle Spektren des Wasserfall-Verlaufs auf einmal (eine CSV je Spektrum)."""
+        # Der Verlauf wird nur bei eingeschaltetem Wasserfall gefüllt (und beim Umschalten geleert)
+        if not self.waterfall_enabled:
+            text = "Serienexport: zuerst den Wasserfall einschalten, er sammelt die Spektren."
+        else:
+            times, spectra = self.waterfall.history()
+            text = None if len(times) else "Serienexport: der Wasserfall-Verlauf ist noch leer."
+        if text is not None:
+            print(f"[WARNUNG] {text}")
+            self.statusBar().showMessage(text, 5000)
+            return
+        x_values, spectra = self.export_arrays(spectra)
+        directory = QFileDialog.getExistingDirectory(self, "Verzeichnis für den Serienexport")
+        if directory:
+            names = [datetime.datetime.fromtimestamp(t).strftime("spectrum_%Y%m%d_%H%M%S_%f")
+                     if np.isfinite(t) else f"spectrum_{i:05d}" for i, t in enumerate(times)]
+            self.exporter.submit_batch(directory, x_values, spectra, names,
+                                       self.export_header("Wavelength,Intensity"))
+
+    def show_export_messages(self):
+        """Zeigt Meldungen des Export-Threads in der Statusleiste."""
+        for level, text in self.exporter.poll():
+            print(f"[{level}] {text}")
+            self.statusBar().showMessage(text, 5000)
 
     def open_roi_dialog(self):
         dialog = ROIDialog(self)
@@ -365,7 +638,9 @@ class SpectrometerApp(QMainWindow):
     def capture_hdr(self):
         print("[INFO] HDR-Modus aktiviert. Live-Update wird deaktiviert.")
         self.live_update = False
-        hdr_frame = self.camera.capture_hdr_frame(self.roi)
+        self.camera.adaptive = self.adaptive_averager()
+        self.camera.adaptive_peak = self.adaptive_peak()
+        hdr_frame = self.camera.capture_hdr_frame(self.roi, subtract_dark=getattr(self, "dark_field_enabled", False))
         if hdr_frame is not None:
             self.hdr_result = hdr_frame
             cv2.imshow("Test HDR-Bild", hdr_frame / np.max(hdr_frame))
@@ -380,7 +655,9 @@ class SpectrometerApp(QMainWindow):
             print("[FEHLER] HDR-Bild konnte nicht erstellt werden.")
 
     def capture_spectrum(self):
-        self.update_frame()  # Aktualisiere das Spektrum (dabei wird self.spectrum_line gesetzt)
+        # Im Live-Betrieb ist das zuletzt angezeigte Spektrum aktuell; nur ohne Spektrum einmal aufnehmen
+        if getattr(self, "spectrum_line", None) is None:
+            self.update_frame()
         self.save_spectrum_to_csv()  # Speichere das aktuelle Spektrum in eine CSV-Datei
 
     def toggle_live_update(self):
@@ -394,42 +671,48 @@ class SpectrometerApp(QMainWindow):
     def update_frame(self):
         if not self.live_update and self.hdr_result is None:
             return
+        if self.kinetics is not None:  # Kamera gehört dem Aufnahme-Thread
+            return
 
         self.original_xlim = self.ax.get_xlim()
         self.original_ylim = self.ax.get_ylim()
 
-        if self.hdr_result is not None:
+        from_hdr = self.hdr_result is not None
+        if from_hdr:
             frame = self.hdr_result
             self.hdr_result = None
             x, y, w, h = 0, 0, frame.shape[1], frame.shape[0]
+            origin = tuple(self.roi[:2])  # HDR-Bild ist bereits auf die ROI zugeschnitten
         else:
             frame = self.camera.capture_frame()
             # Hier ist self.roi in Originalkoordinaten (z. B. 1920×1080)
             x, y, w, h = self.roi
+            origin = (x, y)
 
         if frame is not None:
+            # Dunkelbild nur auf dem benötigten Ausschnitt abziehen (HDR: bereits je Belichtungsstufe)
+            if getattr(self, "dark_field_enabled", False) and not from_hdr:
+                self.subtract_dark(frame)
+            if self.defect_correction_enabled and not from_hdr:
+                self.defect_map.repair(frame, self.dark_region(frame.shape[1]))
+
+            scale_y = 1.0
+            row_offset = 0  # erste Bin-Zeile des gebinnten Ausschnitts
+
+            # Low-Res-Modus: nur die benötigten Zeilen vertikal binnen, die Spaltenauflösung bleibt erhalten.
+            # Die Zeilen sind von der Spiegelung unabhängig, gespiegelt wird danach nur noch der kleine Block.
+            if self.low_res_mode and not from_hdr:
+                _, y0, _, h0 = self.extraction_region()
+                frame, row_offset = bin_rows(frame, y0, y0 + h0, self.low_res_bin)
+                factor = max(int(self.low_res_bin), 1)
+                scale_y = 1.0 / factor
+                y, h = y // factor - row_offset, -(-(y + h) // factor) - y // factor
+
             if self.mirror:
                 frame = cv2.flip(frame, 1)
-            if getattr(self, "dark_field_enabled", False) and hasattr(self, "dark_field"):
-                frame = np.maximum(frame - self.dark_field, 0)
             if len(frame.shape) == 3:
                 frame = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
 
-            # Speichere die Originalgröße
-            full_h, full_w = frame.shape[:2]
-
-            # Falls low_res_mode aktiv ist, verkleinere das Bild und skaliere die ROI-Koordinaten:
-            if self.low_res_mode:
-                low_w, low_h = 640, 360
-                frame = cv2.resize(frame, (low_w, low_h), interpolation=cv2.INTER_AREA)
-                scale_x = low_w / full_w
-                scale_y = low_h / full_h
-                # Passe ROI an:
-                x = int(x * scale_x)
-                y = int(y * scale_y)
-                w = int(w * scale_x)
-                h = int(h * scale_y)
-
             h_img, w_img = frame.shape[:2]
             # Prüfe, ob ROI gültig ist:
             if self.hdr_result is None:
@@ -444,19 +727,80 @@ class SpectrometerApp(QMainWindow):
             if not self.auto_scale_intensity:
                 self.ax.set_ylim(0, self.fixed_intensity_max)
 
-            self.spectrum_line = np.sum(roi_frame, axis=0)
+            self.roi_frame, self.roi_origin = roi_frame, origin
+            # Mehrspur-Modus: alle Spuren aus einem Zeilenblock (HDR-Bilder sind bereits auf die ROI zugeschnitten)
+            if self.multitrack_enabled and len(self.tracks) and not from_hdr:
+                self.track_spectra = self.extract_tracks(frame, x, w, scale_y, row_offset)
+                if self.track_spectra is None:
+                    return
+                self.spectrum_line = self.track_spectra[0]
+            else:
+                self.track_spectra = None
+                # HDR-Bilder sind zusammengesetzt: nicht in Spike-Median und Extraktionsprofil aufnehmen
+                self.spectrum_line = self.extract_spectrum(roi_frame, origin, update=not from_hdr)
+
+            # Referenzaufnahme: dieselben Spektren wie im Live-Betrieb, vor der zeitlichen Mittelung
+            if self.reference_capture is not None and not from_hdr:
+                self.feed_reference_capture()
 
-            # Falls Relativspektrum aktiviert und ein Referenzspektrum vorliegt:
-            if self.relative_spectrum_enabled and self.reference_spectrum is not None:
-                # Berechne den Quotienten – sichere Division (wo self.reference_spectrum != 0)
-                quotient = np.divide(self.spectrum_line, self.reference_spectrum,
-                                     out=np.zeros_like(self.spectrum_line), where=self.reference_spectrum != 0)
+            # Zeitliche Mittelung (konstante Kosten je Frame); HDR-Ergebnisse sind bereits gemittelt
+            self.spectrum_error = None
+            if self.averager.active and not from_hdr:
+                spectra = self.track_spectra if self.track_spectra is not None else self.spectrum_line
+                spectra, self.spectrum_error = self.averager.update(spectra)
+                if self.track_spectra is not None:
+                    self.track_spectra = spectra
+                    self.spectrum_line = spectra[0]
+                else:
+                    self.spectrum_line = spectra
+            self.raw_spectrum_line = self.spectrum_line
+            self.raw_track_spectra = self.track_spectra
+
+            # Drift-Korrektur auf dem Rohspektrum (vor einer Quotientenbildung)
+            if self.drift_monitor.active:
+                corrected = self.drift_monitor.update(self.spectrum_line, time.time())
+                if corrected is not None:
+                    version = self.camera.set_calibration(corrected, "drift", offset=self.drift_monitor.offset,
+                                                          scale=self.drift_monitor.scale)
+                    print(f"[INFO] Drift korrigiert: Offset {self.drift_monitor.offset:+.2f} px, "
+                          f"Skala {self.drift_monitor.scale:.5f} -> Kalibration Version {version}")
+
+            # Falls Relativspektrum aktiviert und eine passende Referenz aktiv ist:
+            spectra = self.track_spectra if self.track_spectra is not None else self.spectrum_line
+            reciprocal = self.references.reciprocal_for(spectra) if self.relative_spectrum_enabled else None
+            if reciprocal is not None:
+                # Quotient = Spektrum * vorberechneter Kehrwert (0, wo die Referenz zu klein ist), je Spur;
+                # geschrieben wird in einen festen Puffer, das Rohspektrum bleibt unverändert
+                dtype = np.result_type(spectra, reciprocal)
+                if self.relative_buffer is None or self.relative_buffer.shape != spectra.shape \
+                        or self.relative_buffer.dtype != dtype:
+                    self.relative_buffer = np.empty(spectra.shape, dtype=dtype)
+                quotient = np.multiply(spectra, reciprocal, out=self.relative_buffer)
+                if self.spectrum_error is not None:
+                    self.spectrum_error *= reciprocal
                 # Optional: Normalisieren auf einen Maximalwert von 1
                 if self.normalize_relative_spectrum:
-                    max_val = np.max(quotient)
-                    if max_val > 0:
-                        quotient = quotient / max_val
-                self.spectrum_line = quotient
+                    max_val = np.max(quotient, axis=-1, keepdims=True)
+                    quotient = np.divide(quotient, max_val, out=quotient, where=max_val > 0)
+                    if self.spectrum_error is not None:
+                        np.divide(self.spectrum_error, max_val, out=self.spectrum_error, where=max_val > 0)
+                if self.track_spectra is not None:
+                    self.track_spectra = quotient
+                    self.spectrum_line = quotient[0]
+                else:
+                    self.spectrum_line = quotient
+
+            if self.tracking_enabled and self.peak_tracker.count:
+                self.peak_tracker.update(self.spectrum_line, time.time())
+
+            # Kanäle (Bandflächen/-verhältnisse) und Aufzeichnung
+            now = time.time()
+            self.channel_values = None
+            if self.channels_enabled and len(self.channels):
+                self.channel_values = self.channels.evaluate(self.spectrum_line, self.wavelength_axis(),
+                                                             self.camera.calibration_version, now)
+            if self.recorder.active:
+                self.record_frame(now)
 
             self.ax.clear()
             self.figure.set_facecolor("#1e1e1e")  # Setzt den Hintergrund der Figure
@@ -468,18 +812,559 @@ class SpectrometerApp(QMainWindow):
             self.ax.tick_params(axis='both', colors='white')
             if self.camera.calibration_data is not None:
                 x_values = np.polyval(self.camera.calibration_data, np.arange(len(self.spectrum_line)))
-                self.ax.plot(x_values, self.spectrum_line, color='red' if not self.live_update else 'white')
                 self.ax.set_xlabel("Wellenlänge (nm)")
                 if hasattr(self, 'wavelength_min') and hasattr(self, 'wavelength_max'):
                     self.ax.set_xlim(self.wavelength_min, self.wavelength_max)
             else:
-                self.ax.plot(self.spectrum_line, color='red' if not self.live_update else 'white')
+                x_values = np.arange(len(self.spectrum_line))
                 self.ax.set_xlabel("Pixelposition")
+            # Low-Res-Modus: nur die Anzeige als Min/Max-Hülle ausdünnen, das Spektrum bleibt vollständig
+            x_full = x_values
+            spectra = self.track_spectra if self.track_spectra is not None else self.spectrum_line
+            # Standardfehler der Mittelung als Band (untere/obere Grenze je Kurve)
+            band = None
+            if self.spectrum_error is not None and self.show_std_error:
+                band = np.stack([spectra - self.spectrum_error, spectra + self.spectrum_error])
+            if self.low_res_mode:
+                if band is not None:
+                    _, band = display_envelope(x_values, band)
+                x_values, spectra = display_envelope(x_values, spectra)
+            if self.track_spectra is not None:
+                for i, (name, spectrum) in enumerate(zip(self.tracks.names, spectra)):
+                    color = TRACK_COLORS[i % len(TRACK_COLORS)]
+                    self.ax.plot(x_values, spectrum, color=color, label=name)
+                    if band is not None:
+                        self.ax.fill_between(x_values, band[0][i], band[1][i], color=color, alpha=0.25, linewidth=0)
+                self.ax.legend(loc="upper right", fontsize=8)
+            else:
+                color = 'red' if not self.live_update else 'white'
+                self.ax.plot(x_values, spectra, color=color)
+                if band is not None:
+                    self.ax.fill_between(x_values, band[0], band[1], color=color, alpha=0.25, linewidth=0)
             self.ax.tick_params(axis='both', colors='white')
             self.ax.set_ylabel("Intensität")
             if not self.auto_scale_intensity:
                 self.ax.set_ylim(0, self.fixed_intensity_max)
+            if self.tracking_enabled:
+                self.plot_tracked_peaks()
+            if self.channel_values is not None:
+                self.plot_channels()
             self.canvas.draw()
+            if self.waterfall_enabled:
+                self.update_waterfall(x_full)
+
+    def toggle_peak_tracking(self):
+        self.tracking_enabled = not self.tracking_enabled
+        if not self.tracking_enabled:
+            self.peak_tracker.clear()
+            self.track_ax.clear()
+            self.track_lines = []
+        self.track_canvas.setVisible(self.tracking_enabled)
+        state = "aktiviert (Klick: Peak hinzufügen, Rechtsklick: entfernen)" if self.tracking_enabled else "deaktiviert"
+        print(f"[INFO] Peak-Tracking {state}.")
+
+    def wavelength_axis(self, length=None):
+        """Wellenlängen der Spektrumspixel (Pixelindex ohne Kalibration)."""
+        pixels = np.arange(len(self.spectrum_line) if length is None else length)
+        if self.camera.calibration_data is None:
+            return pixels
+        return np.polyval(self.camera.calibration_data, pixels)
+
+    def start_reference_capture(self, name, frames, finished=None):
+        """
+        Nimmt eine Referenz über die nächsten frames Live-Spektren auf (gleitendes Mittel, Welford).
+
+        :param finished: Rückruf nach Abschluss, erhält den Namen
+        """
+        self.reference_capture = (name, SpectrumAverager("welford"), max(int(frames), 1), finished)
+        print(f"[INFO] Referenz '{name}': mittle {frames} Spektren ...")
+
+    def feed_reference_capture(self):
+        name, averager, frames, finished = self.reference_capture
+        spectra = self.track_spectra if self.track_spectra is not None else self.spectrum_line
+        mean, error = averager.update(spectra)
+        if averager.count < frames:
+            return
+        self.reference_capture = None
+        noise = None
+        if error is not None:
+            usable = mean > 0.1 * np.max(mean)
+            noise = float(np.median(error[usable] / mean[usable])) if usable.any() else None
+        version = self.references.add(name, mean, frames=frames,
+                                      calibration_version=self.camera.calibration_version, noise=noise)
+        self.save_settings()
+        print(f"[INFO] Referenz '{name}' Version {version} gespeichert ({self.references.describe()}).")
+        if finished is not None:
+            finished(name)
+
+    def open_channel_dialog(self):
+        dialog = ChannelDialog(self)
+        dialog.exec()
+
+    def set_channels_enabled(self, enabled):
+        self.channels_enabled = enabled and len(self.channels) > 0
+        self.channel_canvas.setVisible(self.channels_enabled)
+        self.channels.clear()
+        self.channel_ax.clear()
+        self.channel_lines = []
+
+    def plot_channels(self):
+        """Aktualisiert den Streifenschreiber der Kanäle (nur die Liniendaten)."""
+        times, history = self.channels.series()
+        if not len(times):
+            return
+        if len(self.channel_lines) != len(self.channels):
+            self.channel_ax.clear()
+            self.channel_ax.set_xlabel("Zeit (s)")
+            self.channel_ax.set_ylabel("Kanalwert")
+            self.channel_ax.tick_params(axis='both', colors='white')
+            self.channel_lines = [self.channel_ax.plot([], [], label=name)[0] for name in self.channels.names]
+            self.channel_ax.legend(loc="upper left", fontsize=8)
+        t = times - times[0]
+        for i, line in enumerate(self.channel_lines):
+            line.set_data(t, history[:, i])
+        self.channel_ax.relim()
+        self.channel_ax.autoscale_view()
+        self.channel_canvas.draw_idle()
+
+    def toggle_recording(self):
+        """Startet bzw. beendet die Aufzeichnung von Kanälen (und optional Spektren)."""
+        if self.recorder.active:
+            rows = self.recorder.stop()
+            self.btn_record.setText("Aufzeichnung starten")
+            print(f"[INFO] Aufzeichnung beendet: {rows} Zeilen in {self.recorder.path}.")
+            if self.trigger_enabled:
+                print(f"[INFO] Änderungstrigger: {self.trigger.summary()}")
+            return
+        columns = list(self.channels.names) if self.channels_enabled else []
+        if self.record_spectra and hasattr(self, "spectrum_line"):
+            columns += [f"{w:.3f}" for w in self.wavelength_axis()]
+        if not columns:
+            print("[WARNUNG] Nichts aufzuzeichnen: keine aktiven Kanäle und keine Spektrenaufzeichnung.")
+            return
+        comments = []
+        if self.kinetics is not None:
+            comments.append(self.kinetics_note)
+        if self.trigger_enabled:
+            comments.append(f"trigger: Schwelle {self.trigger_threshold:g}, Vorlauf {self.trigger_pre}, "
+                            f"Heartbeat {self.trigger_heartbeat:g} s")
+        # Kanäle vergleichen die größte relative Änderung, reine Spektren die RMS-Änderung
+        self.trigger = ChangeTrigger(self.trigger_threshold, self.trigger_pre, self.trigger_heartbeat,
+                                     "max" if self.channels_enabled and len(self.channels) else "rms")
+        path = self.recorder.start(columns, comments, self.camera.calibration_version)
+        self.recorded_columns = len(columns)
+        self.btn_record.setText("Aufzeichnung stoppen")
+        print(f"[INFO] Aufzeichnung gestartet: {path}")
+
+    def record_frame(self, timestamp):
+        """Schreibt die Werte des aktuellen Frames in die Aufzeichnung."""
+        values = [self.channel_values] if self.channels_enabled and self.channel_values is not None else []
+        if self.record_spectra:
+            values.append(self.spectrum_line)
+        probe = values[0] if values else None  # Trigger vergleicht die Kanäle, falls vorhanden, sonst das Spektrum
+        values = np.concatenate(values) if values else np.empty(0)
+        if len(values) != self.recorded_columns:
+            return  # Kanäle oder Spektrumlänge haben sich seit dem Start geändert
+        self.write_record(timestamp, values, probe)
+
+    def write_record(self, timestamp, values, probe=None):
+        """Schreibt eine Zeile – bei aktivem Änderungstrigger nur bei Änderung (plus Vorlauf/Heartbeat)."""
+        self.recorder.update_version(self.camera.calibration_version, timestamp)
+        if not self.trigger_enabled:
+            self.recorder.write(timestamp, values)
+            return
+        for t, row in self.trigger.process(timestamp, values, probe):
+            self.recorder.write(t, row)
+
+    def toggle_kinetics(self):
+        """
+        Kinetik-Modus: nur die Spalten der Kanalbänder in einem eigenen Thread mit maximaler Bildrate
+        aufnehmen; die GUI wertet gesammelt die Kanäle aus und zeichnet kein volles Spektrum.
+        """
+        if self.kinetics is not None:
+            self.kinetics_timer.stop()
+            self.kinetics.stop()
+            self.drain_kinetics()
+            print(f"[INFO] Kinetik-Modus beendet: {self.kinetics.frames} Bilder, "
+                  f"{self.kinetics.rate():.1f} Bilder/s, {self.kinetics.dropped} verworfen.")
+            if self.recorder.active:
+                self.recorder.note(f"Kinetik-Modus beendet {time.time():.3f}")
+            self.kinetics = None
+            self.live_update = True
+            self.update_timer_interval()
+            return
+        if not self.channels_enabled or not len(self.channels):
+            print("[WARNUNG] Für den Kinetik-Modus müssen Kanäle definiert und aktiv sein.")
+            return
+        x, y, w, h = self.roi
+        self.kinetics_axis = self.wavelength_axis(w)
+        columns = self.channels.columns(self.kinetics_axis, self.camera.calibration_version)
+        frame_width = int(self.camera.get_property(cv2.CAP_PROP_FRAME_WIDTH))
+        frame_height = int(self.camera.get_property(cv2.CAP_PROP_FRAME_HEIGHT))
+        # Spektrumspixel -> Spalte im Rohbild (Spiegelung wirkt auf das ganze Bild)
+        raw_columns = frame_width - 1 - (x + columns) if self.mirror else x + columns
+        rows, reduction = self.kinetics_reduction(columns, raw_columns, frame_width, frame_height)
+
+        # Was der Kinetik-Modus nicht nachbildet, wird gemeldet und in der Aufzeichnung vermerkt
+        missing = []
+        if self.optimal_extraction_enabled:
+            missing.append("optimale Extraktion")
+        if self.slit_correction_enabled and self.slit_correction.ready and not self.low_res_mode:
+            missing.append("Spaltkorrektur")
+        if self.spike_rejection_enabled:
+            missing.append("Spike-Unterdrückung")
+        if self.averager.active:
+            missing.append("zeitliche Mittelung")
+        if reduction.reciprocal is not None and self.normalize_relative_spectrum:
+            missing.append("Normierung des Relativspektrums")
+        self.kinetics_note = "Kinetik-Modus" + (f" ohne {', '.join(missing)}" if missing else "")
+        if missing:
+            print(f"[WARNUNG] {self.kinetics_note}: Kanalwerte weichen vom Live-Betrieb ab.")
+        if self.recorder.active:
+            self.recorder.note(f"{self.kinetics_note} ab {time.time():.3f}")
+        self.live_update = False
+        self.timer.stop()
+        self.kinetics_columns = columns
+        self.kinetics_spectrum = np.zeros(w)
+        self.kinetics = KineticsAcquisition(self.camera, rows, raw_columns, reduction)
+        fps = self.kinetics.start()
+        self.kinetics_timer.start(self.update_interval)
+        print(f"[INFO] Kinetik-Modus: {len(columns)} von {w} Spalten, Kamera meldet {fps:g} FPS.")
+
+    def spectrum_rows(self, frame_height):
+        """Zeilen (y0, y1) im Rohbild, die im Live-Betrieb zum Spektrum (bzw. zur ersten Spur) summiert werden."""
+        factor = max(int(self.low_res_bin), 1) if self.low_res_mode else 1
+        if self.multitrack_enabled and len(self.tracks):
+            track, scale = self.tracks.tracks[0], 1.0 / factor  # wie TrackSet._ranges
+            start = int(track.y * scale)
+            stop = start + max(int(track.height * scale), 1)
+        else:
+            x, y, w, h = self.roi
+            start, stop = y // factor, -(-(y + h) // factor)
+        # Im Low-Res-Modus ganze Bins des Vollbild-Rasters
+        return start * factor, min(stop * factor, frame_height)
+
+    def kinetics_reduction(self, columns, raw_columns, frame_width, frame_height):
+        """
+        Bereitet Dunkelbild, Defekte, Flatfield und Referenz für die Kinetik-Spalten vor.
+
+        :param columns: Spektrumspixel (Spalten der ROI)
+        :param raw_columns: zugehörige Spalten im Rohbild
+        :return: (Zeilenbereich des Blocks im Rohbild, ColumnReduction)
+        """
+        x, y, w, h = self.roi
+        region = self.dark_region(frame_width)  # hier korrigiert der Live-Pfad Dunkelbild und Defekte
+        s0, s1 = self.spectrum_rows(frame_height)
+
+        dark = None
+        if getattr(self, "dark_field_enabled", False):
+            dark = self.camera.dark_library.get(self.camera.exposure, self.camera.gain,
+                                                (frame_width, frame_height), region)
+
+        defect_map = None
+        if self.defect_correction_enabled and self.defect_map.resolution == (frame_width, frame_height):
+            defect_map = self.defect_map
+
+        gains = None
+        if self.flat_field_enabled and not self.low_res_mode:
+            # Derselbe Ausschnitt wie in extract_spectrum bzw. extract_tracks
+            y0, y1 = self.tracks.bounds() if self.multitrack_enabled and len(self.tracks) else (y, y + h)
+            gains = self.flat_field.gains((x, y0), (y1 - y0, w), columns)
+            if gains is not None:
+                gains = gains[s0 - y0:s1 - y0]
+
+        reciprocal = None
+        if self.relative_spectrum_enabled:
+            shape = (len(self.tracks), w) if self.multitrack_enabled and len(self.tracks) else (w,)
+            reciprocal = self.references.reciprocal_for(np.empty(shape))
+            if reciprocal is not None:
+                reciprocal = (reciprocal[0] if reciprocal.ndim == 2 else reciprocal)[columns]
+
+        return ColumnReduction.for_columns(region, (s0, s1), raw_columns, dark, defect_map, gains, reciprocal)
+
+    def drain_kinetics(self):
+        """Wertet die im Aufnahme-Thread gesammelten Spaltensummen aus (Kanäle, Aufzeichnung, Verlauf)."""
+        if self.kinetics is None:
+            return
+        times, values = self.kinetics.drain()
+        if not len(times):
+            return
+        spectrum = self.kinetics_spectrum
+        for timestamp, row in zip(times, values):
+            spectrum[self.kinetics_columns] = row
+            self.channel_values = self.channels.evaluate(spectrum, self.kinetics_axis,
+                                                         self.camera.calibration_version, timestamp)
+            if self.recorder.active and self.recorded_columns == len(self.channel_values):
+                self.write_record(timestamp, self.channel_values)
+        self.plot_channels()
+
+    def toggle_waterfall(self):
+        self.waterfall_enabled = not self.waterfall_enabled
+        self.waterfall_canvas.setVisible(self.waterfall_enabled)
+        self.waterfall.reset()
+        self.waterfall_ax.clear()
+        self.waterfall_image = None
+
+    def update_waterfall(self, x_values):
+        """Schreibt das aktuelle Spektrum in den Ringpuffer und aktualisiert das Bild in-place."""
+        width = self.waterfall.width
+        self.waterfall.push(self.spectrum_line, time.time())
+        extent = (x_values[0], x_values[-1], self.waterfall.rows, 0)
+        if self.waterfall_image is None or width != self.waterfall.width:
+            self.waterfall_ax.clear()
+            self.waterfall_image = self.waterfall_ax.imshow(self.waterfall.view(), aspect="auto", cmap="inferno",
+                                                            extent=extent, interpolation="nearest")
+            self.waterfall_ax.set_ylabel("Spektren (neueste unten)")
+            self.waterfall_ax.tick_params(axis='both', colors='white')
+        else:
+            self.waterfall_image.set_data(self.waterfall.view())
+            self.waterfall_image.set_extent(extent)
+        self.waterfall_image.set_clim(*self.waterfall.limits())
+        # Gleiche Wellenlängenachse wie das Spektrum (inkl. Zoom)
+        self.waterfall_ax.set_xlim(self.ax.get_xlim())
+        self.waterfall_canvas.draw_idle()
+
+    def toggle_drift_monitor(self):
+        if self.drift_monitor.active:
+            # Zurück zur Ausgangskalibration (deren Version bleibt gültig)
+            self.camera.restore_calibration(self.drift_monitor.base, self.drift_base_version)
+            self.drift_monitor.stop()
+            print(f"[INFO] Drift-Monitor deaktiviert, Kalibration Version {self.camera.calibration_version}.")
+            return
+        if self.camera.calibration_data is None or not hasattr(self, "raw_spectrum_line"):
+            print("[WARNUNG] Drift-Monitor benötigt eine Kalibration und ein aktuelles Spektrum.")
+            return
+        count = self.drift_monitor.start(self.raw_spectrum_line, self.camera.calibration_data,
+                                         line_count=self.drift_line_count)
+        self.drift_base_version = self.camera.calibration_version
+        if not count:
+            print("[WARNUNG] Keine Referenzlinien im Spektrum gefunden.")
+            return
+        pixels = ", ".join(f"{p:.1f}" for p in self.drift_monitor.reference_pixels)
+        print(f"[INFO] Drift-Monitor aktiv (Version {self.camera.calibration_version}), Referenzlinien bei Pixel {pixels}.")
+
+    def extract_spectrum(self, roi_frame, origin, update=True):
+        """
+        Reduziert einen ROI-Ausschnitt auf ein Spektrum (Spaltkorrektur, optimale Extraktion).
+
+        :param update: Frame ins Profil der optimalen Extraktion aufnehmen (Live-Strom);
+                       False für Einzelaufnahmen wie das Referenzspektrum
+        """
+        if self.spike_rejection_enabled and update:
+            roi_frame = self.spike_rejector.process(roi_frame)
+        if self.flat_field_enabled and not self.low_res_mode:
+            roi_frame = self.flat_field.apply(roi_frame, origin)
+        # Spaltkorrektur ist in Vollbildkoordinaten geschätzt -> nicht im verkleinerten Bild
+        straighten = self.slit_correction_enabled and self.slit_correction.ready and not self.low_res_mode
+        if not self.optimal_extraction_enabled:
+            return self.slit_correction.extract(roi_frame, origin) if straighten else np.sum(roi_frame, axis=0)
+        if straighten:
+            roi_frame = self.slit_correction.straighten(roi_frame, origin)
+        if update:
+            return self.optimal_extractor.update(roi_frame)
+        return self.optimal_extractor.extract(roi_frame)
+
+    def adaptive_averager(self, dark=False):
+        """AdaptiveAverager mit den aktuellen Zielwerten, None wenn die adaptive Mittelung aus ist."""
+        if not self.adaptive_enabled:
+            return None
+        if dark:
+            return AdaptiveAverager(target_error=self.adaptive_dark_error, time_limit=self.adaptive_time_limit,
+                                    max_frames=self.adaptive_max_frames, level="pixel")
+        return AdaptiveAverager(target_snr=self.adaptive_snr, time_limit=self.adaptive_time_limit,
+                                max_frames=self.adaptive_max_frames)
+
+    def adaptive_peak(self):
+        """Spalte des ersten verfolgten Peaks im ungespiegelten ROI-Bild (für das Peak-SNR) oder None."""
+        if not self.tracking_enabled or not self.peak_tracker.count:
+            return None
+        column = int(round(self.peak_tracker.params[0, 1]))
+        return self.roi[2] - 1 - column if self.mirror else column
+
+    def update_averaging(self):
+        """Übernimmt die Mittelungseinstellungen und beginnt die Mittelung neu."""
+        self.averager.configure(self.averaging_mode, self.averaging_window, self.averaging_alpha)
+        self.spectrum_error = None
+
+    def extraction_region(self):
+        """Ausschnitt (ROI + Spuren) in Bildkoordinaten, der für die Extraktion gebraucht wird."""
+        x, y, w, h = self.roi
+        y0, y1 = y, y + h
+        if self.multitrack_enabled and len(self.tracks):
+            t0, t1 = self.tracks.bounds()
+            y0, y1 = min(y0, t0), max(y1, t1)
+        return x, y0, w, y1 - y0
+
+    def dark_region(self, frame_width):
+        """Extraktionsausschnitt in Rohbild-Koordinaten (vor der Spiegelung), für die Dunkelbilder."""
+        x, y, w, h = self.extraction_region()
+        if self.mirror:
+            x = frame_width - x - w
+        return x, y, w, h
+
+    def subtract_dark(self, frame):
+        """Zieht das passende Master-Dunkelbild in-place vom Ausschnitt des Rohbilds ab."""
+        region = self.dark_region(frame.shape[1])
+        resolution = (frame.shape[1], frame.shape[0])
+        dark = self.camera.dark_library.get(self.camera.exposure, self.camera.gain, resolution, region)
+        if dark is None:
+            key = (self.camera.exposure, self.camera.gain, resolution, region)
+            if key != getattr(self, "_missing_dark", None):
+                print(f"[WARNUNG] Kein passendes Dunkelbild für Belichtung {self.camera.exposure} "
+                      f"und Gain {self.camera.gain} vorhanden.")
+                self._missing_dark = key
+            return
+        x, y, w, h = region
+        view = frame[y:y + h, x:x + w]
+        np.subtract(view, dark, out=view)
+        np.maximum(view, 0, out=view)
+
+    def capture_dark(self, exposures=None, num_frames=None):
+        """
+        Nimmt Master-Dunkelbilder für den aktuellen Ausschnitt auf und legt sie in der Bibliothek ab.
+
+        :param exposures: Liste von Belichtungswerten; None = aktuelle Belichtung
+        """
+        num_frames = num_frames or self.hdr_num_frames
+        frame_width = int(self.camera.get_property(cv2.CAP_PROP_FRAME_WIDTH))
+        region = self.dark_region(frame_width)
+        current = self.camera.exposure
+        adaptive = self.adaptive_averager(dark=True)
+        for exposure in (exposures if exposures is not None else [None]):
+            key = self.camera.dark_library.capture(self.camera, region, num_frames, exposure, adaptive)
+            if key is None:
+                print("[WARNUNG] Dunkelbildaufnahme fehlgeschlagen!")
+            else:
+                frames = adaptive.frames if adaptive is not None else num_frames
+                print(f"[INFO] Master-Dunkelbild (Belichtung {key[0]:g}, Gain {key[1]:g}, "
+                      f"{frames} Bilder) gespeichert.")
+        if exposures is not None:
+            self.camera.set_exposure(current)
+
+    def build_defect_map(self):
+        """Erstellt die Hotpixel-Karte aus dem am längsten belichteten Master-Dunkelbild."""
+        resolution = (int(self.camera.get_property(cv2.CAP_PROP_FRAME_WIDTH)),
+                      int(self.camera.get_property(cv2.CAP_PROP_FRAME_HEIGHT)))
+        keys = [k for k in self.camera.dark_library.entries if k[2] == resolution]
+        if not keys:
+            print("[WARNUNG] Keine Dunkelbilder für diese Auflösung vorhanden.")
+            return False
+        key = max(keys, key=lambda k: (k[0], k[1]))
+        region, dark = self.camera.dark_library.master(key)
+        count = self.defect_map.build(dark, region, resolution)
+        print(f"[INFO] Defektkarte aus Dunkelbild (Belichtung {key[0]:g}) erstellt: {count} Hotpixel.")
+        return True
+
+    def capture_flat_field(self, num_frames=50):
+        """Nimmt ein Master-Flat (gleichmäßige Beleuchtung) auf und speichert die Gain-Karte."""
+        region = self.extraction_region()
+        builder = FlatField.builder(region)
+        for _ in range(num_frames):
+            frame = self.camera.capture_frame()
+            if frame is None:
+                continue
+            if getattr(self, "dark_field_enabled", False):
+                self.subtract_dark(frame)
+            if self.mirror:
+                frame = cv2.flip(frame, 1)
+            builder.add(frame)
+        if not builder.count:
+            print("[WARNUNG] Flatfield-Aufnahme fehlgeschlagen!")
+            return False
+        gain = self.flat_field.build(builder.result(), region, calibration_version=self.camera.calibration_version)
+        print(f"[INFO] Flatfield aus {builder.count} Bildern gespeichert "
+              f"(Gain {np.percentile(gain, 1):.3f} … {np.percentile(gain, 99):.3f}).")
+        return True
+
+    def extract_tracks(self, frame, x, w, scale_y=1.0, row_offset=0):
+        """
+        Extrahiert alle Spuren (Spalten der Haupt-ROI) in einem Durchgang, Form (Spuren, Spalten).
+
+        :param row_offset: Zeile des Bildes frame im (gebinnten) Vollbild
+        """
+        y0, y1 = self.tracks.bounds(scale_y)
+        y0, y1 = y0 - row_offset, y1 - row_offset
+        if y0 < 0 or y1 > frame.shape[0]:
+            print("[WARNUNG] Spuren außerhalb des gültigen Bereichs!")
+            return None
+        block = frame[y0:y1, x:x + w]
+        if self.spike_rejection_enabled:
+            block = self.spike_rejector.process(block)
+        if self.flat_field_enabled and not self.low_res_mode:
+            block = self.flat_field.apply(block, (x, y0))
+        if self.slit_correction_enabled and self.slit_correction.ready and not self.low_res_mode:
+            block = self.slit_correction.straighten(block, (x, y0))
+        return self.tracks.reduce(block, scale_y)
+
+    def estimate_slit_correction(self):
+        """Schätzt Spaltneigung/-krümmung aus dem aktuellen ROI-Bild (Linienlampe)."""
+        if not hasattr(self, "roi_frame") or self.low_res_mode:
+            print("[WARNUNG] Für die Spaltkorrektur wird ein Live-Bild in voller Auflösung benötigt.")
+            return False
+        try:
+            count = self.slit_correction.estimate(self.roi_frame, self.roi_origin)
+        except ValueError as e:
+            print(f"[FEHLER] Spaltkorrektur fehlgeschlagen: {e}")
+            return False
+        print(f"[INFO] Spaltkorrektur aus {count} Linien geschätzt "
+              f"(Neigung {np.polyval(self.slit_correction.tilt, self.roi_origin[0] + self.roi_frame.shape[1] / 2):.4f} px/Zeile).")
+        return True
+
+    def pixel_from_xdata(self, xdata):
+        """Rechnet eine Klickposition (Wellenlänge oder Pixel) in eine Pixelposition um."""
+        if self.camera.calibration_data is not None:
+            x_values = np.polyval(self.camera.calibration_data, np.arange(len(self.spectrum_line)))
+            return int(np.abs(x_values - xdata).argmin())
+        return int(round(xdata))
+
+    def on_tracking_click(self, event):
+        if not hasattr(self, "spectrum_line"):
+            return
+        pixel = self.pixel_from_xdata(float(event.xdata))
+        if event.button == 3:
+            index = self.peak_tracker.nearest_peak(pixel)
+            if index is not None:
+                self.peak_tracker.remove_peak(index)
+                print(f"[INFO] Peak {index + 1} wird nicht mehr verfolgt.")
+        else:
+            index = self.peak_tracker.add_peak(self.spectrum_line, pixel)
+            print(f"[INFO] Verfolge Peak {index + 1} bei Pixel {self.peak_tracker.params[index, 1]:.0f}.")
+        # Linien im Verlaufsplot passend zur neuen Peakanzahl neu anlegen
+        self.track_ax.clear()
+        self.track_lines = []
+
+    def plot_tracked_peaks(self):
+        """Markiert die verfolgten Peaks im Spektrum und aktualisiert den Verlaufsplot."""
+        if not self.peak_tracker.count:
+            return
+        times, history = self.peak_tracker.series()
+        if not len(times):
+            return
+        centers = history[:, :, 0]
+        if self.camera.calibration_data is not None:
+            centers = np.polyval(self.camera.calibration_data, centers)
+        current = centers[-1]
+        heights = history[-1, :, 2] + self.peak_tracker.params[:, 3]
+        self.ax.plot(current, heights, "x", color='yellow')
+        for i, (c, h) in enumerate(zip(current, heights)):
+            if np.isfinite(c):
+                self.ax.text(c, h, f"{i + 1}: {c:.2f} (FWHM {history[-1, i, 1]:.1f} px)", color='yellow', fontsize=8)
+
+        # Verlauf: Verschiebung gegenüber dem ersten gültigen Wert
+        if not self.track_lines:
+            self.track_ax.set_xlabel("Zeit (s)")
+            self.track_ax.set_ylabel("Peakverschiebung")
+            self.track_lines = [self.track_ax.plot([], [], label=f"Peak {i + 1}")[0]
+                                for i in range(self.peak_tracker.count)]
+            self.track_ax.legend(loc="upper left", fontsize=8)
+        t = times - times[0]
+        for i, line in enumerate(self.track_lines):
+            valid = np.isfinite(centers[:, i])
+            reference = centers[valid, i][0] if valid.any() else 0.0
+            line.set_data(t, centers[:, i] - reference)
+        self.track_ax.relim()
+        self.track_ax.autoscale_view()
+        self.track_canvas.draw_idle()
 
     def open_intensity_settings(self):
         dialog = IntensitySettingsDialog(self)
@@ -565,5 +1450,14 @@ class SpectrometerApp(QMainWindow):
         self.zoom_rect = None
 
     def closeEvent(self, event):
+        if self.kinetics is not None:
+            self.kinetics.stop()
+        self.recorder.stop()
+        # Der Export-Thread ist ein Daemon: ausstehende Dateien vor dem Beenden fertig schreiben
+        if self.exporter.pending:
+            print(f"[INFO] Warte auf {self.exporter.pending} ausstehende Exportaufträge...")
+            if not self.exporter.wait(timeout=30.0):
+                print(f"[WARNUNG] {self.exporter.pending} Exportaufträge nicht abgeschlossen, Dateien fehlen.")
+        self.show_export_messages()
         self.camera.release()
         event.accept()
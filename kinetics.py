@@ -0,0 +1,162 @@
+import collections
+import threading
+import time
+
+import cv2
+import numpy as np
+
+
+class ColumnReduction:
+    """
+    Reduziert den Spaltenausschnitt eines Rohbilds wie der Live-Pfad, aber nur für die Kinetik-Spalten.
+
+    Alle Korrekturen werden beim Start einmal für die ausgewählten Spalten
+    vorbereitet, pro Bild bleiben Subtraktion, Multiplikation und Summe auf
+    dem kleinen Block. Reihenfolge wie im Live-Betrieb:
+      Dunkelbild pixelweise abziehen (negative Werte auf 0), Hotpixel aus den
+      vertikalen Nachbarn reparieren, Flatfield-Kehrwert je Pixel, Zeilensumme,
+      Kehrwert der Referenz je Spalte (Relativspektrum).
+    """
+
+    def __init__(self, rows, dark=None, defects=None, gains=None, reciprocal=None):
+        """
+        :param rows: (r0, r1) der summierten Zeilen innerhalb des Blocks
+        :param dark: Dunkelbild (Blockzeilen, Spalten) oder None
+        :param defects: (Zeilen, Spalten, Zeilen oben, Zeilen unten) im Block oder None
+        :param gains: Flatfield-Kehrwert (summierte Zeilen, Spalten) oder None
+        :param reciprocal: Kehrwert der Referenz je Spalte oder None
+        """
+        self.rows = slice(*rows)
+        self.dark = None if dark is None else np.asarray(dark, dtype=np.float32)
+        self.defects = defects if defects is not None and len(defects[0]) else None
+        self.gains = None if gains is None else np.asarray(gains, dtype=np.float32)
+        self.reciprocal = None if reciprocal is None else np.asarray(reciprocal, dtype=np.float64)
+
+    @classmethod
+    def for_columns(cls, region, rows, columns, dark=None, defect_map=None, gains=None, reciprocal=None):
+        """
+        Bereitet die Korrekturen des Live-Pfads für einzelne Rohbild-Spalten vor.
+
+        :param region: (x, y, w, h) im Rohbild, auf dem der Live-Pfad Dunkelbild und Defekte korrigiert
+        :param rows: (y0, y1) der zum Spektrum summierten Zeilen im Rohbild
+        :param columns: Spalten im Rohbild
+        :param dark: Dunkelbild des Ausschnitts region (h, w) oder None
+        :param defect_map: DefectMap oder None
+        :param gains: Flatfield-Kehrwert (summierte Zeilen, Spalten) oder None
+        :param reciprocal: Kehrwert der Referenz je Spalte oder None
+        :return: (Zeilenbereich des Blocks im Rohbild, ColumnReduction)
+        """
+        rx, ry, rw, rh = (int(v) for v in region)
+        columns = np.asarray(columns, dtype=np.int64)
+        b0, b1 = min(ry, rows[0]), max(ry + rh, rows[1])
+        if dark is not None:
+            # Außerhalb des Ausschnitts zieht auch der Live-Pfad nichts ab
+            block_dark = np.zeros((b1 - b0, len(columns)), dtype=np.float32)
+            block_dark[ry - b0:ry - b0 + rh] = np.asarray(dark)[:, columns - rx]
+            dark = block_dark
+        defects = None
+        if defect_map is not None:
+            r, c, up, down = defect_map.column_plan(region, columns)
+            defects = (r + ry - b0, c, up + ry - b0, down + ry - b0)
+        return (b0, b1), cls((rows[0] - b0, rows[1] - b0), dark, defects, gains, reciprocal)
+
+    def __call__(self, block):
+        """:param block: linearisierter Block (Blockzeilen, Spalten) als float32; wird verändert"""
+        if self.dark is not None:
+            np.subtract(block, self.dark, out=block)
+            np.maximum(block, 0, out=block)
+        if self.defects is not None:
+            r, c, up, down = self.defects
+            block[r, c] = 0.5 * (block[up, c] + block[down, c])
+        block = block[self.rows]
+        if self.gains is not None:
+            block = block * self.gains
+        values = block.sum(axis=0, dtype=np.float32)
+        if self.reciprocal is not None:
+            values = values * self.reciprocal
+        return values
+
+
+class KineticsAcquisition:
+    """
+    Schnelle Aufnahme weniger Spalten (Kinetik-Modus) in einem eigenen Thread.
+
+    Pro Bild werden nur die benötigten Zeilen und die vorab bestimmten Spalten
+    (Vereinigung der Kanalbänder, Rohbild-Koordinaten) ausgeschnitten,
+    linearisiert und mit einer ColumnReduction zu Spaltenwerten reduziert.
+    Der Zeitstempel wird direkt
+    nach dem Auslesen im Aufnahme-Thread genommen. Die GUI holt die
+    Ergebnisse gesammelt mit drain() ab; der Thread wartet nie auf die Anzeige.
+    """
+
+    def __init__(self, camera, rows, columns, reduction=None, maxlen=100000):
+        """
+        :param rows: (y0, y1) des Blocks im Rohbild
+        :param columns: Spaltenindizes im Rohbild
+        :param reduction: ColumnReduction für den Block; ohne Angabe die einfache Spaltensumme
+        """
+        self.camera = camera
+        self.rows = rows
+        self.columns = np.asarray(columns, dtype=np.int64)
+        self.reduction = reduction if reduction is not None else ColumnReduction((0, rows[1] - rows[0]))
+        self.samples = collections.deque(maxlen=maxlen)  # (Zeit, Spaltensummen); append/popleft sind threadsicher
+        self.frames = 0
+        self.dropped = 0
+        self._stop = threading.Event()
+        self._thread = None
+
+    @property
+    def running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self, max_fps=1000):
+        """Startet die Aufnahme mit der höchsten Bildrate, die der Treiber zulässt."""
+        self.camera.cap.set(cv2.CAP_PROP_FPS, max_fps)
+        self.fps = self.camera.cap.get(cv2.CAP_PROP_FPS)
+        self._stop.clear()
+        self.started = time.time()
+        self._thread = threading.Thread(target=self._run, name="Kinetik", daemon=True)
+        self._thread.start()
+        return self.fps
+
+    def stop(self):
+        """Beendet den Thread und stellt die Kameraeinstellungen wieder her."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=2.0)
+        self._thread = None
+        self.camera.apply_settings()
+
+    def rate(self):
+        """Erreichte Bildrate seit dem Start (Bilder/s)."""
+        elapsed = time.time() - self.started
+        return self.frames / elapsed if elapsed > 0 else 0.0
+
+    def _run(self):
+        y0, y1 = self.rows
+        while not self._stop.is_set():
+            frame = self.camera.capture_raw_frame()
+            timestamp = time.time()
+            if frame is None:
+                continue
+            block = frame[y0:y1, self.columns]
+            linear = self.camera.response.apply(block) if self.camera.linearize else None
+            values = self.reduction(linear if linear is not None else block.astype(np.float32))
+            if len(self.samples) == self.samples.maxlen:
+                self.dropped += 1
+            self.samples.append((timestamp, values))
+            self.frames += 1
+
+    def drain(self):
+        """
+        Holt alle seit dem letzten Aufruf aufgenommenen Werte ab.
+
+        :return: (Zeiten (n,), Spaltensummen (n, Spalten))
+        """
+        items = []
+        while self.samples:
+            items.append(self.samples.popleft())
+        if not items:
+            return np.empty(0), np.empty((0, len(self.columns)), dtype=np.float32)
+        times, values = zip(*items)
+        return np.array(times), np.vstack(values)
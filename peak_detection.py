@@ -1,25 +1,90 @@
+from bisect import bisect_left
 import numpy as np
-import matplotlib as mpl
-import matplotlib.pyplot as plt
-from scipy.signal import find_peaks
-
-mpl.use("Qt5Agg")
-mpl.rcParams['figure.facecolor'] = '#1e1e1e'
-mpl.rcParams['axes.facecolor'] = '#1e1e1e'
-mpl.rcParams['axes.edgecolor'] = 'white'
-mpl.rcParams['axes.labelcolor'] = 'white'
-mpl.rcParams['xtick.color'] = 'white'
-mpl.rcParams['ytick.color'] = 'white'
-mpl.rcParams['text.color'] = 'white'
-mpl.rcParams['figure.autolayout'] = True
+from scipy.signal import find_peaks, peak_widths
+from peak_fit import fit_multi_peak, fwhm_from_sigma
 
 def detect_peaks(spectrum, height=None, distance=5):
     """Findet Peaks im gegebenen Spektrum."""
     peaks, _ = find_peaks(spectrum, height=height, distance=distance)
     return peaks
 
+class PeakIndex:
+    """
+    Einmal pro Spektrum berechneter Peak-Index.
+
+    Speichert die sortierten Peakpositionen mit Prominenz und Breite und
+    beantwortet Abfragen nach dem nächstgelegenen Peak per Bisektion, statt
+    bei jeder Abfrage find_peaks erneut über das ganze Spektrum laufen zu lassen.
+    """
+
+    def __init__(self, spectrum, height_fraction=0.05, distance=None):
+        spectrum = np.asarray(spectrum, dtype=np.float64)
+        self.positions, props = find_peaks(spectrum, height=height_fraction * np.max(spectrum),
+                                           distance=distance, prominence=0)
+        self.prominences = props["prominences"]
+        if self.positions.size:
+            self.widths = peak_widths(spectrum, self.positions, rel_height=0.5,
+                                      prominence_data=(props["prominences"], props["left_bases"],
+                                                       props["right_bases"]))[0]
+        else:
+            self.widths = np.empty(0)
+        self._positions = self.positions.tolist()
+
+    def __len__(self):
+        return len(self._positions)
+
+    def nearest(self, pixel, max_distance=None):
+        """Index des nächstgelegenen Peaks (oder None, falls keiner in max_distance liegt)."""
+        if not self._positions:
+            return None
+        i = bisect_left(self._positions, pixel)
+        if i == len(self._positions) or (i > 0 and pixel - self._positions[i - 1] <= self._positions[i] - pixel):
+            i -= 1
+        if max_distance is not None and abs(self._positions[i] - pixel) > max_distance:
+            return None
+        return i
+
+    def nearest_position(self, pixel, max_distance=None):
+        """Position des nächstgelegenen Peaks; ohne Treffer wird pixel selbst zurückgegeben."""
+        i = self.nearest(pixel, max_distance)
+        return pixel if i is None else self._positions[i]
+
+def fit_detected_peaks(spectrum, x=None, height=None, distance=5, half_width=20, profile="gauss"):
+    """
+    Fittet alle erkannten Peaks eines Spektrums.
+
+    Peaks, deren Fenster sich überlappen, werden gemeinsam als Mehrlinien-Fit
+    ausgewertet (z. B. Dubletts).
+
+    :return: Liste von (x0, FWHM, Höhe) je gefundener Linie, in x-Einheiten
+    """
+    spectrum = np.asarray(spectrum, dtype=np.float64)
+    if x is None:
+        x = np.arange(len(spectrum), dtype=np.float64)
+    peaks = detect_peaks(spectrum, height=height, distance=distance)
+    results = []
+    if peaks.size == 0:
+        return results
+    # Überlappende Fenster zu Gruppen zusammenfassen
+    breaks = np.flatnonzero(np.diff(peaks) > 2 * half_width) + 1
+    for group in np.split(peaks, breaks):
+        start = max(group[0] - half_width, 0)
+        stop = min(group[-1] + half_width + 1, len(spectrum))
+        try:
+            components, _ = fit_multi_peak(x[start:stop], spectrum[start:stop], profile=profile,
+                                           max_components=len(group) + 2)
+        except (ValueError, RuntimeError) as e:
+            print(f"[WARNUNG] Fit um Pixel {group[0]}-{group[-1]} fehlgeschlagen: {e}")
+            continue
+        for A, x0, sigma, eta in components:
+            results.append((float(x0), float(fwhm_from_sigma(sigma)), float(A)))
+    return results
+
 def plot_spectrum_with_peaks(spectrum):
     """Zeigt das Spektrum mit erkannten Peaks an."""
+    # Erst hier importieren: Detektion und PeakIndex laufen auch ohne GUI (Driftmonitor, Spaltkorrektur)
+    import matplotlib.pyplot as plt
+
     peaks = detect_peaks(spectrum, height=0.05 * np.max(spectrum))  # Höhe = 5% vom Maximum
 
     plt.figure(figsize=(10, 6))
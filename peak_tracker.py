@@ -0,0 +1,111 @@
+import numpy as np
+from peak_fit import estimate_gaussians, refine_gaussians, fwhm_from_sigma
+
+
+class PeakTracker:
+    """
+    Verfolgt eine vom Benutzer gewählte Menge von Peaks über viele Spektren.
+
+    Pro Frame wird für jeden Peak nur ein kleines Fenster um die letzte
+    Position ausgeschnitten und mit der Lösung des Vorframes als Startwert
+    verfeinert (Gauß-Fit, subpixelgenau). Der Aufwand hängt damit nur von der
+    Anzahl der Peaks ab, nicht von der Länge des Spektrums.
+
+    Zentrum, FWHM und Höhe jedes Peaks landen in einem Ringpuffer fester Größe.
+    """
+
+    def __init__(self, half_width=10, capacity=600, max_iter=5):
+        self.half_width = half_width
+        self.capacity = capacity
+        self.max_iter = max_iter
+        self._offsets = np.arange(-half_width, half_width + 1)
+        self.clear()
+
+    def clear(self):
+        """Entfernt alle Peaks und leert den Verlauf."""
+        self.params = np.empty((0, 4))        # (A, x0, sigma, C) je Peak, Pixelkoordinaten
+        self.valid = np.zeros(0, dtype=bool)  # Fit im letzten Frame erfolgreich?
+        self.times = np.full(self.capacity, np.nan)
+        self.history = np.full((self.capacity, 0, 3), np.nan)  # (Zentrum, FWHM, Höhe)
+        self._head = 0
+        self._count = 0
+
+    @property
+    def count(self):
+        return len(self.params)
+
+    def add_peak(self, spectrum, pixel):
+        """Fügt einen Peak hinzu; die Startposition rastet auf das lokale Maximum ein."""
+        spectrum = np.asarray(spectrum, dtype=np.float64)
+        start, stop = self._window(len(spectrum), int(round(pixel)))
+        x0 = start + int(np.argmax(spectrum[start:stop]))
+        p = np.array([[spectrum[x0], x0, self.half_width / 3, spectrum[start:stop].min()]])
+        self.params = np.vstack([self.params, p])
+        self.valid = np.append(self.valid, False)
+        self.history = np.concatenate([self.history, np.full((self.capacity, 1, 3), np.nan)], axis=1)
+        return self.count - 1
+
+    def remove_peak(self, index):
+        self.params = np.delete(self.params, index, axis=0)
+        self.valid = np.delete(self.valid, index)
+        self.history = np.delete(self.history, index, axis=1)
+
+    def nearest_peak(self, pixel):
+        """Index des verfolgten Peaks, der pixel am nächsten liegt (oder None)."""
+        if not self.count:
+            return None
+        return int(np.argmin(np.abs(self.params[:, 1] - pixel)))
+
+    def _window(self, length, center):
+        width = 2 * self.half_width + 1
+        start = int(np.clip(center - self.half_width, 0, max(length - width, 0)))
+        return start, min(start + width, length)
+
+    def update(self, spectrum, timestamp):
+        """
+        Verfeinert alle Peaks im neuen Spektrum und hängt das Ergebnis an den Verlauf an.
+
+        :return: aktuelle Werte (Zentrum, FWHM, Höhe) je Peak, Form (Peaks, 3); NaN bei Fehlschlag
+        """
+        if not self.count:
+            return np.empty((0, 3))
+        spectrum = np.asarray(spectrum, dtype=np.float64)
+        width = len(self._offsets)
+        if len(spectrum) < width:
+            return np.full((self.count, 3), np.nan)
+
+        centers = np.rint(self.params[:, 1]).astype(int)
+        starts = np.clip(centers - self.half_width, 0, len(spectrum) - width)
+        idx = starts[:, None] + self._offsets + self.half_width
+        x = idx.astype(np.float64)
+        y = spectrum[idx]
+
+        # Warmstart mit dem Vorframe, nur fehlgeschlagene Peaks neu schätzen
+        p0 = self.params.copy()
+        if not self.valid.all():
+            p0[~self.valid] = estimate_gaussians(x[~self.valid], y[~self.valid])
+        p = refine_gaussians(x, y, p0, max_iter=self.max_iter)
+
+        ok = (np.isfinite(p).all(1) & (p[:, 0] > 0) & (p[:, 2] > 0)
+              & (p[:, 1] >= x[:, 0]) & (p[:, 1] <= x[:, -1]))
+        self.params[ok] = p[ok]
+        self.valid = ok
+
+        current = np.full((self.count, 3), np.nan)
+        current[ok, 0] = p[ok, 1]
+        current[ok, 1] = fwhm_from_sigma(p[ok, 2])
+        current[ok, 2] = p[ok, 0]
+        self.history[self._head] = current
+        self.times[self._head] = timestamp
+        self._head = (self._head + 1) % self.capacity
+        self._count = min(self._count + 1, self.capacity)
+        return current
+
+    def series(self):
+        """
+        Chronologisch sortierter Verlauf.
+
+        :return: (times, history) mit Formen (n,) und (n, Peaks, 3)
+        """
+        order = (self._head - self._count + np.arange(self._count)) % self.capacity
+        return self.times[order], self.history[order]
@@ -0,0 +1,79 @@
+import datetime
+import os
+
+import numpy as np
+
+
+class Recorder:
+    """
+    Fortlaufende Aufzeichnung von Kanalwerten und optional Spektren in eine CSV-Datei.
+
+    Jede Zeile enthält Zeitstempel, alle Kanalwerte und – falls aktiviert –
+    das Spektrum. Die Datei bleibt während der Aufzeichnung geöffnet, pro Frame
+    wird nur eine Zeile angehängt. Wechselt die Kalibrationsversion während der
+    Aufzeichnung (z. B. Drift-Korrektur), wird das als Kommentarzeile vermerkt;
+    die Wellenlängen im Spaltenkopf gelten weiter für die Startversion.
+    """
+
+    def __init__(self, directory="recordings"):
+        self.directory = directory
+        self.file = None
+        self.path = None
+        self.rows = 0
+        self.version = None  # zuletzt vermerkte Kalibrationsversion
+        self.header_version = None  # Version, für die der Spaltenkopf gilt
+
+    @property
+    def active(self):
+        return self.file is not None
+
+    def start(self, columns, comments=(), version=None):
+        """
+        Öffnet eine neue Aufzeichnungsdatei.
+
+        :param columns: Spaltennamen nach der Zeitspalte
+        :param comments: zusätzliche Kopfzeilen (werden mit "# " eingeleitet)
+        :param version: Kalibrationsversion, für die die Spaltenköpfe gelten
+        """
+        self.stop()
+        os.makedirs(self.directory, exist_ok=True)
+        timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
+        self.path = os.path.join(self.directory, f"recording_{timestamp}.csv")
+        self.file = open(self.path, "w", buffering=1 << 16)
+        self.version = self.header_version = version
+        if version is not None:
+            self.file.write(f"# calibration_version: {version}\n")
+        for line in comments:
+            self.file.write(f"# {line}\n")
+        self.file.write(",".join(["time"] + list(columns)) + "\n")
+        self.rows = 0
+        return self.path
+
+    def write(self, timestamp, values):
+        """Hängt eine Zeile (Zeitstempel, Werte) an."""
+        if self.file is None:
+            return
+        values = np.asarray(values, dtype=np.float64).ravel()
+        self.file.write(f"{timestamp:.3f}," + ",".join(f"{v:.6g}" for v in values) + "\n")
+        self.rows += 1
+
+    def update_version(self, version, timestamp):
+        """Vermerkt eine neue Kalibrationsversion ab timestamp (nur bei Änderung)."""
+        if self.file is None or version == self.version:
+            return
+        self.note(f"calibration_version: {version} ab {timestamp:.3f} "
+                  f"(Spaltenköpfe gelten für Version {self.header_version})")
+        self.version = version
+
+    def note(self, text):
+        """Schreibt eine Kommentarzeile ("# ...") in die laufende Aufzeichnung, z. B. beim Moduswechsel."""
+        if self.file is not None:
+            self.file.write(f"# {text}\n")
+
+    def stop(self):
+        """Schließt die Aufzeichnung und gibt die Anzahl geschriebener Zeilen zurück."""
+        if self.file is None:
+            return 0
+        self.file.close()
+        self.file = None
+        return self.rows
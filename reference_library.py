@@ -0,0 +1,141 @@
+import datetime
+
+import numpy as np
+
+
+def masked_reciprocal(spectrum, min_fraction=1e-3):
+    """
+    Kehrwert eines Referenzspektrums; 0 dort, wo die Referenz zu klein für einen sinnvollen Quotienten ist.
+
+    :param min_fraction: Schwelle relativ zum Maximum der Referenz (je Spur)
+    """
+    spectrum = np.asarray(spectrum, dtype=np.float64)
+    floor = min_fraction * np.max(spectrum, axis=-1, keepdims=True)
+    usable = spectrum > np.maximum(floor, 0)
+    reciprocal = np.zeros_like(spectrum)
+    np.divide(1.0, spectrum, out=reciprocal, where=usable)
+    return reciprocal
+
+
+class ReferenceLibrary:
+    """
+    Bibliothek benannter Referenzspektren für die Quotientenbildung.
+
+    Jeder Eintrag enthält das gemittelte Referenzspektrum (eine Zeile je Spur
+    im Mehrspur-Modus), den vorab berechneten, maskierten Kehrwert sowie
+    Version, Zeitpunkt, Bildzahl und Kalibrationsversion der Aufnahme. Das
+    Relativspektrum ist damit pro Frame eine einzige Multiplikation; das
+    Umschalten zwischen Referenzen (z. B. je Probenhalter) ist nur ein
+    Wechsel des aktiven Eintrags.
+    """
+
+    def __init__(self, min_fraction=1e-3):
+        self.min_fraction = min_fraction
+        self.entries = {}  # Name -> {"spectrum", "reciprocal", "version", "timestamp", "frames", ...}
+        self.active = None
+        self._warned = False
+
+    def __len__(self):
+        return len(self.entries)
+
+    @property
+    def names(self):
+        return list(self.entries)
+
+    @property
+    def current(self):
+        return self.entries.get(self.active)
+
+    def add(self, name, spectrum, frames=1, calibration_version=None, noise=None):
+        """
+        Speichert eine Referenz unter name (eine vorhandene wird mit neuer Version ersetzt) und aktiviert sie.
+
+        :param noise: mittlerer relativer Standardfehler der Mittelung (nur zur Information)
+        :return: Versionsnummer
+        """
+        previous = self.entries.get(name)
+        spectrum = np.array(spectrum, dtype=np.float64)
+        self.entries[name] = {
+            "spectrum": spectrum,
+            "reciprocal": masked_reciprocal(spectrum, self.min_fraction),
+            "version": previous["version"] + 1 if previous else 1,
+            "timestamp": datetime.datetime.now().isoformat(timespec="seconds"),
+            "frames": int(frames),
+            "calibration_version": calibration_version,
+            "noise": None if noise is None else float(noise),
+        }
+        self.select(name)
+        return self.entries[name]["version"]
+
+    def select(self, name):
+        self.active = name if name in self.entries else None
+        self._warned = False
+
+    def remove(self, name):
+        self.entries.pop(name, None)
+        if self.active == name:
+            self.select(next(iter(self.entries), None))
+
+    def describe(self, name=None):
+        entry = self.entries.get(self.active if name is None else name)
+        if entry is None:
+            return "keine Referenz"
+        text = f"Version {entry['version']}, {entry['timestamp']}, {entry['frames']} Bilder"
+        if entry["noise"] is not None:
+            text += f", rel. Fehler {100 * entry['noise']:.2f} %"
+        return text
+
+    def reciprocal_for(self, spectra):
+        """
+        Kehrwert der aktiven Referenz passend zu spectra (Punkte,) bzw. (Spuren, Punkte).
+
+        Jede Spur wird durch ihre eigene Referenzspur geteilt; passt die Zahl
+        der Spuren nicht (z. B. Referenz im Einspur-Modus aufgenommen), wird
+        der Quotient ausgesetzt statt eine Spur auf alle zu übertragen.
+        :return: Array zum Multiplizieren oder None (keine Referenz bzw. andere Spektrumslänge/Spurzahl)
+        """
+        entry = self.current
+        if entry is None:
+            return None
+        reciprocal = entry["reciprocal"]
+        shape = np.shape(spectra)
+        reference_tracks = len(reciprocal) if reciprocal.ndim == 2 else 1
+        tracks = shape[0] if len(shape) == 2 else 1
+        if reciprocal.shape[-1] != shape[-1]:
+            problem = f"hat {reciprocal.shape[-1]} Punkte, das Spektrum {shape[-1]}"
+        elif reference_tracks != tracks:
+            problem = f"hat {reference_tracks} Spur(en), das Spektrum {tracks}"
+        else:
+            return reciprocal[0] if reciprocal.ndim > len(shape) else reciprocal
+        if not self._warned:
+            print(f"[WARNUNG] Referenz '{self.active}' {problem} – Quotient ausgesetzt.")
+            self._warned = True
+        return None
+
+    def to_list(self, store):
+        """Einträge für settings.json; die Arrays gehen als Binärdateien in den SidecarStore."""
+        items = []
+        for name, entry in self.entries.items():
+            item = {key: value for key, value in entry.items() if key not in ("spectrum", "reciprocal")}
+            item["name"] = name
+            item["spectrum"] = store.put(f"reference:{name}", entry["spectrum"])
+            item["reciprocal"] = store.put(f"reciprocal:{name}", entry["reciprocal"])
+            items.append(item)
+        return items
+
+    @classmethod
+    def from_list(cls, items, store, active=None):
+        library = cls()
+        for item in items or []:
+            item = dict(item)
+            name = item.pop("name")
+            spectrum = store.get(f"reference:{name}", item.pop("spectrum"))
+            if spectrum is None:
+                continue
+            reciprocal = store.get(f"reciprocal:{name}", item.pop("reciprocal", None))
+            item["spectrum"] = spectrum
+            item["reciprocal"] = masked_reciprocal(spectrum, library.min_fraction) if reciprocal is None \
+                else reciprocal
+            library.entries[name] = item
+        library.select(active)
+        return library
@@ -1,7 +1,6 @@
 
-import numpy as np
-import cv2
-from PyQt5.QtWidgets import QDialog, QFormLayout, QCheckBox, QPushButton, QMessageBox
+from PyQt5.QtWidgets import (QDialog, QFormLayout, QCheckBox, QPushButton, QMessageBox, QComboBox, QLabel,
+                             QLineEdit, QSpinBox)
 from PyQt5.QtCore import Qt
 
 class RelativeSpectrumDialog(QDialog):
@@ -26,6 +25,20 @@ class RelativeSpectrumDialog(QDialog):
         self.normalize_cb.stateChanged.connect(self.toggle_normalization)
         layout.addRow(self.normalize_cb)
 
+        # Referenzbibliothek: aktive Referenz sofort umschalten
+        self.reference_combo = QComboBox()
+        self.reference_combo.currentTextChanged.connect(self.select_reference)
+        layout.addRow("Aktive Referenz:", self.reference_combo)
+        self.reference_info = QLabel()
+        layout.addRow(self.reference_info)
+
+        self.reference_name_input = QLineEdit(self.parent.references.active or "Referenz")
+        layout.addRow("Name:", self.reference_name_input)
+        self.reference_frames_input = QSpinBox()
+        self.reference_frames_input.setRange(1, 10000)
+        self.reference_frames_input.setValue(50)
+        layout.addRow("Mittelung (Spektren):", self.reference_frames_input)
+
         # Button: Referenzspektrum aufnehmen
         self.btn_capture_ref = QPushButton("Referenzspektrum aufnehmen")
         self.btn_capture_ref.clicked.connect(self.capture_reference_spectrum)
@@ -35,6 +48,21 @@ class RelativeSpectrumDialog(QDialog):
         self.btn_use_current.clicked.connect(self.use_current_as_reference)
         layout.addRow(self.btn_use_current)
 
+        self.btn_remove_ref = QPushButton("Referenz löschen")
+        self.btn_remove_ref.clicked.connect(self.remove_reference)
+        layout.addRow(self.btn_remove_ref)
+        self.refresh_references()
+
+        # Flatfield: Pixelempfindlichkeit/Vignettierung vor der Zeilenreduktion korrigieren
+        self.flat_field_cb = QCheckBox("Flatfield-Korrektur aktivieren")
+        self.flat_field_cb.setChecked(getattr(self.parent, "flat_field_enabled", False))
+        self.flat_field_cb.stateChanged.connect(self.toggle_flat_field)
+        layout.addRow(self.flat_field_cb)
+
+        self.btn_capture_flat = QPushButton("Flatfield aufnehmen (gleichmäßige Lichtquelle)")
+        self.btn_capture_flat.clicked.connect(self.capture_flat_field)
+        layout.addRow(self.btn_capture_flat)
+
         self.setLayout(layout)
 
     def toggle_relative_spectrum(self):
@@ -43,36 +71,72 @@ class RelativeSpectrumDialog(QDialog):
     def toggle_normalization(self):
         self.parent.normalize_relative_spectrum = self.normalize_cb.isChecked()
 
+    def toggle_flat_field(self):
+        self.parent.flat_field_enabled = self.flat_field_cb.isChecked()
+
+    def capture_flat_field(self):
+        if self.parent.capture_flat_field():
+            self.flat_field_cb.setChecked(True)
+            QMessageBox.information(self, "Erfolg", "Flatfield aufgenommen und gespeichert!")
+        else:
+            QMessageBox.warning(self, "Fehler", "Flatfield-Aufnahme fehlgeschlagen!")
+
+    def refresh_references(self, *_):
+        library = self.parent.references
+        self.reference_combo.blockSignals(True)
+        self.reference_combo.clear()
+        self.reference_combo.addItems(library.names)
+        if library.active is not None:
+            self.reference_combo.setCurrentText(library.active)
+        self.reference_combo.blockSignals(False)
+        self.reference_info.setText(library.describe())
+        self.btn_capture_ref.setEnabled(self.parent.reference_capture is None)
+
+    def select_reference(self, name):
+        self.parent.references.select(name)
+        self.reference_info.setText(self.parent.references.describe())
+
+    def reference_name(self):
+        name = self.reference_name_input.text().strip()
+        if not name:
+            QMessageBox.warning(self, "Fehler", "Bitte einen Namen für die Referenz angeben!")
+        return name
+
     def capture_reference_spectrum(self):
-        # Nimm ein Referenzbild auf:
-        frame = self.parent.camera.capture_frame()
-        if frame is None:
-            QMessageBox.warning(self, "Fehler", "Kein Bild empfangen!")
+        # Die Referenz wird aus den nächsten Live-Spektren gemittelt (gleiche Verarbeitung wie das Live-Spektrum)
+        if not self.parent.live_update:
+            QMessageBox.warning(self, "Fehler", "Live-Modus ist nicht aktiv!")
             return
-        # Optional: Falls das Referenzspektrum analog zum normalen Spektrum (z.B. über ROI) berechnet wird:
-        x, y, w, h = self.parent.roi
-        if len(frame.shape) == 3:
-            frame = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
-        roi_frame = frame[y:y+h, x:x+w]
-        if roi_frame.size == 0:
-            QMessageBox.warning(self, "Fehler", "ROI ist leer!")
+        name = self.reference_name()
+        if not name:
             return
-        reference_spectrum = np.sum(roi_frame, axis=0)
-        self.parent.reference_spectrum = reference_spectrum
-        # Speichere als CSV:
-        np.savetxt("reference_spectrum.csv", reference_spectrum, delimiter=",", header="Intensity", comments="")
-        QMessageBox.information(self, "Erfolg", "Referenzspektrum aufgenommen und gespeichert!")
+        self.parent.start_reference_capture(name, self.reference_frames_input.value(),
+                                            finished=self.refresh_references)
+        self.btn_capture_ref.setEnabled(False)
+        self.reference_info.setText(f"Mittle {self.reference_frames_input.value()} Spektren ...")
 
     def use_current_as_reference(self):
-        if not hasattr(self.parent, "spectrum_line") or self.parent.spectrum_line is None:
-            from PyQt5.QtWidgets import QMessageBox
+        # Im Mehrspur-Modus alle Spuren, damit jede durch ihre eigene Referenz geteilt wird
+        spectrum = getattr(self.parent, "raw_track_spectra", None)
+        if spectrum is None:
+            spectrum = getattr(self.parent, "raw_spectrum_line", None)
+        if spectrum is None:
             QMessageBox.warning(self, "Fehler", "Kein aktuelles Spektrum vorhanden!")
             return
-        # Setze das aktuell angezeigte Spektrum als Referenz
-        self.parent.reference_spectrum = self.parent.spectrum_line.copy()
-        # Optional: Speichere das Referenzspektrum in einer Datei
-        np.savetxt("reference_spectrum.csv", self.parent.reference_spectrum, delimiter=",", header="Intensity",
-                   comments="")
-        from PyQt5.QtWidgets import QMessageBox
+        name = self.reference_name()
+        if not name:
+            return
+        # Setze das aktuell angezeigte Spektrum (vor der Quotientenbildung) als Referenz
+        self.parent.references.add(name, spectrum, calibration_version=self.parent.camera.calibration_version)
+        # Speichern (Referenz als Binärdatei neben settings.json):
+        self.parent.save_settings()
+        self.refresh_references()
         QMessageBox.information(self, "Erfolg", "Aktuelles Spektrum als Referenz gesetzt!")
 
+    def remove_reference(self):
+        name = self.reference_combo.currentText()
+        if not name:
+            return
+        self.parent.references.remove(name)
+        self.parent.save_settings()
+        self.refresh_references()
@@ -0,0 +1,143 @@
+from collections import OrderedDict
+
+import numpy as np
+from scipy import sparse
+
+
+def uniform_grid(start, stop, step):
+    """Gleichmäßiges Wellenlängenraster von start bis einschließlich stop (nm)."""
+    count = int(np.floor((stop - start) / step + 1e-9)) + 1
+    return start + step * np.arange(count)
+
+
+def _edges(centers):
+    """Bin-Grenzen aus Bin-Mitten (Mittelpunkte, Ränder linear fortgesetzt)."""
+    mid = 0.5 * (centers[1:] + centers[:-1])
+    return np.concatenate(([2 * centers[0] - mid[0]], mid, [2 * centers[-1] - mid[-1]]))
+
+
+def interpolation_matrix(wavelengths, grid):
+    """
+    Dünnbesetzte Matrix (Raster x Pixel) für lineare Interpolation.
+
+    Jede Zeile hat höchstens zwei Einträge; Rasterpunkte außerhalb der
+    Pixelachse bleiben leer und werden über die zurückgegebene Maske markiert.
+
+    :param wavelengths: Wellenlänge je Pixel, streng monoton (steigend oder fallend)
+    :return: (CSR-Matrix, valid-Maske je Rasterpunkt)
+    """
+    wavelengths = np.asarray(wavelengths, dtype=np.float64)
+    grid = np.asarray(grid, dtype=np.float64)
+    n = len(wavelengths)
+    order = np.arange(n)
+    if wavelengths[-1] < wavelengths[0]:  # gespiegelte Dispersion
+        wavelengths = wavelengths[::-1]
+        order = order[::-1]
+
+    valid = (grid >= wavelengths[0]) & (grid <= wavelengths[-1])
+    rows = np.flatnonzero(valid)
+    right = np.clip(np.searchsorted(wavelengths, grid[rows], side="right"), 1, n - 1)
+    left = right - 1
+    t = (grid[rows] - wavelengths[left]) / (wavelengths[right] - wavelengths[left])
+
+    matrix = sparse.csr_matrix(
+        (np.concatenate((1 - t, t)), (np.concatenate((rows, rows)), np.concatenate((order[left], order[right])))),
+        shape=(len(grid), n))
+    return matrix, valid
+
+
+def rebinning_matrix(wavelengths, grid):
+    """
+    Dünnbesetzte, flusserhaltende Umverteilungsmatrix (Raster x Pixel).
+
+    Jedes Pixel wird als Bin zwischen den Mittelpunkten zu seinen Nachbarn
+    aufgefasst und anteilig nach Überlappung auf die Zielbins verteilt. Die
+    Summe über alle vollständig abgedeckten Zielbins entspricht damit der
+    Summe der Pixelwerte.
+
+    :return: (CSR-Matrix, valid-Maske je Rasterpunkt)
+    """
+    wavelengths = np.asarray(wavelengths, dtype=np.float64)
+    grid = np.asarray(grid, dtype=np.float64)
+    n = len(wavelengths)
+    order = np.arange(n)
+    if wavelengths[-1] < wavelengths[0]:
+        wavelengths = wavelengths[::-1]
+        order = order[::-1]
+
+    pixel_edges = _edges(wavelengths)
+    pixel_width = np.diff(pixel_edges)
+    target_edges = _edges(grid)
+    lower, upper = target_edges[:-1], target_edges[1:]
+    valid = (lower >= pixel_edges[0]) & (upper <= pixel_edges[-1])
+
+    # Bereich der überlappenden Pixel je Zielbin
+    first = np.clip(np.searchsorted(pixel_edges, lower, side="right") - 1, 0, n - 1)
+    last = np.clip(np.searchsorted(pixel_edges, upper, side="left") - 1, 0, n - 1)
+    counts = np.maximum(last - first + 1, 0)
+    rows = np.repeat(np.arange(len(grid)), counts)
+    starts = np.repeat(np.cumsum(counts) - counts, counts)
+    cols = first[rows] + np.arange(len(rows)) - starts
+
+    overlap = (np.minimum(upper[rows], pixel_edges[cols + 1])
+               - np.maximum(lower[rows], pixel_edges[cols]))
+    weights = np.clip(overlap, 0, None) / pixel_width[cols]
+    matrix = sparse.csr_matrix((weights, (rows, order[cols])), shape=(len(grid), n))
+    matrix.eliminate_zeros()
+    return matrix, valid
+
+
+class Resampler:
+    """
+    Bringt Spektren auf ein gemeinsames Wellenlängenraster.
+
+    Die Umrechnungsmatrix hängt nur von (Kalibration, ROI-Breite, Zielraster,
+    Modus) ab und wird dafür einmal berechnet und zwischengespeichert. Danach ist
+    das Umrechnen eines einzelnen Spektrums oder eines ganzen Stapels nur noch ein
+    Produkt mit einer dünnbesetzten Matrix.
+    """
+
+    def __init__(self, max_cached=16):
+        self.max_cached = max_cached
+        self._cache = OrderedDict()
+
+    def matrix(self, calibration, width, grid, flux_conserving=False):
+        """Umrechnungsmatrix und valid-Maske für den gegebenen Schlüssel (gecacht)."""
+        calibration = np.asarray(calibration, dtype=np.float64)
+        grid = np.asarray(grid, dtype=np.float64)
+        key = (calibration.tobytes(), int(width), grid.tobytes(), bool(flux_conserving))
+        if key in self._cache:
+            self._cache.move_to_end(key)
+            return self._cache[key]
+
+        wavelengths = np.polyval(calibration, np.arange(width))
+        if np.any(np.diff(wavelengths) == 0) or np.any(np.diff(np.sign(np.diff(wavelengths)))):
+            raise ValueError("Kalibration ist im ROI nicht streng monoton.")
+        build = rebinning_matrix if flux_conserving else interpolation_matrix
+        result = build(wavelengths, grid)
+        self._cache[key] = result
+        if len(self._cache) > self.max_cached:
+            self._cache.popitem(last=False)
+        return result
+
+    def resample(self, spectra, calibration, grid, flux_conserving=False, fill_value=np.nan, chunk_size=64):
+        """
+        Rechnet ein Spektrum (Pixel,) oder einen Stapel (Spektren, Pixel) auf das Raster um.
+
+        :param fill_value: Wert für Rasterpunkte außerhalb des kalibrierten Bereichs
+        :param chunk_size: Spektren je Teilprodukt; kleine Blöcke bleiben im Cache und
+                           sind bei großen Stapeln deutlich schneller als ein einziges Produkt
+        :return: Array der Form (Raster,) bzw. (Spektren, Raster)
+        """
+        spectra = np.asarray(spectra)
+        matrix, valid = self.matrix(calibration, spectra.shape[-1], grid, flux_conserving)
+        if spectra.ndim == 1:
+            result = matrix @ spectra.astype(np.float64, copy=False)
+        else:
+            result = np.empty((len(spectra), matrix.shape[0]))
+            for start in range(0, len(spectra), chunk_size):
+                block = spectra[start:start + chunk_size]
+                result[start:start + chunk_size] = (matrix @ block.T).T
+        if fill_value is not None and not valid.all():
+            result[..., ~valid] = fill_value
+        return result
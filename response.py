@@ -0,0 +1,90 @@
+import os
+
+import cv2
+import numpy as np
+
+
+class CameraResponse:
+    """
+    Linearisierung der Kamerakennlinie (Gamma, Kontrastkurven der Webcam).
+
+    Die inverse Kennlinie wird aus einer Belichtungsreihe einer stabilen
+    Lichtquelle nach Debevec & Malik (1997) geschätzt und als Lookup-Tabelle
+    mit 256 Einträgen gespeichert. cv2.LUT wendet sie direkt auf das 8-Bit-
+    Graubild an und liefert float32 – Linearisierung und Float-Konvertierung
+    sind damit ein einziger Durchgang. Die Tabelle ist so skaliert, dass 255
+    wieder auf 255 abgebildet wird; Schwellen und Anzeigegrenzen bleiben gültig.
+    """
+
+    def __init__(self, path="camera_response.npz"):
+        self.path = path
+        self.lut = None
+        if os.path.exists(path):
+            try:
+                with np.load(path) as data:
+                    self.lut = data["lut"].astype(np.float32)
+            except Exception as e:
+                print(f"[WARNUNG] Kamerakennlinie konnte nicht geladen werden: {e}")
+
+    @property
+    def ready(self):
+        return self.lut is not None
+
+    def apply(self, gray):
+        """Linearisiert ein 8-Bit-Graubild (uint8) und gibt float32 zurück; None für andere Bittiefen."""
+        if self.lut is None or gray.dtype != np.uint8:
+            return None
+        return cv2.LUT(gray, self.lut)
+
+    @staticmethod
+    def sample_pixels(stack, count=300):
+        """
+        Wählt Pixel, die in der mittleren Belichtung den Wertebereich gleichmäßig abdecken.
+
+        :param stack: Bilder der Belichtungsreihe, Form (Belichtungen, H, W), uint8
+        :return: Pixelwerte, Form (count, Belichtungen)
+        """
+        flat = stack.reshape(len(stack), -1)
+        middle = flat[len(stack) // 2]
+        order = np.argsort(middle, kind="stable")
+        picks = order[np.linspace(0, len(order) - 1, count).astype(int)]
+        return flat[:, picks].T
+
+    def calibrate(self, stack, exposures, smoothness=100.0, count=300):
+        """
+        Schätzt die inverse Kennlinie aus einer Belichtungsreihe und speichert die LUT.
+
+        :param stack: Bilder (Belichtungen, H, W) als uint8, gleiche Szene
+        :param exposures: OpenCV-Belichtungswerte (log2 s) der Bilder
+        :param smoothness: Gewicht der Glattheitsbedingung (zweite Ableitung)
+        :return: LUT (256,) float32
+        """
+        Z = self.sample_pixels(np.asarray(stack, dtype=np.uint8), count).astype(np.int64)
+        log_t = np.asarray(exposures, dtype=np.float64) * np.log(2.0)
+        n, p = Z.shape
+        levels = 256
+        weight = np.minimum(np.arange(levels), levels - 1 - np.arange(levels)).astype(np.float64)
+
+        # Unbekannte: g(0..255), ln E_i (i = 0..n-1)
+        rows = n * p + 1 + (levels - 2)
+        A = np.zeros((rows, levels + n))
+        b = np.zeros(rows)
+        w = weight[Z].ravel()
+        k = np.arange(n * p)
+        A[k, Z.ravel()] = w
+        A[k, levels + np.repeat(np.arange(n), p)] = -w
+        b[:n * p] = w * np.tile(log_t, n)
+        A[n * p, levels // 2] = 1.0  # g(128) = 0 legt die Skala fest
+        z = np.arange(1, levels - 1)
+        r = n * p + 1 + np.arange(levels - 2)
+        A[r, z - 1] = smoothness * weight[z]
+        A[r, z] = -2 * smoothness * weight[z]
+        A[r, z + 1] = smoothness * weight[z]
+
+        g = np.linalg.lstsq(A, b, rcond=None)[0][:levels]
+        linear = np.exp(g - g.max())
+        linear = np.maximum.accumulate(linear)
+        linear = (linear - linear[0]) / (linear[-1] - linear[0]) * 255.0
+        self.lut = linear.astype(np.float32)
+        np.savez_compressed(self.path, lut=self.lut, exposures=np.asarray(exposures))
+        return self.lut
@@ -1,9 +1,9 @@
 import cv2
 import numpy as np
-from PyQt5.QtWidgets import QDialog, QVBoxLayout, QPushButton, QFormLayout, QSpinBox, QLabel
+from PyQt5.QtWidgets import QDialog, QVBoxLayout, QPushButton, QFormLayout, QSpinBox, QLabel, QLineEdit, QCheckBox
 from PyQt5.QtGui import QPixmap, QImage, QPainter, QColor
 from PyQt5.QtCore import Qt, QRect, QTimer
-from roi_model import ROI  # Import der neuen ROI-Klasse
+from roi_model import ROI, Track, TrackSet  # Import der neuen ROI-Klasse
 
 class InteractiveLabel(QLabel):
     def __init__(self, parent=None):
@@ -84,6 +84,14 @@ class ROIDialog(QDialog):
         form_layout.addRow("Y:", self.y_input)
         form_layout.addRow("Breite:", self.width_input)
         form_layout.addRow("Höhe:", self.height_input)
+        # Mehrspur-Modus: Spuren als "Name:y:Höhe" (durch Kommas getrennt), Spalten aus der ROI
+        self.multitrack_checkbox = QCheckBox("Mehrspur-Modus")
+        self.multitrack_checkbox.setChecked(getattr(self.parent, "multitrack_enabled", False))
+        form_layout.addRow(self.multitrack_checkbox)
+        self.tracks_input = QLineEdit(self.format_tracks(getattr(self.parent, "tracks", TrackSet())))
+        self.tracks_input.setPlaceholderText("Faser1:450:40, Faser2:520:40")
+        self.tracks_input.editingFinished.connect(self.update_live_image)
+        form_layout.addRow("Spuren:", self.tracks_input)
         layout.addLayout(form_layout)
         self.apply_button = QPushButton("Übernehmen")
         self.apply_button.clicked.connect(self.apply_roi)
@@ -119,6 +127,11 @@ class ROIDialog(QDialog):
             qimg = QImage(padded_image.data, w, h, bytes_per_line, QImage.Format_RGB888)
             pixmap = QPixmap.fromImage(qimg)
             self.roi.draw_on_pixmap(pixmap, self.last_scale_x, self.last_scale_y, x_offset, y_offset)
+            tracks = self.parse_tracks()
+            if tracks is not None:
+                for track in tracks.tracks:
+                    ROI(self.roi.x, track.y, self.roi.width, track.height).draw_on_pixmap(
+                        pixmap, self.last_scale_x, self.last_scale_y, x_offset, y_offset, QColor(0, 255, 255))
             self.image_label.setPixmap(pixmap)
 
     def interactive_roi_update(self, start_x, start_y, end_x, end_y, live):
@@ -150,8 +163,32 @@ class ROIDialog(QDialog):
                         self.width_input.value(), self.height_input.value())
         self.update_live_image()
 
+    @staticmethod
+    def format_tracks(tracks):
+        return ", ".join(f"{t.name}:{t.y}:{t.height}" for t in tracks.tracks)
+
+    def parse_tracks(self):
+        """Liest die Spuren aus dem Textfeld; None bei ungültiger Eingabe."""
+        tracks = []
+        for i, entry in enumerate(filter(None, (e.strip() for e in self.tracks_input.text().split(",")))):
+            parts = [p.strip() for p in entry.split(":")]
+            try:
+                if len(parts) == 2:
+                    parts.insert(0, f"Spur {i + 1}")
+                name, y, height = parts
+                tracks.append(Track(name, int(y), int(height)))
+            except ValueError:
+                return None
+        return TrackSet(tracks)
+
     def apply_roi(self):
         self.parent.roi = self.roi.as_tuple()
+        tracks = self.parse_tracks()
+        if tracks is None:
+            print("[WARNUNG] Spuren ungültig (Format: Name:y:Höhe, ...), Mehrspur-Modus bleibt unverändert.")
+        else:
+            self.parent.tracks = tracks
+            self.parent.multitrack_enabled = self.multitrack_checkbox.isChecked() and len(tracks) > 0
         self.accept()
 
     def closeEvent(self, event):
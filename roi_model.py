@@ -1,3 +1,4 @@
+import numpy as np
 from PyQt5.QtCore import QRect
 from PyQt5.QtGui import QPainter, QColor
 
@@ -17,12 +18,95 @@ class ROI:
     def as_tuple(self):
         return (self.x, self.y, self.width, self.height)
 
-    def draw_on_pixmap(self, pixmap, scale_x: float = 1.0, scale_y: float = 1.0, offset_x: int = 0, offset_y: int = 0):
+    def draw_on_pixmap(self, pixmap, scale_x: float = 1.0, scale_y: float = 1.0, offset_x: int = 0, offset_y: int = 0,
+                       color=None):
         painter = QPainter(pixmap)
-        painter.setPen(QColor(0, 255, 0))
+        painter.setPen(color if color is not None else QColor(0, 255, 0))
         rect = QRect(int(self.x * scale_x + offset_x),
                      int(self.y * scale_y + offset_y),
                      int(self.width * scale_x),
                      int(self.height * scale_y))
         painter.drawRect(rect)
         painter.end()
+
+
+class Track:
+    """Benannte Spur (z. B. eine Faser): Zeilenbereich innerhalb der Spalten der Haupt-ROI."""
+
+    def __init__(self, name: str, y: int, height: int):
+        self.name = name
+        self.y = y
+        self.height = height
+
+    def as_dict(self):
+        return {"name": self.name, "y": self.y, "height": self.height}
+
+
+class TrackSet:
+    """
+    Mehrere Spuren, die in einem Durchgang extrahiert werden.
+
+    Alle Spuren teilen sich die Spalten der Haupt-ROI und damit die
+    Wellenlängenachse. Der Zeilenbereich, der alle Spuren umfasst, wird einmal
+    ausgeschnitten und mit einem einzigen np.add.reduceat über die Zeilen auf
+    ein Spektrum je Spur reduziert. Überlappen sich Spuren nicht, laufen die
+    Segmente direkt über den Ausschnitt (Lücken werden als eigene Segmente
+    mitsummiert und verworfen); sonst werden die Zeilen vorher indiziert.
+    """
+
+    def __init__(self, tracks=()):
+        self.tracks = list(tracks)
+        self._plan_key = None
+
+    @classmethod
+    def from_list(cls, data):
+        return cls(Track(d["name"], int(d["y"]), int(d["height"])) for d in (data or []))
+
+    def to_list(self):
+        return [t.as_dict() for t in self.tracks]
+
+    def __len__(self):
+        return len(self.tracks)
+
+    @property
+    def names(self):
+        return [t.name for t in self.tracks]
+
+    def _ranges(self, scale):
+        return [(int(t.y * scale), int(t.y * scale) + max(int(t.height * scale), 1)) for t in self.tracks]
+
+    def bounds(self, scale=1.0):
+        """Zeilenbereich (y0, y1), der alle Spuren umfasst."""
+        ranges = self._ranges(scale)
+        return min(r[0] for r in ranges), max(r[1] for r in ranges)
+
+    def _plan(self, scale):
+        key = (scale, tuple((t.y, t.height) for t in self.tracks))
+        if key != self._plan_key:
+            ranges = self._ranges(scale)
+            y0, y1 = self.bounds(scale)
+            ordered = sorted(ranges)
+            overlapping = any(a[1] > b[0] for a, b in zip(ordered, ordered[1:]))
+            if overlapping:
+                lengths = np.array([stop - start for start, stop in ranges])
+                self._rows = np.concatenate([np.arange(start, stop) - y0 for start, stop in ranges])
+                self._starts = np.cumsum(lengths) - lengths
+                self._select = np.arange(len(ranges))
+            else:
+                boundaries = sorted({b - y0 for r in ranges for b in r} - {y1 - y0})
+                self._rows = None
+                self._starts = np.array(boundaries)
+                self._select = np.array([boundaries.index(start - y0) for start, _ in ranges])
+            self._plan_key = key
+        return self._rows, self._starts, self._select
+
+    def reduce(self, block, scale=1.0):
+        """
+        Summiert die Spuren aus dem Ausschnitt block = frame[y0:y1, Spalten der ROI].
+
+        :return: Array der Form (Spuren, Spalten)
+        """
+        rows, starts, select = self._plan(scale)
+        if rows is not None:
+            return np.add.reduceat(block[rows], starts, axis=0)
+        return np.add.reduceat(block, starts, axis=0)[select]
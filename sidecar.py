@@ -0,0 +1,89 @@
+import hashlib
+import os
+
+import numpy as np
+from atomic_write import write_atomic
+
+
+class SidecarStore:
+    """
+    Ablage großer Arrays (z. B. Referenzspektren) als binäre .npy-Dateien neben settings.json.
+
+    In settings.json steht nur ein kurzer Verweis mit dem Inhalts-Hash, die
+    Daten liegen unter <directory>/<hash>.npy. Gleicher Inhalt ergibt
+    denselben Dateinamen, unveränderte Arrays werden also weder erneut
+    gehasht noch geschrieben. Geladen wird als Memory-Map (nur lesend): die
+    Daten werden erst beim ersten Zugriff tatsächlich von der Platte gelesen.
+    """
+
+    def __init__(self, directory="arrays"):
+        self.directory = directory
+        self._known = {}  # Name -> (Array, Hash) der zuletzt gespeicherten/geladenen Arrays
+
+    @staticmethod
+    def digest(array):
+        h = hashlib.sha1(f"{array.dtype.str}{array.shape}".encode())
+        h.update(np.ascontiguousarray(array).data)
+        return h.hexdigest()[:16]
+
+    def path(self, digest):
+        return os.path.join(self.directory, f"{digest}.npy")
+
+    def put(self, name, array):
+        """
+        Speichert array (falls noch nicht vorhanden) und gibt den Verweis für settings.json zurück.
+
+        :param name: Schlüssel in settings.json; ist es dasselbe Array wie beim letzten Mal, entfällt das Hashen
+        """
+        if array is None:
+            self._known.pop(name, None)
+            return None
+        known = self._known.get(name)
+        if known is not None and known[0] is array:
+            digest = known[1]
+        else:
+            digest = self.digest(np.asarray(array))
+        path = self.path(digest)
+        if not os.path.exists(path):
+            write_atomic(path, lambda f: np.save(f, np.asarray(array)))
+        self._known[name] = (array, digest)
+        return {"sidecar": digest, "shape": list(np.shape(array)), "dtype": np.asarray(array).dtype.str}
+
+    def get(self, name, reference):
+        """
+        Öffnet das Array zu einem Verweis aus settings.json als Memory-Map.
+
+        Ältere settings.json enthalten das Array noch als Liste; diese wird direkt übernommen.
+        :return: Array oder None, falls kein Verweis vorhanden bzw. die Datei fehlt
+        """
+        if reference is None:
+            return None
+        if isinstance(reference, list):
+            return np.asarray(reference, dtype=np.float64)
+        try:
+            array = np.load(self.path(reference["sidecar"]), mmap_mode="r")
+        except (OSError, ValueError, KeyError) as e:
+            print(f"[WARNUNG] Array '{name}' konnte nicht geladen werden: {e}")
+            return None
+        self._known[name] = (array, reference["sidecar"])
+        return array
+
+    def prune(self, references):
+        """
+        Löscht Dateien, auf die keiner der übergebenen Verweise mehr zeigt.
+
+        Lässt sich eine Datei nicht löschen (z. B. unter Windows noch als
+        Memory-Map geöffnet), bleibt sie liegen; prune läuft bei jedem
+        Speichern und versucht es dann erneut.
+        """
+        keep = {r["sidecar"] for r in references if r}
+        # Verweise auf nicht mehr benötigte Arrays freigeben (schließt auch deren Memory-Maps)
+        self._known = {name: known for name, known in self._known.items() if known[1] in keep}
+        if not os.path.isdir(self.directory):
+            return
+        for name in os.listdir(self.directory):
+            if name.endswith(".npy") and name[:-len(".npy")] not in keep:
+                try:
+                    os.remove(os.path.join(self.directory, name))
+                except OSError as e:
+                    print(f"[WARNUNG] {name} konnte nicht gelöscht werden, neuer Versuch beim nächsten Speichern: {e}")
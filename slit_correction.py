@@ -0,0 +1,137 @@
+import numpy as np
+from scipy import sparse
+from peak_detection import PeakIndex
+
+
+class SlitCorrection:
+    """
+    Geometrische Korrektur von Spaltneigung (Tilt) und -krümmung (Smile).
+
+    Eine Spektrallinie liegt im Kamerabild nicht exakt senkrecht, sondern bei
+
+        x(y) = x_m + tilt(x_m) * (y - y_ref) + curvature(x_m) * (y - y_ref)^2
+
+    tilt und curvature sind lineare Polynome in der Spaltenposition (Vollbild-
+    koordinaten), geschätzt aus einem Lampenbild. Für jede ROI (Lage + Größe)
+    wird daraus einmal ein Remap aus Quellindex und Interpolationsgewicht
+    berechnet. Für die reine Extraktion werden Remap und Spaltensumme zu einer
+    dünnbesetzten Matrix zusammengefasst, sodass jeder Frame in einem einzigen
+    Produkt begradigt und reduziert wird.
+    """
+
+    def __init__(self, tilt=None, curvature=None, reference_row=None):
+        self.tilt = None if tilt is None else np.asarray(tilt, dtype=np.float64)
+        self.curvature = None if curvature is None else np.asarray(curvature, dtype=np.float64)
+        self.reference_row = reference_row
+        self._maps = {}
+        self._matrices = {}
+
+    @property
+    def ready(self):
+        return self.tilt is not None
+
+    def to_dict(self):
+        """Koeffizienten für settings.json."""
+        if not self.ready:
+            return None
+        return {"tilt": self.tilt.tolist(), "curvature": self.curvature.tolist(),
+                "reference_row": self.reference_row}
+
+    @classmethod
+    def from_dict(cls, data):
+        if not data:
+            return cls()
+        return cls(data["tilt"], data["curvature"], data["reference_row"])
+
+    def estimate(self, roi_frame, origin=(0, 0), max_lines=8, half_width=6, min_signal=0.2):
+        """
+        Schätzt Neigung und Krümmung aus einem Lampenbild (ROI-Ausschnitt).
+
+        Pro Linie wird zeilenweise der Schwerpunkt im Fenster um den Peak bestimmt
+        und ein Polynom 2. Grades in y angepasst; die Koeffizienten aller Linien
+        werden anschließend linear über x interpoliert.
+
+        :param origin: (x, y) der ROI im Vollbild
+        :return: Anzahl der verwendeten Linien
+        """
+        roi_frame = np.asarray(roi_frame, dtype=np.float64)
+        h, w = roi_frame.shape
+        if h < 5:
+            raise ValueError("ROI zu niedrig für eine Krümmungsschätzung.")
+        x0, y0 = origin
+        rows = np.arange(h, dtype=np.float64)
+        reference_row = (h - 1) / 2
+
+        index = PeakIndex(roi_frame.sum(axis=0))
+        order = np.argsort(index.prominences)[::-1][:max_lines]
+        offsets = np.arange(-half_width, half_width + 1)
+
+        centers, tilts, curvatures = [], [], []
+        for peak in index.positions[order]:
+            cols = np.clip(peak + offsets, 0, w - 1)
+            window = roi_frame[:, cols]
+            window = window - window.min(axis=1, keepdims=True)
+            signal = window.sum(axis=1)
+            good = signal > min_signal * signal.max()
+            if good.sum() < 5:
+                continue
+            centroid = (window[good] * cols).sum(axis=1) / signal[good]
+            curvature, tilt, center = np.polyfit(rows[good] - reference_row, centroid, 2, w=np.sqrt(signal[good]))
+            centers.append(center)
+            tilts.append(tilt)
+            curvatures.append(curvature)
+
+        if not centers:
+            raise ValueError("Keine auswertbaren Linien im Lampenbild gefunden.")
+        centers = np.asarray(centers) + x0
+        degree = 1 if len(centers) >= 2 else 0
+        self.tilt = np.polyfit(centers, tilts, degree)
+        self.curvature = np.polyfit(centers, curvatures, degree)
+        self.reference_row = reference_row + y0
+        self._maps = {}
+        self._matrices = {}
+        return len(centers)
+
+    def remap(self, origin, shape):
+        """
+        Quellindex (flach) und Gewicht für eine ROI, gecacht je (origin, shape).
+
+        Begradigter Wert: roi.flat[index] * (1 - weight) + roi.flat[index + 1] * weight
+        """
+        key = (tuple(origin), tuple(shape))
+        if key not in self._maps:
+            h, w = shape
+            x0, y0 = origin
+            x = np.arange(w, dtype=np.float64)
+            dy = np.arange(h, dtype=np.float64)[:, None] + y0 - self.reference_row
+            shift = np.polyval(self.tilt, x + x0) * dy + np.polyval(self.curvature, x + x0) * dy ** 2
+            source = np.clip(x + shift, 0, w - 1)
+            left = np.minimum(np.floor(source).astype(np.int64), max(w - 2, 0))
+            weight = (source - left).astype(np.float32)
+            index = left + w * np.arange(h)[:, None]
+            self._maps[key] = (index, weight)
+        return self._maps[key]
+
+    def straighten(self, roi_frame, origin=(0, 0)):
+        """Begradigter ROI-Ausschnitt (gleiche Form wie roi_frame)."""
+        index, weight = self.remap(origin, roi_frame.shape)
+        flat = np.ravel(roi_frame)
+        left = flat[index]
+        return left + (flat[index + 1] - left) * weight
+
+    def extraction_matrix(self, origin, shape):
+        """Dünnbesetzte Matrix (Spalten x Pixel der ROI): Remap und Spaltensumme in einem."""
+        key = (tuple(origin), tuple(shape))
+        if key not in self._matrices:
+            index, weight = self.remap(origin, shape)
+            h, w = shape
+            columns = np.tile(np.arange(w), h)
+            self._matrices[key] = sparse.csr_matrix(
+                (np.concatenate(((1 - weight).ravel(), weight.ravel())),
+                 (np.concatenate((columns, columns)), np.concatenate((index.ravel(), index.ravel() + 1)))),
+                shape=(w, h * w), dtype=np.float32)
+        return self._matrices[key]
+
+    def extract(self, roi_frame, origin=(0, 0)):
+        """Begradigt und summiert die ROI spaltenweise (ersetzt np.sum(roi_frame, axis=0))."""
+        return self.extraction_matrix(origin, roi_frame.shape) @ np.ravel(roi_frame)
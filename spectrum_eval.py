@@ -5,16 +5,12 @@ import tkinter as tk
 from tkinter import ttk
 import os
 
-# --- optional: SciPy für robusten Gauß-Fit ---
-try:
-    from scipy.optimize import curve_fit
-    HAVE_SCIPY = True
-except Exception:
-    HAVE_SCIPY = False
+from peak_fit import fit_multi_peak, multi_peak_model
 
 # ----- Einstellungen -----
 FOLDER = "./"   # Ordner mit CSVs
 WINDOW_NM = 20          # Fit-Fenster ± nm um Klick
+PROFILE = "gauss"       # Linienprofil: "gauss" oder "voigt"
 ZOOM_IN  = 1.2          # Mausrad rein
 ZOOM_OUT = 1/ZOOM_IN    # Mausrad raus
 
@@ -24,7 +20,7 @@ if not files:
     raise FileNotFoundError(f"Keine CSV-Dateien in {FOLDER}")
 
 def load_csv(path):
-    df = pd.read_csv(path)
+    df = pd.read_csv(path, comment="#")  # Kopfzeilen wie "# calibration_version: 3" überspringen
     # Spalten: Wavelength, Intensity
     return df["Wavelength"].to_numpy(), df["Intensity"].to_numpy()
 
@@ -44,7 +40,7 @@ info_txt = ax.text(0.02, 0.95, "", transform=ax.transAxes, va="top")
 
 ax.set_xlabel("Wellenlänge [nm]")
 ax.set_ylabel("Intensität [a.u.]")
-ax.set_title("Spektrum – Klick: Gauß-Fit, Mausrad: Zoom")
+ax.set_title("Spektrum – Klick: Linien-Fit, Mausrad: Zoom")
 ax.legend(loc="best")
 
 # ----- Gauß-Modell + Hilfsfunktionen -----
@@ -55,22 +51,12 @@ def gauss(x, A, x0, sigma, C):
 def fwhm_from_sigma(sigma):
     return 2.354820045 * sigma  # 2*sqrt(2*ln2)
 
-def fit_gaussian(x, y):
-    """Versucht Gauß-Fit; gibt (A,x0,sigma,C), y_fit zurück. Kann ValueError werfen."""
-    # Initialschätzer
-    i_max = np.argmax(y)
-    x0_0 = float(x[i_max])
-    A_0  = float(y.max() - y.min())
-    C_0  = float(np.median(y[:max(3, len(y)//10)]))  # grober Untergrund
-    sigma_0 = max((x.max() - x.min()) / 6.0, 1e-3)
-
-    p0 = [A_0, x0_0, sigma_0, C_0]
-    bounds = ([0, x.min(), 1e-6, -np.inf], [np.inf, x.max(), (x.max()-x.min()), np.inf])
-
-    popt, _ = curve_fit(gauss, x, y, p0=p0, bounds=bounds, maxfev=2000)
+def fit_lines(x, y):
+    """Mehrlinien-Fit (Anzahl automatisch); gibt components, (x_fit, y_fit) zurück. Kann ValueError/RuntimeError werfen."""
+    components, baseline = fit_multi_peak(x, y, profile=PROFILE)
     x_fit = np.linspace(x.min(), x.max(), 400)
-    y_fit = gauss(x_fit, *popt)
-    return popt, (x_fit, y_fit)
+    y_fit = multi_peak_model(x_fit, components, baseline)
+    return components, baseline, (x_fit, y_fit)
 
 # ----- Klick-Event: Fit umsetzen -----
 def on_click(event):
@@ -102,15 +88,12 @@ def on_click(event):
     x = wavelength[mask]
     y = intensity[mask]
 
-    # Gauß-Fit (SciPy), Fallback Parabel
+    # Mehrlinien-Fit, Fallback Parabel
     used_gauss = False
     try:
-        if HAVE_SCIPY:
-            popt, (x_fit, y_fit) = fit_gaussian(x, y)
-            A, x0, sigma, C = popt
-            used_gauss = True
-        else:
-            raise RuntimeError("SciPy fehlt, Parabel-Fallback")
+        components, baseline, (x_fit, y_fit) = fit_lines(x, y)
+        x0 = components[:, 1]
+        used_gauss = True
     except Exception:
         # Parabel-Fit als Fallback
         a, b, c = np.polyfit(x, y, 2)
@@ -130,11 +113,11 @@ def on_click(event):
     # Plot-Update
     fit_line.set_data(x_fit, y_fit)
     y0 = np.interp(x0, x_fit, y_fit)
-    peak_marker.set_data([x0], [y0])
+    peak_marker.set_data(np.atleast_1d(x0), np.atleast_1d(y0))
 
     if used_gauss:
-        fwhm = fwhm_from_sigma(sigma)
-        info_txt.set_text(f"Peak: {x0:.3f} nm  |  FWHM: {fwhm:.3f} nm")
+        info_txt.set_text("\n".join(f"Peak: {c:.3f} nm  |  FWHM: {fwhm_from_sigma(s):.3f} nm"
+                                    for c, s in components[:, 1:3]) or "Kein Peak im Fenster")
     else:
         info_txt.set_text(f"Peak (Parabel): {x0:.3f} nm")
 
@@ -187,7 +170,7 @@ combo.set(files[0])
 combo.pack(padx=10, pady=10)
 combo.bind("<<ComboboxSelected>>", on_file_select)
 
-ttk.Label(root, text="Klick: Gauß-Fit (Fallback Parabel)\nMausrad: Zoom um Cursor").pack(pady=6)
+ttk.Label(root, text="Klick: Linien-Fit (Fallback Parabel)\nMausrad: Zoom um Cursor").pack(pady=6)
 
 # Events
 fig.canvas.mpl_connect("button_press_event", on_click)
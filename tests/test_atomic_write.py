@@ -0,0 +1,27 @@
+import os
+
+import pytest
+
+from atomic_write import write_atomic
+
+
+def test_write_atomic_replaces_file(tmp_path):
+    path = tmp_path / "sub" / "data.bin"
+    write_atomic(str(path), lambda f: f.write(b"alt"))
+    write_atomic(str(path), lambda f: f.write(b"neu"))
+    assert path.read_bytes() == b"neu"
+    assert os.listdir(path.parent) == ["data.bin"]
+
+
+def test_write_atomic_removes_temporary_on_failure(tmp_path):
+    path = tmp_path / "data.bin"
+    path.write_bytes(b"alt")
+
+    def broken(f):
+        f.write(b"halb")
+        raise OSError("Datenträger voll")
+
+    with pytest.raises(OSError):
+        write_atomic(str(path), broken)
+    assert path.read_bytes() == b"alt"
+    assert os.listdir(tmp_path) == ["data.bin"]
@@ -0,0 +1,87 @@
+import numpy as np
+import pytest
+
+from auto_calibration import (LAMP_LINES, auto_calibrate, refine_peak_position, refine_peak_positions,
+                              select_polynomial_degree)
+
+PIXELS = 1280
+# Leicht gekrümmte Dispersion wie bei einem typischen Gitterspektrometer
+TRUE = np.array([-2.0e-5, 0.33, 380.0])
+
+
+def pixels_for(lines, coeffs=TRUE):
+    grid = np.arange(PIXELS, dtype=np.float64)
+    wl = np.polyval(coeffs, grid)
+    lines = np.asarray(lines)
+    lines = lines[(lines > wl[0]) & (lines < wl[-1])]
+    return np.interp(lines, wl, grid), lines
+
+
+def test_select_degree_prefers_linear_for_linear_data():
+    rng = np.random.default_rng(1)
+    px = np.linspace(0, 1000, 12)
+    wl = 400 + 0.3 * px + rng.normal(0, 0.01, px.size)
+    degree, coeffs, cv_rms = select_polynomial_degree(px, wl)
+    assert degree == 1
+    assert cv_rms < 0.05
+    np.testing.assert_allclose(np.polyval(coeffs, px), wl, atol=0.05)
+
+
+def test_select_degree_detects_curvature():
+    px = np.linspace(0, 1200, 10)
+    degree, coeffs, _ = select_polynomial_degree(px, np.polyval(TRUE, px))
+    assert degree == 2
+    np.testing.assert_allclose(coeffs, TRUE, rtol=1e-6)
+
+
+def test_three_points_give_exact_quadratic():
+    px = np.array([100.0, 600.0, 1100.0])
+    degree, coeffs, cv_rms = select_polynomial_degree(px, np.polyval(TRUE, px))
+    assert degree == 2
+    assert np.isnan(cv_rms)
+    np.testing.assert_allclose(np.polyval(coeffs, [0, 1279]), np.polyval(TRUE, [0, 1279]), atol=1e-6)
+
+
+def test_select_degree_needs_two_points():
+    with pytest.raises(ValueError):
+        select_polynomial_degree([1.0], [500.0])
+
+
+@pytest.mark.parametrize("lamp", ["Hg", "Ne", "Leuchtstofflampe"])
+def test_auto_calibrate_with_missing_and_spurious_peaks(lamp):
+    rng = np.random.default_rng(3)
+    px, lines = pixels_for(LAMP_LINES[lamp])
+    keep = rng.random(px.size) > 0.2
+    keep[[0, -1]] = True
+    peaks = np.concatenate([px[keep] + rng.normal(0, 0.05, keep.sum()), rng.uniform(0, PIXELS, 3)])
+    result = auto_calibrate(np.sort(peaks), LAMP_LINES[lamp], PIXELS)
+    grid = np.arange(PIXELS)
+    error = np.abs(np.polyval(result["coefficients"], grid) - np.polyval(TRUE, grid))
+    assert error.max() < 0.2
+    assert result["coverage"] >= 0.5
+
+
+def test_auto_calibrate_rejects_one_sided_lines():
+    # Nur die Ar-Linien am blauen Ende eines 650-1000-nm-Detektors sind sichtbar
+    coeffs = np.array([0.0, 0.27, 650.0])
+    px, _ = pixels_for([696.543, 706.722, 714.704, 727.294, 738.398], coeffs)
+    with pytest.raises(ValueError, match="decken nur"):
+        auto_calibrate(px, LAMP_LINES["Ar"], PIXELS, initial=coeffs, max_degree=2)
+
+
+def test_refine_peak_positions_subpixel():
+    x = np.arange(200, dtype=np.float64)
+    centers = np.array([50.3, 120.7])
+    spectrum = sum(1000 * np.exp(-0.5 * ((x - c) / 2.0) ** 2) for c in centers)
+    refined = refine_peak_positions(spectrum, np.rint(centers).astype(int))
+    np.testing.assert_allclose(refined, centers, atol=0.02)
+
+
+def test_refine_single_peak_position():
+    x = np.arange(200, dtype=np.float64)
+    spectrum = 1000 * np.exp(-0.5 * ((x - 120.7) / 2.0) ** 2) + 20
+    assert refine_peak_position(spectrum, 121) == pytest.approx(120.7, abs=0.02)
+    assert refine_peak_position(spectrum, 121) == pytest.approx(refine_peak_positions(spectrum, [121])[0], abs=1e-3)
+    # Rand und flaches Fenster: Ganzzahlposition bleibt
+    assert refine_peak_position(np.full(200, 5.0), 3) == 3.0
+    assert refine_peak_position(spectrum[:5], 2) == 2.0
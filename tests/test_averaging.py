@@ -0,0 +1,117 @@
+import numpy as np
+import pytest
+
+from averaging import AdaptiveAverager, SpectrumAverager
+
+
+def spectra(count=40, shape=(50,), seed=0):
+    rng = np.random.default_rng(seed)
+    return 100 + rng.normal(0, 3, (count,) + shape)
+
+
+def test_off_passes_through():
+    averager = SpectrumAverager()
+    x = np.arange(5.0)
+    assert averager.update(x) == (x, None)
+
+
+@pytest.mark.parametrize("shape", [(50,), (3, 50)])
+def test_boxcar_matches_window_statistics(shape):
+    data = spectra(shape=shape)
+    averager = SpectrumAverager("boxcar", window=7, resum=5)
+    for i, x in enumerate(data):
+        mean, error = averager.update(x)
+        window = data[max(i - 6, 0):i + 1]
+        np.testing.assert_allclose(mean, window.mean(axis=0), rtol=1e-12)
+        if len(window) < 2:
+            assert error is None
+        else:
+            np.testing.assert_allclose(error, window.std(axis=0, ddof=1) / np.sqrt(len(window)), rtol=1e-6)
+
+
+def test_welford_matches_cumulative_statistics():
+    data = spectra()
+    averager = SpectrumAverager("welford")
+    for x in data:
+        mean, error = averager.update(x)
+    np.testing.assert_allclose(mean, data.mean(axis=0))
+    np.testing.assert_allclose(error, data.std(axis=0, ddof=1) / np.sqrt(len(data)))
+
+
+def test_ema_matches_recursion_and_error_scale():
+    data = spectra(count=2000, shape=(200,))
+    averager = SpectrumAverager("ema", alpha=0.1)
+    averager.update(data[0])
+    expected = data[0].copy()
+    for x in data[1:]:
+        mean, error = averager.update(x)
+        expected += 0.1 * (x - expected)
+    np.testing.assert_allclose(mean, expected)
+    # Standardfehler eines EMA: sigma * sqrt(alpha / (2 - alpha))
+    assert np.median(error) == pytest.approx(3 * np.sqrt(0.1 / 1.9), rel=0.1)
+
+
+def test_returned_mean_is_a_copy_and_shape_change_resets():
+    averager = SpectrumAverager("welford")
+    first, _ = averager.update(np.ones(4))
+    averager.update(np.full(4, 3.0))
+    assert (first == 1).all()
+    mean, error = averager.update(np.ones((2, 4)))
+    assert mean.shape == (2, 4) and error is None and averager.count == 1
+
+
+def test_configure_validates():
+    averager = SpectrumAverager()
+    averager.configure(mode="median", window=0, alpha=5)
+    assert averager.mode == "off" and averager.window == 1 and averager.alpha == 1.0
+
+
+def test_adaptive_stops_at_target_snr():
+    rng = np.random.default_rng(3)
+    averager = AdaptiveAverager(target_snr=200.0, level="pixel")
+    # Einzelbild-SNR 20 -> etwa (200 / 20)^2 = 100 Bilder
+    result = averager.acquire(lambda: 100 + rng.normal(0, 5, 64))
+    assert averager.reason == "Ziel-SNR erreicht"
+    assert 60 <= averager.frames <= 160
+    assert result.dtype == np.float32 and np.allclose(result, 100, atol=2)
+    assert "Bilder" in averager.summary()
+
+
+def test_adaptive_spectrum_level_uses_column_sums():
+    rng = np.random.default_rng(4)
+    averager = AdaptiveAverager(target_snr=200.0)
+    # 16 Zeilen je Spalte: Spaltensumme hat das vierfache SNR -> etwa 16x weniger Bilder
+    averager.acquire(lambda: 100 + rng.normal(0, 5, (16, 64)))
+    assert averager.reason == "Ziel-SNR erreicht" and averager.frames <= 12
+
+
+def test_adaptive_target_error_for_darks():
+    rng = np.random.default_rng(5)
+    averager = AdaptiveAverager(target_error=0.5, level="pixel")
+    averager.acquire(lambda: 2 + rng.normal(0, 2, 64))
+    assert averager.reason == "Zielunsicherheit erreicht" and averager.error <= 0.5
+
+
+def test_adaptive_limits_and_missing_signal():
+    averager = AdaptiveAverager(target_snr=1e9, max_frames=7, level="pixel")
+    rng = np.random.default_rng(6)
+    averager.acquire(lambda: 100 + rng.normal(0, 5, 8))
+    assert averager.reason == "Bildlimit erreicht" and averager.frames == 7
+
+    averager = AdaptiveAverager(target_snr=100.0, level="pixel")
+    averager.acquire(lambda: rng.normal(0, 1, 8), floor=50)
+    assert averager.reason == "kein auswertbares Signal" and averager.frames == averager.min_frames
+
+    averager = AdaptiveAverager(time_limit=0.0)
+    assert averager.acquire(lambda: None) is None
+    assert averager.reason == "Zeitlimit erreicht"
+
+
+def test_adaptive_peak_and_saturation():
+    rng = np.random.default_rng(7)
+    frame = lambda: np.concatenate([np.full(4, 255.0), 100 + rng.normal(0, 5, 4)])
+    averager = AdaptiveAverager(target_snr=1e9, max_frames=20, level="pixel")
+    averager.acquire(frame, saturation=255)
+    assert np.isfinite(averager.snr) and averager.snr < 1e3  # gesättigte Pixel (rauschfrei) zählen nicht
+    averager.acquire(frame, peak=0)
+    assert np.isinf(averager.snr) or averager.snr > 1e6
@@ -0,0 +1,38 @@
+import numpy as np
+
+from binning import bin_rows, display_envelope
+
+
+def test_bin_rows_on_full_frame_grid():
+    frame = np.arange(20 * 6, dtype=np.uint8).reshape(20, 6)
+    binned, first = bin_rows(frame, 5, 13, 4)
+    # Bins 1..3 des Rasters (Zeilen 4-15), volle Spaltenzahl
+    assert first == 1 and binned.shape == (3, 6) and binned.dtype == np.float32
+    np.testing.assert_array_equal(binned, frame[4:16].reshape(3, 4, 6).sum(axis=1))
+    np.testing.assert_array_equal(binned.sum(axis=0), frame[4:16].sum(axis=0))
+
+
+def test_bin_rows_partial_last_bin_and_factor_one():
+    frame = np.ones((10, 3), dtype=np.float32)
+    binned, first = bin_rows(frame, 6, 10, 4)
+    assert first == 1
+    np.testing.assert_array_equal(binned[:, 0], [4, 2])
+    binned, first = bin_rows(frame, 2, 5, 1)
+    assert first == 2 and binned.shape == (3, 3)
+
+
+def test_display_envelope_keeps_narrow_lines():
+    x = np.arange(10000)
+    y = np.zeros((2, 10000))
+    y[0, 4321] = 5.0
+    y[1, 17] = -3.0
+    ex, ey = display_envelope(x, y, points=500)
+    assert ey.shape == (2, 500) and len(ex) == 500
+    assert ey[0].max() == 5.0 and ey[1].min() == -3.0
+    assert np.all(np.diff(ex) >= 0)
+
+
+def test_display_envelope_short_curve_unchanged():
+    x, y = np.arange(100), np.random.default_rng(0).random(100)
+    ex, ey = display_envelope(x, y)
+    assert ex is x and ey is y
@@ -0,0 +1,45 @@
+import json
+
+import numpy as np
+
+from calibration_history import CalibrationHistory
+
+BASE = [-2.0e-5, 0.33, 380.0]
+
+
+def test_register_assigns_increasing_versions(tmp_path):
+    history = CalibrationHistory(str(tmp_path / "history.json"))
+    assert history.latest_version == 0
+    assert history.register(BASE, "datei") == 1
+    assert history.register([0.0, 0.34, 379.0], "drift", offset=-0.4, scale=1.001) == 2
+    assert history.latest_version == 2
+    assert history.entries[1]["offset"] == -0.4 and history.entries[1]["source"] == "drift"
+
+
+def test_identical_coefficients_reuse_version(tmp_path):
+    history = CalibrationHistory(str(tmp_path / "history.json"))
+    history.register(BASE, "datei")
+    history.register([0.0, 0.34, 379.0], "dialog")
+    assert history.register(np.array(BASE), "drift") == 1
+    assert history.find([0.0, 0.34, 379.0]) == 2
+    assert history.find([0.34, 379.0]) is None
+    assert history.find(np.array(BASE) * (1 + 1e-9)) is None
+    assert len(history.entries) == 2
+
+
+def test_versions_survive_reload(tmp_path):
+    path = str(tmp_path / "history.json")
+    first = CalibrationHistory(path)
+    first.register(BASE, "datei")
+    first.register([0.0, 0.34, 379.0], "dialog")
+    second = CalibrationHistory(path)
+    assert second.entries == json.loads(json.dumps(first.entries))
+    assert second.find(BASE) == 1
+    assert second.register([0.0, 0.35, 378.0], "drift") == 3
+
+
+def test_unreadable_file_starts_empty(tmp_path):
+    path = tmp_path / "history.json"
+    path.write_text("{kaputt")
+    history = CalibrationHistory(str(path))
+    assert history.entries == [] and history.latest_version == 0
@@ -0,0 +1,38 @@
+import numpy as np
+import pytest
+
+pytest.importorskip("cv2")
+pytest.importorskip("PyQt5")
+
+from calibration_history import CalibrationHistory
+from camera import Camera
+
+BASE = [-2.0e-5, 0.33, 380.0]
+
+
+def camera(tmp_path):
+    """Kamera ohne Gerät: nur der Kalibrationszustand wird benötigt."""
+    cam = Camera.__new__(Camera)
+    cam.calibration_history = CalibrationHistory(str(tmp_path / "history.json"))
+    cam.calibration_data = None
+    cam.calibration_version = None
+    return cam
+
+
+def test_restore_returns_to_base_version_without_new_entry(tmp_path):
+    cam = camera(tmp_path)
+    base_version = cam.set_calibration(BASE, "datei")
+    drift_version = cam.set_calibration([-2.0e-5, 0.3301, 379.6], "drift", offset=-1.2, scale=1.0003)
+    assert drift_version == base_version + 1
+    cam.restore_calibration(BASE, base_version)
+    assert cam.calibration_version == base_version
+    np.testing.assert_array_equal(cam.calibration_data, BASE)
+    assert [e["source"] for e in cam.calibration_history.entries] == ["datei", "drift"]
+
+
+def test_set_calibration_reuses_known_version(tmp_path):
+    cam = camera(tmp_path)
+    first = cam.set_calibration(BASE, "datei")
+    cam.set_calibration([0.0, 0.34, 379.0], "dialog")
+    assert cam.set_calibration(BASE, "dialog") == first
+    assert len(cam.calibration_history.entries) == 2
@@ -0,0 +1,80 @@
+import numpy as np
+import pytest
+
+from camera_profile import HdrMerge, exposure_ratios, sensitivity_factor
+
+LEGACY = [4.6, 3.2, 4.3, 15.3, 2.7, 4, 1.25, 2, 2, 1.1, 1.1, 1.1]
+
+
+def exposure_stack(ratios, shape=(40, 50), seed=0):
+    """Belichtungsreihe einer Szene mit bekannten Verhältnissen benachbarter Stufen."""
+    scene = np.random.default_rng(seed).uniform(2.0, 60.0, shape)
+    relative = np.concatenate(([1.0], np.cumprod(ratios)))
+    return np.array([scene * r for r in relative])
+
+
+def test_exposure_ratios_recovers_known_ratios():
+    ratios = [2.0, 1.7, 2.3]
+    measured, counts = exposure_ratios(exposure_stack(ratios), saturation=250, noise_floor=10)
+    np.testing.assert_allclose(measured, ratios, rtol=1e-9)
+    assert (counts >= 50).all()
+
+
+def test_exposure_ratios_ignores_saturated_and_noise_pixels():
+    stack = exposure_stack([2.0, 2.0])
+    clean, _ = exposure_ratios(stack, saturation=250, noise_floor=10)
+    # Gesättigte Pixel werden begrenzt, Rauschpixel verfälscht -> beides darf nicht eingehen
+    distorted = np.minimum(stack, 250.0)
+    distorted[:, stack[0] < 10 / 2.0] = 5.0
+    measured, _ = exposure_ratios(distorted, saturation=250, noise_floor=10)
+    np.testing.assert_allclose(measured, clean, rtol=1e-9)
+    np.testing.assert_allclose(measured, 2.0, rtol=1e-9)
+
+
+def test_exposure_ratios_without_overlap_is_nan():
+    stack = np.array([np.full(100, 5.0), np.full(100, 255.0)])
+    measured, counts = exposure_ratios(stack, saturation=250, noise_floor=10)
+    assert np.isnan(measured[0]) and counts[0] == 0
+
+
+def test_sensitivity_factor_fallback_order():
+    calibrated = {-2: 3.9, 0: 1.0}
+    # Profil vor allem anderen
+    assert sensitivity_factor(-2, calibrated, LEGACY, max_exposure=0) == 3.9
+    # Mit Profil, aber ohne Eintrag: Nennverhältnis, nicht die (summenbezogenen) Altwerte
+    assert sensitivity_factor(-1, calibrated, LEGACY, max_exposure=0) == 2.0
+    # Ohne Profil: Altwerte, außerhalb der Liste Nennverhältnis
+    assert sensitivity_factor(-10, {}, LEGACY, max_exposure=1) == 4.6
+    assert sensitivity_factor(-7.2, {}, LEGACY, max_exposure=1) == 15.3
+    assert sensitivity_factor(-12, {}, LEGACY, max_exposure=1) == 2.0 ** 13
+
+
+def test_weighted_merge_averages_valid_rescaled_stages():
+    scene = np.array([[4.0, 20.0, 100.0, 400.0]], dtype=np.float32)  # Helligkeit bei längster Belichtung
+    factors = [4.0, 2.0, 1.0]
+    merge = HdrMerge(True, noise_floor=10, saturation=250)
+    for f in factors:
+        merge.add(np.minimum(scene / f, 255), f)
+    result = merge.result()
+    assert merge.count == 3
+    # 4: nur Rauschen in allen Stufen -> kürzeste Belichtung; 400: nur die kürzeste Stufe ist gültig
+    np.testing.assert_allclose(result, [[4.0, 20.0, 100.0, 400.0]], rtol=1e-6)
+
+
+def test_weighted_merge_excludes_saturated_stage():
+    merge = HdrMerge(True, noise_floor=10, saturation=250)
+    merge.add(np.array([100.0]), 4.0)
+    merge.add(np.array([255.0]), 1.0)  # gesättigt, wahrer Wert 400
+    assert merge.result()[0] == pytest.approx(400.0)
+
+
+def test_legacy_merge_sums_like_before():
+    frames = [np.array([5.0, 50.0]), np.array([20.0, 100.0])]
+    merge = HdrMerge(False, noise_floor=10, saturation=250)
+    for frame, factor in zip(frames, [4.6, 1.1]):
+        merge.add(frame, factor)
+    np.testing.assert_allclose(merge.result(), [0 * 4.6 + 20 * 1.1, 50 * 4.6 + 100 * 1.1], rtol=1e-6)
+
+
+def test_empty_merge_has_no_result():
+    assert HdrMerge(True, noise_floor=10, saturation=250).result() is None
@@ -0,0 +1,93 @@
+import numpy as np
+import pytest
+
+from channels import ChannelEngine
+
+WAVELENGTHS = np.linspace(400.0, 700.0, 601)  # 0.5 nm je Pixel
+
+
+def naive(spectrum, name, *args):
+    step = np.abs(np.gradient(WAVELENGTHS))
+    if name in ("area", "net", "mean"):
+        inside = (WAVELENGTHS >= args[0]) & (WAVELENGTHS <= args[1])
+        idx = np.flatnonzero(inside)
+        if name == "mean":
+            return spectrum[inside].mean()
+        area = (spectrum * step)[inside].sum()
+        if name == "area":
+            return area
+        return area - 0.5 * step[inside].sum() * (spectrum[idx[0]] + spectrum[idx[-1]])
+    if name == "height":
+        center, half = args[0], args[1] if len(args) > 1 else 1.0
+        return spectrum[(WAVELENGTHS >= center - half) & (WAVELENGTHS <= center + half)].mean()
+    return np.interp(args[0], WAVELENGTHS, spectrum)
+
+
+@pytest.mark.parametrize("expression, args", [
+    ("area(500, 520)", ("area", 500, 520)),
+    ("net(520, 500)", ("net", 500, 520)),
+    ("mean(450, 451)", ("mean", 450, 451)),
+    ("height(600)", ("height", 600)),
+    ("height(600, 3)", ("height", 600, 3)),
+    ("value(612.3)", ("value", 612.3)),
+])
+def test_primitives_match_direct_computation(expression, args):
+    spectrum = np.random.default_rng(0).random(len(WAVELENGTHS)) + np.linspace(0, 5, len(WAVELENGTHS))
+    engine = ChannelEngine([("x", expression)])
+    value = engine.evaluate(spectrum, WAVELENGTHS, key=1)[0]
+    assert value == pytest.approx(naive(spectrum, *args), rel=1e-10)
+
+
+def test_expressions_reuse_bands_and_channels():
+    spectrum = np.ones(len(WAVELENGTHS))
+    engine = ChannelEngine(ChannelEngine.parse("""
+        a = area(500, 510)   # Kommentar
+        b = area(500, 510) * 2
+        r = b / a
+        z = a / (a - a)
+    """))
+    assert len(engine.primitives) == 1
+    values = engine.evaluate(spectrum, WAVELENGTHS, key=1)
+    assert values[0] == pytest.approx(10.5)  # 21 Pixel à 0.5 nm
+    assert values[2] == pytest.approx(2.0)
+    assert np.isinf(values[3]) or np.isnan(values[3])
+    assert ChannelEngine.from_list(engine.to_list()).format() == engine.format()
+
+
+@pytest.mark.parametrize("definition", [
+    ("a", "__import__('os')"),
+    ("a", "area(500, 510).real"),
+    ("a", "b + 1"),
+    ("a", "area(500)"),
+    ("a", "area(x, 510)"),
+    ("a", "'text'"),
+    ("area", "value(500)"),
+    ("a b", "value(500)"),
+    ("a", "value(500"),
+])
+def test_invalid_definitions_raise(definition):
+    with pytest.raises(ValueError):
+        ChannelEngine([definition])
+
+
+def test_columns_cover_bands_and_recompile_on_key_change():
+    engine = ChannelEngine([("a", "area(500, 502)"), ("v", "value(650.25)")])
+    columns = engine.columns(WAVELENGTHS, key=1)
+    np.testing.assert_array_equal(columns, [200, 201, 202, 203, 204, 500, 501])
+    spectrum = np.zeros(len(WAVELENGTHS))
+    spectrum[columns] = 1.0
+    np.testing.assert_allclose(engine.evaluate(spectrum, WAVELENGTHS, key=1), [2.5, 1.0])
+    shifted = WAVELENGTHS + 1.0
+    assert engine.evaluate(spectrum, shifted, key=2)[0] == pytest.approx(1.5)
+
+
+def test_history_is_a_bounded_ring():
+    engine = ChannelEngine([("v", "value(500)")], capacity=3)
+    spectrum = np.ones(len(WAVELENGTHS))
+    for t in range(5):
+        engine.evaluate(spectrum * t, WAVELENGTHS, key=1, timestamp=float(t))
+    times, history = engine.series()
+    np.testing.assert_array_equal(times, [2, 3, 4])
+    np.testing.assert_array_equal(history[:, 0], [2, 3, 4])
+    engine.clear()
+    assert engine.series()[0].size == 0
@@ -0,0 +1,59 @@
+import numpy as np
+import pytest
+
+from dark_library import DarkLibrary, RegionAverager, exposure_time
+
+RESOLUTION = (640, 480)
+REGION = (100, 50, 200, 40)
+
+
+def dark_for(exposure, shape=(40, 200)):
+    """Offset + Dunkelstrom * t, pixelweise verschieden."""
+    rng = np.random.default_rng(0)
+    offset = 2 + rng.random(shape)
+    current = 100 * rng.random(shape)
+    return (offset + current * exposure_time(exposure)).astype(np.float32)
+
+
+def test_exposure_time():
+    assert exposure_time(-6) == pytest.approx(1 / 64)
+
+
+def test_region_averager_crops_and_averages():
+    averager = RegionAverager((1, 2, 3, 2))
+    frames = [np.full((6, 6), v, dtype=np.uint8) for v in (2, 4)]
+    for frame in frames:
+        averager.add(frame)
+    result = averager.result()
+    assert result.shape == (2, 3) and result.dtype == np.float32
+    np.testing.assert_allclose(result, 3.0)
+
+
+def test_exact_entry_is_cropped_and_reloaded(tmp_path):
+    library = DarkLibrary(str(tmp_path))
+    library.add(-5, 1.0, RESOLUTION, REGION, dark_for(-5), frames=10)
+    dark = library.get(-5, 1.0, RESOLUTION, (110, 60, 50, 10))
+    np.testing.assert_allclose(dark, dark_for(-5)[10:20, 10:60])
+    assert library.get(-5, 1.0, RESOLUTION, (110, 60, 50, 10)) is dark
+
+    reloaded = DarkLibrary(str(tmp_path))
+    region, master = reloaded.master(DarkLibrary.key(-5, 1.0, RESOLUTION))
+    assert region == REGION
+    np.testing.assert_allclose(master, dark_for(-5))
+
+
+def test_interpolates_in_exposure_time(tmp_path):
+    library = DarkLibrary(str(tmp_path))
+    library.add(-7, 1.0, RESOLUTION, REGION, dark_for(-7))
+    library.add(-4, 1.0, RESOLUTION, REGION, dark_for(-4))
+    np.testing.assert_allclose(library.get(-5, 1.0, RESOLUTION, REGION), dark_for(-5), rtol=1e-5)
+    # Extrapolation aus den beiden nächsten Belichtungen
+    np.testing.assert_allclose(library.get(-3, 1.0, RESOLUTION, REGION), dark_for(-3), rtol=1e-5)
+
+
+def test_mismatch_returns_none(tmp_path):
+    library = DarkLibrary(str(tmp_path))
+    library.add(-5, 1.0, RESOLUTION, REGION, dark_for(-5))
+    assert library.get(-5, 2.0, RESOLUTION, REGION) is None           # anderer Gain
+    assert library.get(-5, 1.0, (1280, 720), REGION) is None          # andere Auflösung
+    assert library.get(-5, 1.0, RESOLUTION, (0, 0, 50, 10)) is None   # außerhalb des Ausschnitts
@@ -0,0 +1,73 @@
+import numpy as np
+import pytest
+
+from defects import DefectMap, SpikeRejector
+
+RESOLUTION = (64, 48)
+
+
+def hot_dark():
+    dark = 5 + np.random.default_rng(0).normal(0, 1, (20, 30))
+    hot = [(0, 3), (7, 10), (8, 10), (12, 20), (19, 29)]  # Rand, zwei übereinander, einzeln, Ecke
+    for r, c in hot:
+        dark[r, c] = 200
+    return dark, hot
+
+
+def test_build_finds_hot_pixels_in_raw_coordinates(tmp_path):
+    dark, hot = hot_dark()
+    defects = DefectMap(str(tmp_path / "defects.npz"))
+    assert defects.build(dark, (10, 5, 30, 20), RESOLUTION) == len(hot)
+    assert sorted(zip(defects.rows - 5, defects.cols - 10)) == hot
+    reloaded = DefectMap(str(tmp_path / "defects.npz"))
+    assert len(reloaded) == len(hot) and reloaded.resolution == RESOLUTION
+
+
+def test_repair_uses_vertical_neighbours(tmp_path):
+    dark, _ = hot_dark()
+    defects = DefectMap(str(tmp_path / "defects.npz"))
+    defects.build(dark, (10, 5, 30, 20), RESOLUTION)
+    frame = np.tile(np.arange(RESOLUTION[1], dtype=np.float32)[:, None], (1, RESOLUTION[0]))
+    expected = frame.copy()
+    frame[defects.rows, defects.cols] = 1000
+    defects.repair(frame, (10, 5, 30, 20))
+    # Innen: Mittel aus oben/unten; am Rand und bei defektem Nachbarn: der gesunde Nachbar
+    assert frame[17, 30] == pytest.approx(expected[17, 30])
+    assert frame[12, 20] == expected[11, 20]
+    assert frame[13, 20] == expected[14, 20]
+    assert frame[5, 13] == expected[6, 13]
+    assert frame[24, 39] == expected[23, 39]
+    assert (frame < 1000).all()
+
+
+def test_repair_skips_other_resolution(tmp_path):
+    dark, _ = hot_dark()
+    defects = DefectMap(str(tmp_path / "defects.npz"))
+    defects.build(dark, (10, 5, 30, 20), RESOLUTION)
+    frame = np.full((10, 10), 1000.0)
+    defects.repair(frame, (0, 0, 10, 10))
+    assert (frame == 1000).all()
+
+
+@pytest.mark.parametrize("size", [3, 5, 7])
+def test_median_network_matches_numpy(size):
+    buffer = np.random.default_rng(size).random((size, 8, 9)).astype(np.float32)
+    np.testing.assert_array_equal(SpikeRejector(size)._median(buffer), np.median(buffer, axis=0))
+
+
+def test_spike_is_replaced_after_buffer_fills():
+    rng = np.random.default_rng(1)
+    rejector = SpikeRejector(size=5)
+    frames = [100 + rng.normal(0, 2, (6, 20)) for _ in range(6)]
+    spiky = frames[0].copy()
+    spiky[2, 3] = 5000
+    # Vor dem Füllen des Puffers wird nichts ersetzt
+    assert rejector.process(spiky)[2, 3] == 5000
+    for frame in frames[1:5]:
+        rejector.process(frame)
+    spiky = frames[5].copy()
+    spiky[4, 7] = 5000
+    cleaned = rejector.process(spiky)
+    assert cleaned[4, 7] < 150
+    np.testing.assert_allclose(np.delete(cleaned.ravel(), 4 * 20 + 7),
+                               np.delete(spiky.ravel(), 4 * 20 + 7), rtol=1e-6)
@@ -0,0 +1,104 @@
+import numpy as np
+import pytest
+
+from drift_monitor import DriftMonitor
+from peak_fit import gauss
+
+LINES = (120.0, 400.0, 780.0)
+CALIBRATION = np.array([-1.0e-5, 0.3, 400.0])
+
+
+def spectrum(offset=0.0, stretch=0.0, length=900, seed=None):
+    """Linienspektrum; die Linien wandern um offset + stretch * (p - Mitte) Pixel."""
+    x = np.arange(length, dtype=np.float64)
+    center = (length - 1) / 2
+    result = sum(gauss(x, 1000.0, c + offset + stretch * (c - center), 2.5, 0.0) for c in LINES) + 20.0
+    if seed is not None:
+        result = result + np.random.default_rng(seed).normal(0, 2.0, length)
+    return result
+
+
+def started(**kwargs):
+    monitor = DriftMonitor(**kwargs)
+    assert monitor.start(spectrum(), CALIBRATION) == len(LINES)
+    return monitor
+
+
+def test_start_picks_prominent_lines():
+    monitor = started()
+    np.testing.assert_allclose(monitor.reference_pixels, LINES, atol=1e-3)
+    assert monitor.offset == 0.0 and monitor.scale == 1.0
+
+
+def test_step_converges_and_corrects_calibration():
+    monitor = started()
+    for step in range(30):
+        monitor.update(spectrum(offset=1.5, seed=step), float(step))
+    assert monitor.offset == pytest.approx(-1.5, abs=0.02)
+    assert monitor.scale == pytest.approx(1.0, abs=1e-4)
+    # Die korrigierte Kalibration ordnet den verschobenen Linien die alten Wellenlängen zu
+    corrected = monitor.corrected_calibration()
+    np.testing.assert_allclose(np.polyval(corrected, np.array(LINES) + 1.5),
+                               np.polyval(CALIBRATION, LINES), atol=0.01)
+
+
+def test_scale_drift_is_recovered():
+    monitor = started()
+    for step in range(30):
+        monitor.update(spectrum(stretch=2e-3), float(step))
+    assert monitor.scale == pytest.approx(1 / 1.002, abs=1e-4)
+    assert monitor.offset == pytest.approx(0.0, abs=0.02)
+
+
+def test_ramp_is_followed_with_bounded_lag():
+    monitor = started()
+    rate = 0.02  # Pixel je Frame
+    lags = []
+    for step in range(300):
+        monitor.update(spectrum(offset=rate * step), float(step))
+        lags.append(monitor.offset + rate * step)
+    # Mit Vergessensfaktor 0.98 (Gedächtnis ~50 Frames) läuft die Schätzung mit
+    # konstantem Abstand von etwa rate * 50 Pixeln hinterher
+    memory = 1 / (1 - monitor.forgetting)
+    assert 0 < lags[-1] < 1.1 * rate * memory
+    assert abs(lags[-1] - lags[-50]) < 0.05
+
+
+def test_publishes_only_beyond_threshold():
+    monitor = started(version_threshold=0.1)
+    # Kleine Verschiebung unterhalb der Schwelle: keine neue Version
+    assert all(monitor.update(spectrum(offset=0.03), float(step)) is None for step in range(20))
+    published = np.zeros(2)
+    count = 0
+    for step in range(20, 200):
+        result = monitor.update(spectrum(offset=0.5), float(step))
+        change = abs(monitor.theta[0] - published[0]) + abs(monitor.theta[1] - published[1])
+        if result is None:
+            assert change < 0.1 + 1e-9
+        else:
+            assert change >= 0.1
+            published = monitor.theta.copy()
+            count += 1
+    assert 1 <= count <= 5
+    assert abs(published[0] + 0.5) < 0.1
+
+
+def test_covariance_cap_keeps_matrix_valid():
+    # Nur eine Linie sichtbar: Skala ist unbestimmt, die Kovarianz darf trotzdem nicht entarten
+    monitor = DriftMonitor(forgetting=0.9)
+    monitor.start(spectrum(), CALIBRATION, pixels=[780.0])
+    for step in range(100):
+        monitor.update(spectrum(offset=0.2), float(step))
+        P = monitor.P
+        np.testing.assert_allclose(P, P.T)
+        assert np.linalg.eigvalsh(P).min() >= -1e-12
+        assert (np.diag(P) <= np.diag(monitor.prior) * (1 + 1e-12)).all()
+    assert monitor.offset == pytest.approx(-0.2, abs=0.02)
+
+
+def test_length_change_and_stop_are_ignored():
+    monitor = started()
+    assert monitor.update(spectrum(offset=3.0, length=800), 0.0) is None
+    monitor.stop()
+    assert not monitor.active
+    assert monitor.update(spectrum(offset=3.0), 1.0) is None
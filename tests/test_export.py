@@ -0,0 +1,60 @@
+import os
+import threading
+
+import numpy as np
+import pytest
+
+pytest.importorskip("cv2")
+
+from export import ExportService
+
+
+def test_csv_is_written_from_snapshot(tmp_path):
+    service = ExportService()
+    data = np.column_stack((np.linspace(400, 500, 11), np.arange(11.0)))
+    path = str(tmp_path / "spectrum.csv")
+    service.submit_csv(path, data, "Wellenlänge,Intensität")
+    data[:] = -1  # Die GUI darf ihre Puffer sofort weiterverwenden
+    assert service.wait(timeout=10)
+    assert service.pending == 0
+    loaded = np.loadtxt(path, delimiter=",", skiprows=1)
+    np.testing.assert_allclose(loaded[:, 1], np.arange(11.0))
+    assert service.poll() == [("INFO", f"CSV: gespeichert unter {path}")]
+    assert service.poll() == []
+
+
+def test_batch_writes_one_file_per_spectrum(tmp_path):
+    service = ExportService()
+    x = np.linspace(400, 500, 5)
+    spectra = np.arange(15.0).reshape(3, 5)
+    service.submit_batch(str(tmp_path / "serie"), x, spectra, ["a", "b", "c"], "x,y")
+    assert service.wait(timeout=10)
+    assert sorted(os.listdir(tmp_path / "serie")) == ["a.csv", "b.csv", "c.csv"]
+    np.testing.assert_allclose(np.loadtxt(tmp_path / "serie" / "b.csv", delimiter=",", skiprows=1),
+                               np.column_stack((x, spectra[1])))
+    level, text = service.poll()[0]
+    assert level == "INFO" and text.startswith("Serienexport: 3 Spektren")
+
+
+def test_failures_are_reported_and_worker_continues(tmp_path):
+    service = ExportService()
+    blocked = tmp_path / "blocked.csv"
+    blocked.mkdir()  # Zielpfad ist ein Verzeichnis -> Umbenennen scheitert
+    service.submit_csv(str(blocked), np.ones((2, 2)), "a,b")
+    service.submit_csv(str(tmp_path / "ok.csv"), np.ones((2, 2)), "a,b")
+    assert service.wait(timeout=10)
+    messages = service.poll()
+    assert [level for level, _ in messages] == ["FEHLER", "INFO"]
+    assert messages[0][1].startswith("CSV fehlgeschlagen")
+    assert sorted(os.listdir(tmp_path)) == ["blocked.csv", "ok.csv"]
+
+
+def test_wait_times_out_while_job_runs(tmp_path):
+    service = ExportService()
+    release = threading.Event()
+    service._submit("Test", lambda: release.wait(10))
+    assert service.pending == 1
+    assert not service.wait(timeout=0.05)
+    release.set()
+    assert service.wait(timeout=10)
+    assert service.pending == 0
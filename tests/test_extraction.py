@@ -0,0 +1,55 @@
+import numpy as np
+
+from extraction import OptimalExtractor
+
+ROWS, COLUMNS = 150, 400
+
+
+def trace(level=200.0, center=75.0, sigma=4.0):
+    """Rauschfreies ROI-Bild: Gaußförmige Spur quer zum Spalt, konstantes Kontinuum."""
+    rows = np.arange(ROWS, dtype=np.float64)[:, None]
+    return level * np.exp(-0.5 * ((rows - center) / sigma) ** 2) * np.ones(COLUMNS)
+
+
+def noisy(model, rng, read_noise=2.0):
+    return (rng.poisson(model) + rng.normal(0, read_noise, model.shape)).astype(np.float32)
+
+
+def test_first_frame_is_plain_sum():
+    frame = noisy(trace(), np.random.default_rng(0))
+    extractor = OptimalExtractor()
+    assert extractor.weights is None
+    np.testing.assert_allclose(extractor.extract(frame), frame.sum(axis=0))
+
+
+def test_optimal_extraction_reduces_noise_without_bias():
+    # Schwache Spur: das Ausleserauschen der vielen leeren Zeilen dominiert die einfache Summe
+    rng = np.random.default_rng(1)
+    model = trace(level=20.0)
+    extractor = OptimalExtractor(read_noise=2.0)
+    for _ in range(60):
+        extractor.update(noisy(model, rng))
+    optimal = np.array([extractor.extract(noisy(model, rng)) for _ in range(40)])
+    plain = np.array([noisy(model, rng).sum(axis=0) for _ in range(40)])
+    truth = model.sum(axis=0)[0]
+    assert abs(optimal.mean() / truth - 1) < 0.01
+    assert optimal.std(axis=0).mean() < 0.8 * plain.std(axis=0).mean()
+
+
+def test_extract_does_not_touch_running_mean():
+    rng = np.random.default_rng(2)
+    extractor = OptimalExtractor()
+    for _ in range(11):
+        extractor.update(noisy(trace(), rng))
+    mean, weights = extractor.mean.copy(), extractor.weights.copy()
+    extractor.extract(noisy(trace(level=5000.0, center=20.0), rng))
+    np.testing.assert_array_equal(extractor.mean, mean)
+    np.testing.assert_array_equal(extractor.weights, weights)
+
+
+def test_shape_change_resets():
+    extractor = OptimalExtractor()
+    extractor.update(trace())
+    extractor.update(trace()[:100])
+    assert extractor.mean.shape == (100, COLUMNS)
+    assert extractor.weights.shape == (100, COLUMNS)
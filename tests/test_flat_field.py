@@ -0,0 +1,45 @@
+import numpy as np
+
+from flat_field import FlatField
+
+REGION = (20, 10, 300, 30)
+
+
+def flat_master(seed=0):
+    """Lampenspektrum x Pixelgain x Vignettierung entlang des Spalts."""
+    rng = np.random.default_rng(seed)
+    h, w = REGION[3], REGION[2]
+    lamp = 500 + 300 * np.sin(np.linspace(0, 3, w))
+    vignetting = 1 - 0.3 * np.linspace(-1, 1, h) ** 2
+    gain = 1 + 0.05 * rng.standard_normal((h, w))
+    gain[5, 40] = 0.01  # totes Pixel
+    model = vignetting[:, None] * gain * lamp
+    return model
+
+
+def test_build_removes_lamp_and_keeps_gain_map(tmp_path):
+    master = flat_master()
+    flat = FlatField(str(tmp_path / "flat.npz"))
+    assert not flat.ready
+    flat.build(master, REGION, calibration_version=3)
+    corrected = flat.apply(master, REGION[:2])
+    # Nach der Korrektur ist jede Spalte (bis auf die Glättung des Lampenspektrums) zeilenkonstant
+    inner = corrected[:, 20:-20]
+    assert np.median(inner.std(axis=0) / inner.mean(axis=0)) < 0.01
+    # Totes Pixel bleibt unkorrigiert
+    assert flat.reciprocal[5, 40] == 1.0
+
+    reloaded = FlatField(str(tmp_path / "flat.npz"))
+    assert reloaded.region == REGION and reloaded.calibration_version == 3
+    np.testing.assert_array_equal(reloaded.reciprocal, flat.reciprocal)
+
+
+def test_apply_sub_block_and_outside(tmp_path):
+    master = flat_master()
+    flat = FlatField(str(tmp_path / "flat.npz"))
+    flat.build(master, REGION)
+    block = np.ones((5, 50), dtype=np.float32)
+    np.testing.assert_allclose(flat.apply(block, (30, 15)), flat.reciprocal[5:10, 10:60])
+    assert flat.apply(block, (0, 0)) is block
+    assert flat.calibration_version is None
+    assert FlatField(str(tmp_path / "flat.npz")).calibration_version is None
@@ -0,0 +1,85 @@
+import numpy as np
+import pytest
+
+pytest.importorskip("cv2")
+
+from channels import ChannelEngine
+from defects import DefectMap
+from flat_field import FlatField
+from kinetics import ColumnReduction
+from reference_library import ReferenceLibrary
+
+WIDTH, HEIGHT = 320, 120
+ROI_X, ROI_W = 40, 240
+AXIS = np.linspace(400.0, 700.0, ROI_W)
+DEFINITIONS = [("a", "area(450, 520)"), ("r", "net(600, 640) / mean(450, 470)"), ("v", "value(655.5)")]
+
+
+def scene(tmp_path, region):
+    """Rohbild, Dunkelbild, Defektkarte, Flatfield (Anzeige-Koordinaten) und Referenz."""
+    rng = np.random.default_rng(0)
+    rx, ry, rw, rh = region
+    frame = rng.integers(0, 200, (HEIGHT, WIDTH)).astype(np.uint8)
+    dark = rng.uniform(0, 30, (rh, rw)).astype(np.float32)
+    dark[5:8, 50:60] = 250  # größer als das Bild -> pixelweise auf 0 begrenzen
+    hot = [(3, 60), (10, 61), (11, 61), (20, 180), (rh - 1, 170)]  # in den Kanalbändern
+    for r, c in hot:
+        dark[r, c] = 255
+        frame[ry + r, rx + c] = 255
+    defects = DefectMap(str(tmp_path / "defects.npz"))
+    defects.build(dark, region, (WIDTH, HEIGHT))
+    flat = FlatField(str(tmp_path / "flat.npz"))
+    flat.build(rng.uniform(50, 150, (HEIGHT, WIDTH)), (0, 0, WIDTH, HEIGHT), smooth=1)
+    references = ReferenceLibrary()
+    references.add("Ref", rng.uniform(10, 100, ROI_W))
+    return frame, dark, defects, flat, references
+
+
+def live_channels(frame, region, rows, block_rows, mirror, dark, defects, flat, references):
+    """Live-Pfad aus update_frame/extract_spectrum auf den Einzelmodulen."""
+    frame = frame.astype(np.float32)
+    rx, ry, rw, rh = region
+    view = frame[ry:ry + rh, rx:rx + rw]
+    np.subtract(view, dark, out=view)
+    np.maximum(view, 0, out=view)
+    defects.repair(frame, region)
+    if mirror:
+        frame = frame[:, ::-1]
+    y0, y1 = block_rows
+    block = flat.apply(frame[y0:y1, ROI_X:ROI_X + ROI_W], (ROI_X, y0))
+    spectrum = np.sum(block[rows[0] - y0:rows[1] - y0], axis=0)
+    spectrum = spectrum * references.reciprocal_for(spectrum)
+    return ChannelEngine(DEFINITIONS).evaluate(spectrum, AXIS, key=1)
+
+
+def kinetics_channels(frame, region, rows, block_rows, mirror, dark, defects, flat, references):
+    """Kinetik-Pfad wie in toggle_kinetics/drain_kinetics."""
+    engine = ChannelEngine(DEFINITIONS)
+    columns = engine.columns(AXIS, key=1)
+    raw_columns = WIDTH - 1 - (ROI_X + columns) if mirror else ROI_X + columns
+    y0, y1 = block_rows
+    gains = flat.gains((ROI_X, y0), (y1 - y0, ROI_W), columns)[rows[0] - y0:rows[1] - y0]
+    reciprocal = references.reciprocal_for(np.empty(ROI_W))[columns]
+    (b0, b1), reduction = ColumnReduction.for_columns(region, rows, raw_columns, dark, defects, gains, reciprocal)
+    spectrum = np.zeros(ROI_W)
+    spectrum[columns] = reduction(frame[b0:b1, raw_columns].astype(np.float32))
+    return engine.evaluate(spectrum, AXIS, key=1)
+
+
+@pytest.mark.parametrize("mirror", [False, True])
+@pytest.mark.parametrize("rows, block_rows, region_rows", [
+    ((30, 70), (30, 70), (30, 70)),   # einfache ROI
+    ((38, 45), (35, 60), (20, 60)),   # erste Spur im Mehrspur-Modus, Ausschnitt größer als die Spur
+])
+def test_kinetics_matches_live_channels(tmp_path, mirror, rows, block_rows, region_rows):
+    region_x = WIDTH - ROI_X - ROI_W if mirror else ROI_X
+    region = (region_x, region_rows[0], ROI_W, region_rows[1] - region_rows[0])
+    data = scene(tmp_path, region)
+    live = live_channels(data[0], region, rows, block_rows, mirror, *data[1:])
+    kinetics = kinetics_channels(data[0], region, rows, block_rows, mirror, *data[1:])
+    np.testing.assert_allclose(kinetics, live, rtol=1e-5)
+
+
+def test_plain_reduction_is_column_sum():
+    block = np.arange(12, dtype=np.float32).reshape(4, 3)
+    np.testing.assert_array_equal(ColumnReduction((1, 3))(block.copy()), block[1:3].sum(axis=0))
@@ -0,0 +1,58 @@
+import numpy as np
+import pytest
+
+from peak_detection import PeakIndex
+from peak_fit import gauss
+
+CENTERS = (40, 100, 103, 250)
+
+
+def spectrum(centers=CENTERS, length=300):
+    x = np.arange(length, dtype=np.float64)
+    return sum(gauss(x, 1000.0, c, 1.2, 0.0) for c in centers) + 10.0
+
+
+def test_index_is_sorted_with_properties():
+    index = PeakIndex(spectrum())
+    assert len(index) == 4
+    np.testing.assert_array_equal(index.positions, CENTERS)
+    assert index.prominences.shape == index.widths.shape == (4,)
+    assert index.widths[0] == pytest.approx(2.3548 * 1.2, rel=0.05)
+
+
+@pytest.mark.parametrize("pixel, expected", [
+    (0, 0), (39.9, 0),            # vor dem ersten Peak
+    (299, 3), (260.5, 3),         # hinter dem letzten Peak
+    (70, 0), (70.1, 1),           # zwischen zwei Peaks, Gleichstand -> linker
+    (101.5, 1), (101.6, 2),       # eng benachbarte Peaks
+    (250, 3), (100, 1),           # genau auf einem Peak
+])
+def test_nearest_bisection(pixel, expected):
+    index = PeakIndex(spectrum())
+    assert index.nearest(pixel) == expected
+    positions = np.asarray(CENTERS, dtype=float)
+    assert np.abs(positions[expected] - pixel) == np.abs(positions - pixel).min()
+
+
+def test_max_distance_and_position_fallback():
+    index = PeakIndex(spectrum())
+    assert index.nearest(170, max_distance=20) is None
+    assert index.nearest_position(170, max_distance=20) == 170
+    assert index.nearest_position(245, max_distance=20) == 250
+
+
+def test_empty_index():
+    for flat in (np.full(200, 5.0), np.zeros(200)):
+        index = PeakIndex(flat)
+        assert len(index) == 0 and index.widths.size == 0
+        assert index.nearest(50) is None
+        assert index.nearest_position(50.5) == 50.5
+
+
+def test_index_belongs_to_its_spectrum():
+    data = spectrum()
+    index = PeakIndex(data)
+    data[:] = spectrum(centers=(150,))  # Quellpuffer wird überschrieben (z. B. nächster Frame)
+    assert index.nearest_position(140) == 103
+    fresh = PeakIndex(data)
+    assert len(fresh) == 1 and fresh.nearest_position(10) == 150
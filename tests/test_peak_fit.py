@@ -0,0 +1,113 @@
+import numpy as np
+import pytest
+from scipy.optimize import curve_fit
+
+from peak_fit import estimate_gaussian, fit_gaussian, fit_gaussians, fit_multi_peak, gauss, multi_peak_model
+
+
+def noisy_peak(rng, A=1000.0, x0=120.3, sigma=4.0, C=50.0, noise=10.0, n=41):
+    x = np.arange(n, dtype=np.float64) + 100
+    return x, gauss(x, A, x0, sigma, C) + rng.normal(0, noise, n)
+
+
+def test_estimate_exact_without_noise():
+    x = np.arange(41, dtype=np.float64)
+    y = gauss(x, 500.0, 18.7, 3.2, 0.0)
+    A, x0, sigma, C = estimate_gaussian(x, y)
+    assert A == pytest.approx(500.0, rel=1e-6)
+    assert x0 == pytest.approx(18.7, abs=1e-6)
+    assert sigma == pytest.approx(3.2, rel=1e-6)
+
+
+def test_caruana_estimate_close_to_curve_fit():
+    rng = np.random.default_rng(0)
+    for _ in range(20):
+        x, y = noisy_peak(rng, x0=120 + rng.uniform(-3, 3), sigma=rng.uniform(2, 6))
+        popt, pcov = curve_fit(gauss, x, y, p0=[900, 120, 3, 40])
+        estimate = np.array(estimate_gaussian(x, y))
+        # Zentrum innerhalb weniger Standardfehler von curve_fit
+        assert abs(estimate[1] - popt[1]) < 5 * np.sqrt(pcov[1, 1])
+        assert estimate[2] == pytest.approx(popt[2], rel=0.1)
+
+
+def test_refined_fit_matches_curve_fit():
+    rng = np.random.default_rng(1)
+    for _ in range(50):
+        x, y = noisy_peak(rng, A=rng.uniform(100, 2000), x0=120 + rng.uniform(-3, 3), sigma=rng.uniform(2, 6))
+        p = fit_gaussian(x, y)
+        popt, pcov = curve_fit(gauss, x, y, p0=p)
+        # Abweichung weit unterhalb der statistischen Unsicherheit
+        assert np.all(np.abs(p - popt) < 0.05 * np.sqrt(np.diag(pcov)))
+
+
+def test_descending_x_is_accepted():
+    rng = np.random.default_rng(2)
+    x, y = noisy_peak(rng)
+    p = fit_gaussian(x[::-1], y[::-1])
+    assert p[1] == pytest.approx(fit_gaussian(x, y)[1])
+
+
+def test_fit_errors():
+    with pytest.raises(ValueError):
+        fit_gaussian(np.arange(4.0), np.ones(4))
+    with pytest.raises(RuntimeError):
+        fit_gaussian(np.arange(20.0), np.full(20, 5.0))
+
+
+def test_batch_fit_matches_single_fits_and_flags_bad_windows():
+    rng = np.random.default_rng(3)
+    x = np.arange(41, dtype=np.float64)
+    windows = [gauss(x, 800, 20 + d, 3, 10) + rng.normal(0, 5, x.size) for d in (-4, 0, 3.5)]
+    windows.append(np.full(x.size, 10.0))
+    p = fit_gaussians(x, np.array(windows))
+    for row, y in zip(p[:3], windows[:3]):
+        assert row == pytest.approx(fit_gaussian(x, y), rel=1e-3, abs=1e-3)
+    assert np.isnan(p[3]).all()
+
+
+# ----- Mehrlinien-Fit -----
+
+def test_multi_peak_resolves_merged_doublet():
+    rng = np.random.default_rng(4)
+    x = np.arange(80, dtype=np.float64)
+    truth = np.array([[800, 30, 3, 0.0], [500, 38, 3, 0.0], [600, 55, 4, 0.0]])
+    y = multi_peak_model(x, truth, (0.5, 20)) + rng.normal(0, 5, x.size)
+    components, baseline = fit_multi_peak(x, y)
+    assert len(components) == 3
+    assert components[:, 1] == pytest.approx(truth[:, 1], abs=0.1)
+    assert components[:, 2] == pytest.approx(truth[:, 2], rel=0.05)
+    assert baseline[0] == pytest.approx(0.5, abs=0.05)
+
+
+def test_multi_peak_voigt_recovers_mixing():
+    rng = np.random.default_rng(5)
+    x = np.arange(80, dtype=np.float64)
+    truth = np.array([[800, 25, 3, 0.6], [600, 55, 4, 0.6]])
+    y = multi_peak_model(x, truth, (0.0, 20)) + rng.normal(0, 2, x.size)
+    components, _ = fit_multi_peak(x, y, n_components=2, profile="voigt")
+    assert components[:, 1] == pytest.approx(truth[:, 1], abs=0.05)
+    assert components[:, 3] == pytest.approx(truth[:, 3], abs=0.1)
+
+
+def test_multi_peak_adds_at_most_one_line():
+    # Lorentz-Flügel verleiten den Gauß-Fit zu immer weiteren Linien; gesucht wird nur eine zusätzliche
+    rng = np.random.default_rng(6)
+    x = np.arange(80, dtype=np.float64)
+    y = multi_peak_model(x, np.array([[1000, 40, 3, 1.0]]), (0.0, 20)) + rng.normal(0, 2, x.size)
+    components, _ = fit_multi_peak(x, y, max_components=5)
+    assert 1 <= len(components) <= 2
+
+
+def test_multi_peak_flat_window_has_no_peak(recwarn):
+    x = np.arange(40, dtype=np.float64)
+    for y in (np.full(40, 7.0), 3.0 - 0.1 * x):
+        components, baseline = fit_multi_peak(x, y)
+        assert components.shape == (0, 4)
+    assert not recwarn.list
+
+
+def test_multi_peak_errors():
+    with pytest.raises(ValueError):
+        fit_multi_peak(np.arange(10.0), np.ones(10), profile="lorentz")
+    with pytest.raises(ValueError):
+        fit_multi_peak(np.arange(8.0), np.exp(-np.arange(8.0)), n_components=3)
@@ -0,0 +1,52 @@
+import numpy as np
+import pytest
+
+from peak_fit import FWHM_FACTOR, gauss
+from peak_tracker import PeakTracker
+
+
+def spectrum(centers, sigma=2.5, length=400):
+    x = np.arange(length, dtype=np.float64)
+    return sum(gauss(x, 1000.0, c, sigma, 0.0) for c in centers) + 20.0
+
+
+def test_tracks_moving_peaks_subpixel():
+    tracker = PeakTracker(half_width=10)
+    tracker.add_peak(spectrum([100, 250]), 102)
+    tracker.add_peak(spectrum([100, 250]), 248)
+    for step in range(10):
+        shift = 0.3 * step
+        current = tracker.update(spectrum([100 + shift, 250 - shift]), float(step))
+    assert current[0, 0] == pytest.approx(102.7, abs=1e-3)
+    assert current[1, 0] == pytest.approx(247.3, abs=1e-3)
+    assert current[:, 1] == pytest.approx(FWHM_FACTOR * 2.5, rel=1e-3)
+
+
+def test_history_ring_is_chronological_and_bounded():
+    tracker = PeakTracker(capacity=5)
+    tracker.add_peak(spectrum([200]), 200)
+    for step in range(8):
+        tracker.update(spectrum([200]), float(step))
+    times, history = tracker.series()
+    assert times.tolist() == [3.0, 4.0, 5.0, 6.0, 7.0]
+    assert history.shape == (5, 1, 3)
+
+
+def test_lost_peak_is_nan_and_recovers():
+    tracker = PeakTracker()
+    tracker.add_peak(spectrum([150]), 150)
+    lost = tracker.update(np.full(400, 20.0), 0.0)
+    assert np.isnan(lost).all()
+    found = tracker.update(spectrum([151]), 1.0)
+    assert found[0, 0] == pytest.approx(151, abs=1e-3)
+
+
+def test_remove_and_nearest_peak():
+    tracker = PeakTracker()
+    s = spectrum([100, 300])
+    tracker.add_peak(s, 100)
+    tracker.add_peak(s, 300)
+    assert tracker.nearest_peak(280) == 1
+    tracker.remove_peak(0)
+    assert tracker.count == 1
+    assert tracker.history.shape[1] == 1
@@ -0,0 +1,66 @@
+import numpy as np
+
+from recorder import Recorder
+
+
+def lines(path):
+    with open(path) as f:
+        return f.read().splitlines()
+
+
+def test_header_rows_and_stop(tmp_path):
+    recorder = Recorder(str(tmp_path / "rec"))
+    assert not recorder.active
+    path = recorder.start(["a", "r"], comments=["trigger: aus"], version=3)
+    assert recorder.active
+    recorder.write(1.0, [1.5, 2.0])
+    recorder.write(2.25, np.array([[3.0, 4e-7]]))
+    assert recorder.stop() == 2
+    assert not recorder.active and recorder.stop() == 0
+    assert lines(path) == ["# calibration_version: 3", "# trigger: aus", "time,a,r",
+                           "1.000,1.5,2", "2.250,3,4e-07"]
+
+
+def test_version_change_is_noted_once(tmp_path):
+    recorder = Recorder(str(tmp_path))
+    path = recorder.start(["a"], version=3)
+    recorder.update_version(3, 1.0)
+    recorder.write(1.0, [1.0])
+    recorder.update_version(4, 2.0)
+    recorder.update_version(4, 3.0)
+    recorder.write(2.0, [2.0])
+    recorder.update_version(5, 4.0)
+    recorder.stop()
+    assert lines(path)[2:] == ["1.000,1", "# calibration_version: 4 ab 2.000 (Spaltenköpfe gelten für Version 3)",
+                               "2.000,2", "# calibration_version: 5 ab 4.000 (Spaltenköpfe gelten für Version 3)"]
+
+
+def test_data_rows_parse_with_comments(tmp_path):
+    recorder = Recorder(str(tmp_path))
+    path = recorder.start(["a", "b"], version=1)
+    for t in range(5):
+        recorder.write(float(t), [t, 2 * t])
+        if t == 2:
+            recorder.update_version(2, float(t))
+            recorder.note("Kinetik-Modus beendet")
+    recorder.stop()
+    data = np.loadtxt(path, delimiter=",", comments="#", skiprows=2)
+    np.testing.assert_array_equal(data, [[t, t, 2 * t] for t in range(5)])
+
+
+def test_inactive_recorder_ignores_writes(tmp_path):
+    recorder = Recorder(str(tmp_path))
+    recorder.write(0.0, [1.0])
+    recorder.note("x")
+    recorder.update_version(2, 0.0)
+    assert recorder.rows == 0 and recorder.path is None
+
+
+def test_restart_opens_new_file_without_version(tmp_path):
+    recorder = Recorder(str(tmp_path))
+    recorder.start(["a"], version=2)
+    recorder.write(0.0, [1.0])
+    path = recorder.start(["a"])
+    assert recorder.rows == 0
+    recorder.stop()
+    assert lines(path) == ["time,a"]
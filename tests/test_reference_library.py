@@ -0,0 +1,67 @@
+import numpy as np
+
+from reference_library import ReferenceLibrary, masked_reciprocal
+
+
+class MemoryStore:
+    """Ablage wie SidecarStore, nur im Speicher."""
+
+    def __init__(self):
+        self.arrays = {}
+
+    def put(self, name, array):
+        self.arrays[name] = np.array(array)
+        return {"sidecar": name}
+
+    def get(self, name, reference):
+        return None if reference is None else self.arrays.get(reference["sidecar"])
+
+
+def test_masked_reciprocal_per_track():
+    spectrum = np.array([[0.0, 1e-4, 2.0, 4.0], [10.0, 0.001, 5.0, 0.0]])
+    np.testing.assert_allclose(masked_reciprocal(spectrum), [[0, 0, 0.5, 0.25], [0.1, 0, 0.2, 0]])
+
+
+def test_versions_selection_and_removal():
+    library = ReferenceLibrary()
+    assert library.reciprocal_for(np.ones(4)) is None and library.describe() == "keine Referenz"
+    assert library.add("A", np.ones(4), frames=20, noise=0.001) == 1
+    assert library.add("A", 2 * np.ones(4)) == 2
+    library.add("B", np.ones(4))
+    assert library.names == ["A", "B"] and library.active == "B"
+    library.select("A")
+    np.testing.assert_allclose(library.reciprocal_for(np.ones(4)), 0.5)
+    library.remove("A")
+    assert library.active == "B"
+    assert "Version 1" in library.describe() and "1 Bilder" in library.describe()
+
+
+def test_reciprocal_for_tracks(capsys):
+    library = ReferenceLibrary()
+    library.add("Spuren", [[1.0, 2.0, 4.0], [2.0, 4.0, 8.0]])
+    np.testing.assert_allclose(library.reciprocal_for(np.ones((2, 3))), [[1, 0.5, 0.25], [0.5, 0.25, 0.125]])
+    # Andere Spurzahl: kein Quotient mit Spur 0 für alle, sondern eine Warnung (einmal)
+    assert library.reciprocal_for(np.ones((3, 3))) is None
+    assert library.reciprocal_for(np.ones(3)) is None
+    assert capsys.readouterr().out.count("[WARNUNG]") == 1
+
+    library.add("Eine Spur", [[1.0, 2.0, 4.0]])
+    np.testing.assert_allclose(library.reciprocal_for(np.ones(3)), [1, 0.5, 0.25])
+    library.add("Einspur", [1.0, 2.0, 4.0])
+    assert library.reciprocal_for(np.ones((2, 3))) is None
+    assert library.reciprocal_for(np.ones(5)) is None
+    assert "Spur" in capsys.readouterr().out
+
+
+def test_list_roundtrip_through_store():
+    store = MemoryStore()
+    library = ReferenceLibrary()
+    library.add("A", [1.0, 2.0], frames=5, calibration_version=3)
+    library.add("B", [[1.0, 2.0], [3.0, 4.0]])
+    items = library.to_list(store)
+    assert all(isinstance(item["spectrum"], dict) for item in items)
+    del store.arrays["reciprocal:A"]  # fehlender Kehrwert wird neu berechnet
+    restored = ReferenceLibrary.from_list(items, store, active="A")
+    assert restored.active == "A" and restored.current["calibration_version"] == 3
+    np.testing.assert_allclose(restored.reciprocal_for(np.ones(2)), [1.0, 0.5])
+    np.testing.assert_allclose(restored.entries["B"]["reciprocal"], library.entries["B"]["reciprocal"])
@@ -0,0 +1,61 @@
+import numpy as np
+import pytest
+
+from resampling import Resampler, interpolation_matrix, rebinning_matrix, uniform_grid
+
+CALIBRATION = np.array([-2.0e-5, 0.33, 380.0])
+
+
+def test_uniform_grid_includes_stop():
+    grid = uniform_grid(400.0, 410.0, 0.5)
+    assert len(grid) == 21
+    assert grid[-1] == pytest.approx(410.0)
+
+
+@pytest.mark.parametrize("descending", [False, True])
+def test_interpolation_matches_np_interp(descending):
+    wavelengths = np.polyval(CALIBRATION, np.arange(500))
+    spectrum = np.random.default_rng(0).random(500)
+    if descending:
+        wavelengths, spectrum = wavelengths[::-1], spectrum[::-1]
+    grid = uniform_grid(370.0, 560.0, 0.25)
+    matrix, valid = interpolation_matrix(wavelengths, grid)
+    order = np.argsort(wavelengths)
+    expected = np.interp(grid, wavelengths[order], spectrum[order])
+    np.testing.assert_allclose((matrix @ spectrum)[valid], expected[valid], atol=1e-12)
+    assert not valid[0] and valid[-1] == (grid[-1] <= wavelengths.max())
+
+
+def test_rebinning_conserves_flux():
+    wavelengths = np.polyval(CALIBRATION, np.arange(600))
+    spectrum = np.random.default_rng(1).random(600)
+    grid = uniform_grid(wavelengths[0] - 5, wavelengths[-1] + 5, 0.7)
+    matrix, valid = rebinning_matrix(wavelengths, grid)
+    # Pixel, die komplett in gültigen Zielbins liegen, gehen vollständig auf
+    weights = np.asarray(matrix[valid].sum(axis=0)).ravel()
+    inner = slice(5, -5)
+    np.testing.assert_allclose(weights[inner], 1.0, atol=1e-12)
+    assert (matrix @ spectrum)[valid].sum() <= spectrum.sum()
+
+
+def test_resampler_caches_and_handles_stacks():
+    resampler = Resampler(max_cached=2)
+    grid = uniform_grid(400.0, 500.0, 1.0)
+    stack = np.random.default_rng(2).random((130, 400))
+    first = resampler.matrix(CALIBRATION, 400, grid)
+    assert resampler.matrix(CALIBRATION, 400, grid) is first
+    result = resampler.resample(stack, CALIBRATION, grid, chunk_size=64)
+    single = np.array([resampler.resample(s, CALIBRATION, grid) for s in stack])
+    np.testing.assert_allclose(result, single, equal_nan=True)
+    resampler.matrix(CALIBRATION, 300, grid)
+    resampler.matrix(CALIBRATION, 200, grid)
+    assert len(resampler._cache) == 2
+
+
+def test_resampler_fills_outside_and_rejects_non_monotonic():
+    resampler = Resampler()
+    grid = uniform_grid(300.0, 500.0, 1.0)
+    result = resampler.resample(np.ones(400), CALIBRATION, grid)
+    assert np.isnan(result[0]) and result[-1] == pytest.approx(1.0)
+    with pytest.raises(ValueError):
+        resampler.matrix([-1e-3, 1.0, 400.0], 1000, grid)
@@ -0,0 +1,47 @@
+import numpy as np
+import pytest
+
+pytest.importorskip("cv2")
+
+from response import CameraResponse
+
+
+def gamma_sweep(exposures, gamma=2.2, shape=(150, 400)):
+    """Belichtungsreihe einer stabilen Szene mit Kennlinie z = 255 * (E * t)^(1 / gamma) plus Rauschen."""
+    rng = np.random.default_rng(0)
+    radiance = np.exp(rng.uniform(np.log(0.5), np.log(200), shape))
+    stack = []
+    for exposure in exposures:
+        linear = np.clip(radiance * 2.0 ** exposure / 60, 0, 1)
+        z = 255 * linear ** (1 / gamma) + rng.normal(0, 0.7, shape)
+        stack.append(np.clip(np.rint(z), 0, 255).astype(np.uint8))
+    return np.array(stack)
+
+
+def test_calibrate_recovers_gamma(tmp_path):
+    exposures = list(range(-10, 2))
+    response = CameraResponse(str(tmp_path / "response.npz"))
+    assert not response.ready
+    stack = gamma_sweep(exposures)
+    lut = response.calibrate(stack, exposures)
+    assert lut[255] == pytest.approx(255.0) and np.all(np.diff(lut) >= 0)
+    # Form der Kennlinie bis auf einen Faktor (255 -> 255 ist nur eine Konvention)
+    levels = np.arange(20, 251)
+    ratio = lut[levels] / (255.0 * (levels / 255.0) ** 2.2)
+    assert ratio.max() / ratio.min() - 1 < 0.06
+    # Linearisiert ergibt die doppelte Belichtung den doppelten Wert
+    short, long = stack[5], stack[6]
+    usable = (short >= 20) & (long <= 245)
+    assert np.median(lut[long[usable]] / lut[short[usable]]) == pytest.approx(2.0, rel=0.02)
+    assert CameraResponse(str(tmp_path / "response.npz")).ready
+
+
+def test_apply_only_for_uint8(tmp_path):
+    response = CameraResponse(str(tmp_path / "response.npz"))
+    gray = np.arange(256, dtype=np.uint8).reshape(16, 16)
+    assert response.apply(gray) is None
+    response.lut = (np.arange(256, dtype=np.float32) ** 2 / 255).astype(np.float32)
+    linear = response.apply(gray)
+    assert linear.dtype == np.float32
+    np.testing.assert_allclose(linear, response.lut[gray])
+    assert response.apply(gray.astype(np.uint16)) is None
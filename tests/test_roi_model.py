@@ -0,0 +1,37 @@
+import numpy as np
+import pytest
+
+pytest.importorskip("PyQt5")
+
+from roi_model import Track, TrackSet
+
+
+def naive(block, tracks, scale=1.0):
+    y0 = min(int(t.y * scale) for t in tracks)
+    return np.array([block[int(t.y * scale) - y0:int(t.y * scale) - y0 + max(int(t.height * scale), 1)].sum(axis=0)
+                     for t in tracks])
+
+
+@pytest.mark.parametrize("tracks", [
+    [Track("a", 10, 5), Track("b", 30, 8), Track("c", 20, 4)],   # getrennt, mit Lücken, unsortiert
+    [Track("a", 10, 10), Track("b", 15, 10)],                      # überlappend
+    [Track("a", 10, 5), Track("b", 15, 5)],                        # direkt aneinander
+])
+@pytest.mark.parametrize("scale", [1.0, 0.5])
+def test_reduce_matches_per_track_sum(tracks, scale):
+    track_set = TrackSet(tracks)
+    y0, y1 = track_set.bounds(scale)
+    block = np.random.default_rng(0).random((y1 - y0, 64))
+    np.testing.assert_allclose(track_set.reduce(block, scale), naive(block, tracks, scale))
+
+
+def test_list_roundtrip_and_plan_cache():
+    track_set = TrackSet.from_list([{"name": "Probe", "y": 4, "height": 3}, {"name": "Ref", "y": 12, "height": 3}])
+    assert track_set.names == ["Probe", "Ref"]
+    assert TrackSet.from_list(track_set.to_list()).to_list() == track_set.to_list()
+    starts = track_set._plan(1.0)[1]
+    assert track_set._plan(1.0)[1] is starts
+    track_set.tracks[1].height = 6
+    assert track_set.bounds() == (4, 18)
+    block = np.ones((14, 3))
+    np.testing.assert_allclose(track_set.reduce(block), [[3, 3, 3], [6, 6, 6]])
@@ -0,0 +1,60 @@
+import os
+
+import numpy as np
+import pytest
+
+from sidecar import SidecarStore
+
+
+def test_put_get_roundtrip_and_deduplication(tmp_path):
+    store = SidecarStore(str(tmp_path / "arrays"))
+    array = np.linspace(0, 1, 50)
+    reference = store.put("reference:A", array)
+    assert reference["shape"] == [50] and reference["dtype"] == array.dtype.str
+    assert store.put("reference:B", array.copy())["sidecar"] == reference["sidecar"]
+    assert len(os.listdir(tmp_path / "arrays")) == 1
+
+    loaded = SidecarStore(str(tmp_path / "arrays")).get("reference:A", reference)
+    assert isinstance(loaded, np.memmap)
+    np.testing.assert_array_equal(loaded, array)
+
+
+def test_unchanged_array_is_not_hashed_again(tmp_path, monkeypatch):
+    store = SidecarStore(str(tmp_path / "arrays"))
+    array = np.arange(10.0)
+    store.put("a", array)
+    monkeypatch.setattr(SidecarStore, "digest", staticmethod(lambda a: pytest.fail("erneut gehasht")))
+    store.put("a", array)
+
+
+def test_legacy_list_and_missing_file(tmp_path, capsys):
+    store = SidecarStore(str(tmp_path / "arrays"))
+    np.testing.assert_array_equal(store.get("x", [1, 2, 3]), [1.0, 2.0, 3.0])
+    assert store.get("x", None) is None
+    assert store.get("x", {"sidecar": "0123456789abcdef"}) is None
+    assert "[WARNUNG]" in capsys.readouterr().out
+
+
+def test_prune_deletes_unreferenced_and_forgets_them(tmp_path):
+    store = SidecarStore(str(tmp_path / "arrays"))
+    keep = store.put("keep", np.ones(3))
+    store.put("old", np.zeros(3))
+    store.prune([keep, None])
+    assert os.listdir(tmp_path / "arrays") == [f"{keep['sidecar']}.npy"]
+    assert set(store._known) == {"keep"}
+
+
+def test_prune_retries_after_failed_delete(tmp_path, monkeypatch, capsys):
+    store = SidecarStore(str(tmp_path / "arrays"))
+    old = store.put("old", np.zeros(3))
+
+    def locked(path):
+        raise PermissionError("Datei ist geöffnet")
+
+    monkeypatch.setattr(os, "remove", locked)
+    store.prune([])
+    assert "[WARNUNG]" in capsys.readouterr().out
+    assert os.path.exists(store.path(old["sidecar"]))
+    monkeypatch.undo()
+    store.prune([])
+    assert not os.listdir(tmp_path / "arrays")
@@ -0,0 +1,78 @@
+import numpy as np
+import pytest
+
+from slit_correction import SlitCorrection
+
+TILT = [1e-5, 0.02]
+CURVATURE = [0.0, 4e-4]
+SIGMA = 3.5 / 2.3548
+
+
+def lamp_frame(origin=(100, 40), shape=(150, 600), centers=(80, 200, 330, 470), reference_row=115.0):
+    """Synthetisches Lampenbild mit geneigten, gekrümmten Linien (FWHM 3.5 px)."""
+    h, w = shape
+    x0, y0 = origin
+    x = np.arange(w, dtype=np.float64)
+    frame = np.zeros(shape)
+    for row in range(h):
+        dy = row + y0 - reference_row
+        for c in centers:
+            position = c + np.polyval(TILT, c + x0) * dy + np.polyval(CURVATURE, c + x0) * dy ** 2
+            frame[row] += 100 * np.exp(-0.5 * ((x - position) / SIGMA) ** 2)
+    return frame + 1.0
+
+
+def fwhm(profile, center, half_width=12):
+    window = profile[center - half_width:center + half_width + 1]
+    window = window - window.min()
+    above = np.flatnonzero(window >= window.max() / 2)
+    return above[-1] - above[0] + 1
+
+
+def test_estimate_recovers_geometry():
+    correction = SlitCorrection()
+    assert not correction.ready
+    assert correction.estimate(lamp_frame(), origin=(100, 40)) == 4
+    assert correction.reference_row == pytest.approx(40 + 149 / 2)
+    x = np.array([180.0, 570.0])
+    # Referenzzeile liegt bei 114.5 statt 115 -> die Neigung verschiebt sich um 2 * Krümmung * 0.5
+    expected_tilt = np.polyval(TILT, x) - 2 * np.polyval(CURVATURE, x) * 0.5
+    np.testing.assert_allclose(np.polyval(correction.tilt, x), expected_tilt, atol=2e-3)
+    np.testing.assert_allclose(np.polyval(correction.curvature, x), np.polyval(CURVATURE, x), atol=2e-4)
+
+
+def test_extract_sharpens_lines():
+    frame = lamp_frame()
+    correction = SlitCorrection()
+    correction.estimate(frame, origin=(100, 40))
+    plain = frame.sum(axis=0)
+    straight = correction.extract(frame, origin=(100, 40))
+    for center in (200, 470):
+        assert fwhm(straight, center) < fwhm(plain, center)
+        assert fwhm(straight, center) <= 5
+
+
+def test_extract_matches_straighten_sum():
+    frame = lamp_frame().astype(np.float32)
+    correction = SlitCorrection()
+    correction.estimate(frame, origin=(100, 40))
+    np.testing.assert_allclose(correction.extract(frame, (100, 40)),
+                               correction.straighten(frame, (100, 40)).sum(axis=0), rtol=1e-4)
+    assert len(correction._matrices) == 1
+    correction.extract(frame, (100, 40))
+    assert len(correction._matrices) == 1
+
+
+def test_dict_roundtrip():
+    correction = SlitCorrection()
+    assert correction.to_dict() is None
+    correction.estimate(lamp_frame(), origin=(100, 40))
+    restored = SlitCorrection.from_dict(correction.to_dict())
+    np.testing.assert_allclose(restored.tilt, correction.tilt)
+    np.testing.assert_allclose(restored.curvature, correction.curvature)
+    assert not SlitCorrection.from_dict(None).ready
+
+
+def test_estimate_rejects_flat_roi():
+    with pytest.raises(ValueError):
+        SlitCorrection().estimate(np.ones((4, 100)))
@@ -0,0 +1,42 @@
+import numpy as np
+
+from trigger import ChangeTrigger
+
+
+def test_first_frame_then_quiet_then_event_with_pre_trigger():
+    trigger = ChangeTrigger(threshold=0.05, pre_trigger=3, heartbeat=100.0)
+    base = np.ones(10)
+    assert [t for t, _ in trigger.process(0.0, base)] == [0.0]
+    for t in range(1, 6):
+        assert trigger.process(float(t), base * (1 + 0.001 * t)) == []
+    output = trigger.process(6.0, base * 2)
+    # die letzten drei zurückgehaltenen Frames plus der auslösende, chronologisch
+    assert [t for t, _ in output] == [3.0, 4.0, 5.0, 6.0]
+    np.testing.assert_allclose(output[0][1], base * 1.003)
+    assert trigger.events == 1 and trigger.written == 5 and trigger.seen == 7
+    assert "5 von 7" in trigger.summary()
+
+
+def test_heartbeat_writes_during_quiet_phase():
+    trigger = ChangeTrigger(threshold=0.5, pre_trigger=2, heartbeat=10.0)
+    times = [t for step in range(31) for t, _ in trigger.process(float(step), np.ones(4))]
+    assert times == [0.0, 10.0, 20.0, 30.0]
+    assert trigger.events == 0
+
+
+def test_max_metric_uses_probe_channels():
+    trigger = ChangeTrigger(threshold=0.1, pre_trigger=0, heartbeat=1e9, metric="max")
+    trigger.process(0.0, [1.0, 100.0, 5.0], probe=[1.0, 100.0])
+    # Große Änderung außerhalb des Vergleichsvektors löst nicht aus
+    assert trigger.process(1.0, [1.0, 100.0, 50.0], probe=[1.0, 100.0]) == []
+    # 20 % Änderung eines kleinen Kanals löst aus, obwohl der RMS-Wert klein bliebe
+    assert len(trigger.process(2.0, [1.2, 100.0, 5.0], probe=[1.2, 100.0])) == 1
+
+
+def test_row_length_change_starts_over():
+    trigger = ChangeTrigger(threshold=10.0, pre_trigger=2, heartbeat=1e9)
+    trigger.process(0.0, np.ones(3))
+    trigger.process(1.0, np.ones(3))
+    assert [t for t, _ in trigger.process(2.0, np.ones(5))] == [2.0]
+    assert trigger.buffer.shape == (2, 5)
+    assert trigger.process(3.0, np.ones(5)) == []
@@ -0,0 +1,37 @@
+import numpy as np
+
+from waterfall import WaterfallBuffer
+
+
+def test_view_is_chronological_and_contiguous():
+    buffer = WaterfallBuffer(rows=4)
+    for i in range(6):
+        buffer.push(np.full(3, i), timestamp=10.0 + i)
+    view = buffer.view()
+    assert view.base is buffer.data or view.base is buffer.data.base
+    np.testing.assert_array_equal(view[:, 0], [2, 3, 4, 5])
+    times, spectra = buffer.history()
+    np.testing.assert_array_equal(times, [12, 13, 14, 15])
+    np.testing.assert_array_equal(spectra[:, 0], [2, 3, 4, 5])
+    assert buffer.limits() == (2.0, 5.0)
+
+
+def test_partial_history_and_empty_buffer():
+    buffer = WaterfallBuffer(rows=5)
+    times, spectra = buffer.history()
+    assert times.size == 0 and spectra.shape == (0, 0)
+    assert buffer.limits() == (0.0, 1.0)
+    buffer.push([1.0, 2.0], timestamp=1.0)
+    buffer.push([3.0, 4.0], timestamp=2.0)
+    times, spectra = buffer.history()
+    np.testing.assert_array_equal(times, [1, 2])
+    np.testing.assert_array_equal(spectra, [[1, 2], [3, 4]])
+    assert np.isnan(buffer.view()[0]).all()
+
+
+def test_width_change_resets_and_flat_limits():
+    buffer = WaterfallBuffer(rows=3)
+    buffer.push(np.ones(4))
+    buffer.push(np.ones(6))
+    assert buffer.width == 6 and buffer.count == 1
+    assert buffer.limits() == (1.0, 2.0)
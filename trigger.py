@@ -0,0 +1,87 @@
+import numpy as np
+
+
+class ChangeTrigger:
+    """
+    Änderungsgesteuerte Aufzeichnung: nur schreiben, wenn sich etwas tut.
+
+    Jeder Frame wird über eine billige Kennzahl (relative RMS-Änderung bzw.
+    größte relative Änderung eines Kanals) mit dem zuletzt gespeicherten
+    verglichen. Liegt die Änderung über threshold, werden die zurückgehaltenen
+    Frames aus dem Vorlaufpuffer und der aktuelle Frame ausgegeben. Ohne
+    Änderung wird spätestens nach heartbeat Sekunden ein Frame geschrieben,
+    damit Ruhephasen in der Aufzeichnung sichtbar bleiben.
+    """
+
+    def __init__(self, threshold=0.02, pre_trigger=10, heartbeat=60.0, metric="rms"):
+        self.threshold = threshold
+        self.pre_trigger = pre_trigger
+        self.heartbeat = heartbeat
+        self.metric = metric  # "rms" (Spektren) oder "max" (wenige Kanäle)
+        self.reset()
+
+    def reset(self):
+        self.reference = None
+        self.last_written = None
+        self.buffer = None  # Vorlauf: (pre_trigger, Zeilenlänge)
+        self.buffer_times = None
+        self._head = 0
+        self._count = 0
+        self.seen = 0
+        self.written = 0
+        self.events = 0
+
+    def change(self, probe):
+        """Relative Änderung von probe gegenüber dem zuletzt gespeicherten Vergleichsvektor."""
+        if self.reference is None:
+            return np.inf
+        difference = probe - self.reference
+        if self.metric == "max":
+            scale = np.maximum(np.abs(self.reference), 1e-12)
+            return float(np.nanmax(np.abs(difference) / scale))
+        return float(np.sqrt(np.dot(difference, difference) / max(np.dot(self.reference, self.reference), 1e-24)))
+
+    def process(self, timestamp, row, probe=None):
+        """
+        Prüft einen Frame.
+
+        :param row: aufzuzeichnende Werte
+        :param probe: Vergleichsvektor (z. B. nur die Kanäle); None = row
+        :return: Liste der jetzt zu schreibenden (Zeit, Werte), ggf. inkl. Vorlauf
+        """
+        row = np.asarray(row, dtype=np.float64)
+        probe = row if probe is None else np.asarray(probe, dtype=np.float64)
+        self.seen += 1
+        if self.buffer is None or self.buffer.shape[1] != len(row):
+            self.buffer = np.empty((max(self.pre_trigger, 1), len(row)))
+            self.buffer_times = np.empty(max(self.pre_trigger, 1))
+            self._head = self._count = 0
+            self.reference = None  # neue Zeilenlänge: alter Vergleichsvektor passt nicht mehr
+
+        triggered = self.change(probe) > self.threshold
+        beat = self.last_written is None or timestamp - self.last_written >= self.heartbeat
+        if not triggered and not beat:
+            if self.pre_trigger > 0:
+                self.buffer[self._head] = row
+                self.buffer_times[self._head] = timestamp
+                self._head = (self._head + 1) % len(self.buffer)
+                self._count = min(self._count + 1, len(self.buffer))
+            return []
+
+        output = []
+        if triggered and self.reference is not None:
+            self.events += 1
+        if triggered and self._count:
+            order = (self._head - self._count + np.arange(self._count)) % len(self.buffer)
+            output = [(float(self.buffer_times[i]), self.buffer[i].copy()) for i in order]
+        self._count = 0
+        output.append((timestamp, row))
+        self.reference = probe.copy()
+        self.last_written = timestamp
+        self.written += len(output)
+        return output
+
+    def summary(self):
+        ratio = self.seen / self.written if self.written else float("inf")
+        return (f"{self.written} von {self.seen} Frames geschrieben ({self.events} Ereignisse, "
+                f"Reduktion {ratio:.1f}x)")
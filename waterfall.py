@@ -0,0 +1,67 @@
+import numpy as np
+
+
+class WaterfallBuffer:
+    """
+    Ringpuffer fester Größe (Zeit x Pixel) für die Wasserfall-Anzeige.
+
+    Jede Zeile wird doppelt abgelegt (an head und head + rows), dadurch ist
+    data[head + 1:head + 1 + rows] immer ein zusammenhängender View in
+    zeitlicher Reihenfolge (älteste Zeile oben). Pro Spektrum wird nur die neue
+    Zeile geschrieben; das Bild "scrollt" über den Indexversatz, das Array wird
+    nie umkopiert. Minimum/Maximum je Zeile werden mitgeführt, damit die
+    Farbskala ohne Durchlauf über den ganzen Puffer bestimmt werden kann.
+    """
+
+    def __init__(self, rows=300):
+        self.rows = rows
+        self.data = None
+        self.reset()
+
+    def reset(self, width=None):
+        self.head = self.rows - 1  # nächste Zeile wird an head + 1 (mod rows) geschrieben
+        self.count = 0
+        self.data = None if width is None else np.full((2 * self.rows, width), np.nan, dtype=np.float32)
+        self.row_min = np.full(self.rows, np.nan)
+        self.row_max = np.full(self.rows, np.nan)
+        self.times = np.full(self.rows, np.nan)
+
+    @property
+    def width(self):
+        return None if self.data is None else self.data.shape[1]
+
+    def push(self, spectrum, timestamp=np.nan):
+        """Hängt ein Spektrum an; bei geänderter Länge beginnt der Verlauf neu."""
+        spectrum = np.asarray(spectrum)
+        if self.data is None or self.data.shape[1] != spectrum.shape[-1]:
+            self.reset(spectrum.shape[-1])
+        self.head = (self.head + 1) % self.rows
+        self.data[self.head] = spectrum
+        self.data[self.head + self.rows] = spectrum
+        self.row_min[self.head] = np.nanmin(spectrum)
+        self.row_max[self.head] = np.nanmax(spectrum)
+        self.times[self.head] = timestamp
+        self.count = min(self.count + 1, self.rows)
+
+    def view(self):
+        """Die letzten rows Spektren in zeitlicher Reihenfolge (View, keine Kopie)."""
+        start = self.head + 1
+        return self.data[start:start + self.rows]
+
+    def history(self):
+        """
+        Die gespeicherten Spektren (ohne leere Zeilen) mit Zeitstempeln, chronologisch.
+
+        :return: (times (n,), spectra (n, Pixel)) – spectra ist ein View
+        """
+        if not self.count:
+            return np.empty(0), np.empty((0, self.width or 0), dtype=np.float32)
+        order = (self.head + 1 + np.arange(self.rows - self.count, self.rows)) % self.rows
+        return self.times[order], self.view()[self.rows - self.count:]
+
+    def limits(self):
+        """(Minimum, Maximum) über alle gespeicherten Spektren."""
+        if not self.count:
+            return 0.0, 1.0
+        low, high = np.nanmin(self.row_min), np.nanmax(self.row_max)
+        return (low, high) if high > low else (low, low + 1.0)